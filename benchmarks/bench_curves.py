@@ -0,0 +1,38 @@
+# Délky oblouků celé sítě najednou a převzorkování trati po křivkách
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic import track_lines
+from trackcore.dat_parser import parse_dat_text
+from trackcore.track_data import TrackStore
+from trackcore.curves import arc_lengths, resample
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--tracks", type=int, default=10)
+    ap.add_argument("--segments", type=int, default=200000)
+    ap.add_argument("--spacing", type=float, default=1.0)
+    args = ap.parse_args()
+
+    stores = [TrackStore.from_parsed(parse_dat_text("\n".join(track_lines(args.segments, seed=t))))
+              for t in range(args.tracks)]
+    total = sum(s.n_segments for s in stores)
+
+    t0 = time.perf_counter()
+    for s in stores:
+        arc_lengths(s.coords)
+    print(f"délky {total} segmentů: {(time.perf_counter() - t0)*1000:.0f} ms")
+
+    t0 = time.perf_counter()
+    out = resample(stores[0], args.spacing)
+    print(f"převzorkování {stores[0].n_segments} -> {out.n_segments} segmentů: "
+          f"{(time.perf_counter() - t0)*1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
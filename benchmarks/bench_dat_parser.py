@@ -0,0 +1,76 @@
+# Propustnost parseru .dat v MB/s na syntetickém souboru o stovkách MB
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic import track_lines
+from trackcore.dat_parser import parse_dat
+
+
+def legacy_parse(dat_file):
+    # původní smyčka z TrackEditor.load_dat: strip, split a float() po jednom
+    rows = []
+    with open(dat_file, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line.startswith('c '):
+                parts = line.split()
+                if len(parts) < 11:
+                    continue
+                try:
+                    xyz = [float(v) for v in parts[1:10]]
+                except ValueError:
+                    continue
+                tail = parts[10:]
+                station_name = None
+                switch_name = None
+                for t in tail[2:]:
+                    if t.startswith('8'):
+                        switch_name = t[1:]
+                    else:
+                        station_name = t
+                rows.append((xyz, tail[:2], station_name, switch_name))
+    return rows
+
+
+def write_sized(path, size_mb):
+    target = size_mb * 1e6
+    written = 0
+    seed = 0
+    with open(path, "w", encoding="utf-8") as f:
+        while written < target:
+            chunk = "\n".join(track_lines(20000, seed, origin=(seed * 100.0, 0.0, 40.0))) + "\n"
+            f.write(chunk)
+            written += len(chunk)
+            seed += 1
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--size-mb", type=int, default=300)
+    ap.add_argument("--skip-legacy", action="store_true")
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "big.dat")
+        write_sized(path, args.size_mb)
+        size_mb = os.path.getsize(path) / 1e6
+        print(f"soubor {size_mb:.0f} MB")
+
+        runs = [("parse_dat", parse_dat)]
+        if not args.skip_legacy:
+            runs.append(("původní smyčka", legacy_parse))
+        for label, fn in runs:
+            t0 = time.perf_counter()
+            result = fn(path)
+            elapsed = time.perf_counter() - t0
+            del result
+            print(f"{label:>15}: {elapsed:6.2f} s, {size_mb/elapsed:6.1f} MB/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+# Doba odezvy na stisk klávesy (pohyb kamery) v závislosti na počtu bodů
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt5.QtWidgets import QApplication
+from PyQt5.QtGui import QKeyEvent
+from PyQt5.QtCore import Qt, QEvent
+
+from synthetic import write_track_set
+from track_editor import TrackEditor
+
+
+def time_keypresses(editor, app, count):
+    keys = [Qt.Key_W, Qt.Key_D, Qt.Key_Right, Qt.Key_S, Qt.Key_A, Qt.Key_Left]
+    samples = []
+    for i in range(count):
+        ev = QKeyEvent(QEvent.KeyPress, keys[i % len(keys)], Qt.NoModifier)
+        t0 = time.perf_counter()
+        editor.keyPressEvent(ev)
+        editor.view.viewport().repaint()
+        app.processEvents()
+        samples.append(time.perf_counter() - t0)
+    samples.sort()
+    return samples[len(samples) // 2]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--tracks", type=int, default=4)
+    ap.add_argument("--sizes", type=int, nargs="+", default=[1000, 5000, 20000])
+    ap.add_argument("--presses", type=int, default=30)
+    ap.add_argument("--zoom", type=float, default=4.0, help="malá hodnota = pohled na celou mapu")
+    args = ap.parse_args()
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    for n in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            xml = write_track_set(tmp, args.tracks, n)
+            editor = TrackEditor(xml_file=xml)
+            editor.finish_jobs()
+            editor.resize(1024, 768)
+            editor.show()
+            # kamera nad tratí, aby byl v záběru stále zhruba stejný počet prvků
+            store = next(iter(editor.tracks.values()))["store"]
+            editor.zoom = args.zoom
+            editor.center_on_point(store.point(store.n_points // 2))
+            app.processEvents()
+            median = time_keypresses(editor, app, args.presses)
+            points = sum(d["store"].n_points for d in editor.tracks.values())
+            print(f"{points:>9} bodů, zoom {args.zoom}: medián snímku po stisku klávesy {median*1000:7.2f} ms")
+            editor.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+# Doba uložení v závislosti na velikosti editace, ne na velikosti mapy
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from synthetic import write_track_set
+from trackcore.dat_parser import parse_dat
+from trackcore.dat_writer import save_store
+from trackcore.track_data import TrackStore
+
+
+def load_stores(directory, n_tracks):
+    return [(path, TrackStore.from_parsed(parse_dat(path)))
+            for path in (os.path.join(directory, f"track{t:03d}.dat") for t in range(n_tracks))]
+
+
+def save_dirty(stores):
+    t0 = time.perf_counter()
+    for path, store in stores:
+        if store.is_dirty():
+            save_store(path, store)
+    return time.perf_counter() - t0
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--tracks", type=int, default=8)
+    ap.add_argument("--sizes", type=int, nargs="+", default=[10000, 50000, 200000])
+    ap.add_argument("--edits", type=int, nargs="+", default=[1, 100, 10000])
+    args = ap.parse_args()
+
+    rng = np.random.default_rng(0)
+    for n in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            write_track_set(tmp, args.tracks, n)
+            stores = load_stores(tmp, args.tracks)
+            total_mb = sum(os.path.getsize(p) for p, _ in stores) / 1e6
+            print(f"mapa: {args.tracks} tratí x {n} segmentů, {total_mb:.0f} MB")
+            for k in args.edits:
+                # k upravených bodů v jedné trati
+                _, store = stores[0]
+                for i in rng.choice(store.n_points, size=min(k, store.n_points), replace=False).tolist():
+                    store.point(i).z = store.point(i).z + 0.5
+                print(f"  {k:>6} upravených bodů: {save_dirty(stores)*1000:8.1f} ms")
+            for _, store in stores:
+                store.structure_dirty = True
+            print(f"  přepis celé mapy:     {save_dirty(stores)*1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
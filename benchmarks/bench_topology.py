@@ -0,0 +1,66 @@
+# Stavba grafu spojení a doba dotazů na trasu na mřížce propojených tratí
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from trackcore.track_data import TrackStore
+from trackcore.topology import TrackGraph
+
+
+def grid_tracks(n, seg_per_track, step=2.0, seed=0):
+    # Mřížka n x n křižovatek spojených tratěmi; asi na každé dvacáté trati je stanice
+    rng = np.random.default_rng(seed)
+    span = seg_per_track * step
+    t = np.linspace(0, 1, 2*seg_per_track + 1)
+    tracks = []
+    for i in range(n):
+        for j in range(n):
+            for d, (dx, dy) in enumerate(((1, 0), (0, 1))):
+                if i + dx >= n or j + dy >= n:
+                    continue
+                pts = np.column_stack([i*span + dx*t*span, j*span + dy*t*span, np.zeros_like(t)])
+                pts[1:-1, :2] += rng.normal(0, 0.3, (len(pts) - 2, 2))
+                coords = np.stack([pts[0:-1:2], pts[1::2], pts[2::2]], 1).reshape(-1, 3)
+                stations = [None] * seg_per_track
+                if rng.random() < 0.05:
+                    stations[seg_per_track // 2] = f"st{i}_{j}_{d}"
+                name = f"t{i}_{j}_{d}"
+                tracks.append((name, TrackStore.from_segment_records(coords, stations, [None] * seg_per_track,
+                                                                     name=name)))
+    return tracks
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--grid", type=int, nargs="+", default=[30, 60, 120])
+    ap.add_argument("--segments", type=int, default=50)
+    ap.add_argument("--queries", type=int, default=50)
+    args = ap.parse_args()
+
+    for n in args.grid:
+        tracks = grid_tracks(n, args.segments)
+        n_segs = sum(s.n_segments for _, s in tracks)
+        t0 = time.perf_counter()
+        graph = TrackGraph.build(tracks)
+        build = time.perf_counter() - t0
+        stations = graph.station_names()
+        rnd = random.Random(0)
+        times = []
+        for _ in range(args.queries):
+            a, b = rnd.sample(stations, 2)
+            t0 = time.perf_counter()
+            graph.shortest_route(a, b)
+            times.append(time.perf_counter() - t0)
+        times.sort()
+        print(f"{len(tracks):>6} tratí, {n_segs:>8} segmentů: stavba {build*1000:7.0f} ms, "
+              f"{graph.n_chains} řetězců, trasa medián {times[len(times)//2]*1000:6.1f} ms, "
+              f"max {times[-1]*1000:6.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+# Porovnání paměti a doby načtení: původní objektový graf vs. TrackStore
+import os
+import sys
+import time
+import argparse
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic import write_dat
+from trackcore.dat_parser import parse_dat
+from trackcore.track_data import TrackStore
+
+
+class LegacyTrackPoint:
+    def __init__(self, x, y, z, station_name=None, switch_name=None, track_name=None):
+        self.x = x
+        self.y = y
+        self.z = z
+        self.station_name = station_name
+        self.switch_name = switch_name
+        self.track_name = track_name
+
+
+class LegacyCurveSegment:
+    def __init__(self, p1, p2, p3, station_name=None, switch_name=None):
+        self.p1 = p1
+        self.p2 = p2
+        self.p3 = p3
+        self.station_name = station_name
+        self.switch_name = switch_name
+
+
+def load_legacy(dat_file):
+    segments = []
+    with open(dat_file, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line.startswith('c '):
+                continue
+            parts = line.split()
+            x1, y1, z1 = float(parts[1]), float(parts[2]), float(parts[3])
+            x2, y2, z2 = float(parts[4]), float(parts[5]), float(parts[6])
+            x3, y3, z3 = float(parts[7]), float(parts[8]), float(parts[9])
+            station_name = None
+            switch_name = None
+            for t in parts[12:]:
+                if t.startswith('8'):
+                    switch_name = t[1:]
+                else:
+                    station_name = t
+            segments.append(LegacyCurveSegment(
+                LegacyTrackPoint(x1, y1, z1, station_name, switch_name),
+                LegacyTrackPoint(x2, y2, z2, station_name, switch_name),
+                LegacyTrackPoint(x3, y3, z3, station_name, switch_name),
+                station_name=station_name, switch_name=switch_name))
+    return segments
+
+
+def measure(loader, path):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    result = loader(path)
+    elapsed = time.perf_counter() - t0
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return elapsed, current, peak
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--segments", type=int, default=200000)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = write_dat(os.path.join(tmp, "bench.dat"), args.segments)
+        size_mb = os.path.getsize(path) / 1e6
+        print(f"{args.segments} segmentů, {size_mb:.1f} MB")
+        for label, loader in (("objekty", load_legacy),
+                              ("TrackStore", lambda p: TrackStore.from_parsed(parse_dat(p)))):
+            elapsed, current, peak = measure(loader, path)
+            print(f"{label:>10}: načtení {elapsed:6.2f} s, drženo {current/1e6:7.1f} MB, špička {peak/1e6:7.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
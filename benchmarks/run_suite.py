@@ -0,0 +1,240 @@
+# Sada benchmarků editoru nad syntetickou mapou v daném měřítku; výsledky jako JSON,
+# aby šlo porovnávat verze. Běží i bez displeje (Qt platforma offscreen)
+#
+#   python benchmarks/run_suite.py --scale map -o results.json
+#   python benchmarks/run_suite.py --tracks 4 --segments 50000 --data /tmp/bench-data
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import subprocess
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+from PyQt5.QtWidgets import QApplication, QMessageBox
+from PyQt5.QtCore import QPoint, QRectF, QT_VERSION_STR, PYQT_VERSION_STR
+
+from synthetic import write_track_set
+from trackcore.dat_parser import parse_dat
+from trackcore.track_cache import cache_dir_for
+from trackcore.tiles import TileIndex
+from trackcore.validation import Validator
+from trackcore.name_index import NameIndex
+from trackcore.track_data import NAMES
+from track_editor import TrackEditor
+
+# (počet tratí, segmentů na trať); "map" zhruba odpovídá síti tratí celé hry
+SCALES = {
+    "track": (1, 20000),
+    "map": (30, 20000),
+    "map10": (300, 20000),
+}
+
+
+def measure(fn, repeat, setup=None):
+    samples = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    samples.sort()
+    return {"median_s": samples[len(samples) // 2], "min_s": samples[0], "max_s": samples[-1],
+            "runs": len(samples)}
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def environment():
+    return {"python": platform.python_version(), "numpy": np.__version__, "qt": QT_VERSION_STR,
+            "pyqt": PYQT_VERSION_STR, "platform": platform.platform(), "cpus": os.cpu_count(),
+            "qpa": os.environ.get("QT_QPA_PLATFORM"), "revision": git_revision()}
+
+
+def prepare_data(directory, n_tracks, n_segments):
+    # Data se generují jen jednou; --data umožní použít stejnou sadu opakovaně
+    xml = os.path.join(directory, "traintracks.xml")
+    stamp = os.path.join(directory, "synthetic.json")
+    wanted = {"tracks": n_tracks, "segments": n_segments}
+    if os.path.exists(stamp):
+        with open(stamp, encoding="utf-8") as f:
+            if json.load(f) == wanted:
+                return xml
+    write_track_set(directory, n_tracks, n_segments)
+    with open(stamp, "w", encoding="utf-8") as f:
+        json.dump(wanted, f)
+    return xml
+
+
+def run(xml, repeat, app):
+    results = {}
+    stores = None
+    dat_files = [os.path.join(os.path.dirname(xml), f) for f in sorted(os.listdir(os.path.dirname(xml)))
+                 if f.endswith(".dat")]
+
+    results["load_dat"] = measure(lambda: TrackEditor.store_from_parsed(parse_dat(dat_files[0])), repeat)
+
+    # načtení celé mapy bez cache (parsování) a s cache (mapování .npy)
+    cache_dir = cache_dir_for(xml)
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    t0 = time.perf_counter()
+    editor = TrackEditor(xml_file=xml)
+    editor.finish_jobs()
+    results["load_tracks_cold"] = {"median_s": time.perf_counter() - t0, "runs": 1}
+
+    def reload():
+        editor.open_tracks(xml)
+        editor.finish_jobs()
+    results["load_tracks_warm"] = measure(reload, repeat)
+
+    editor.resize(1280, 800)
+    editor.show()
+    app.processEvents()
+    stores = [d["store"] for d in editor.tracks.values()]
+    coords = np.concatenate([s.coords for s in stores])
+
+    # projekce všech bodů do pixelů pohledu (transformace pohledu shora, jako při výběru)
+    results["map_to_view"] = measure(lambda: editor.map_to_view(coords), repeat)
+
+    # kontrola dat celé sítě a přepočet po malé editaci
+    def validate():
+        validator = Validator()
+        for s in stores:
+            validator.check_track(s.name, s)
+        return validator
+    results["validate"] = measure(validate, repeat)
+    validator = validate()
+    results["revalidate_edit"] = measure(lambda: validator.recheck(stores[0].name, stores[0], [30, 31, 32]),
+                                         repeat)
+
+    # index názvů stanic a výhybek a hledání předponou i podobným názvem
+    def name_index():
+        index = NameIndex(NAMES)
+        for s in stores:
+            index.add_track(s.name, s)
+        return index
+    results["name_index"] = measure(name_index, repeat)
+    index = name_index()
+    index.search("x")
+    results["name_search"] = measure(lambda: [index.search(q) for q in ("switch1", "stati", "swich12_3")],
+                                     repeat)
+
+    # rozdělení do dlaždic (bez cache) a stavba cest dlaždic ve výřezu
+    results["tile_index"] = measure(lambda: [TileIndex.build(s.coords) for s in stores], repeat)
+
+    def stream():
+        editor.apply_camera()
+        editor.finish_jobs()
+
+    def frame():
+        editor.view.viewport().repaint()
+        app.processEvents()
+    editor.zoom = 0.02
+    editor.center_camera_on_tracks()
+    results["scene_stream_map"] = measure(stream, repeat, setup=editor.path_cache.clear)
+    results["frame_map"] = measure(frame, max(repeat, 10))
+    store = stores[0]
+    editor.zoom = 3.0
+    editor.center_on_point(store.point(store.n_points // 2))
+    results["scene_stream_close"] = measure(stream, repeat, setup=editor.path_cache.clear)
+    results["frame_close"] = measure(frame, max(repeat, 10))
+
+    # výběr kliknutím a obdélníkem na přiblížené trati
+    rng = np.random.default_rng(0)
+    size = editor.view.viewport().size()
+    clicks = [QPoint(int(x), int(y)) for x, y in
+              zip(rng.integers(0, size.width(), 200), rng.integers(0, size.height(), 200))]
+    pick = measure(lambda: [editor.point_at(p) for p in clicks], repeat)
+    results["pick_point"] = {k: (v / len(clicks) if k.endswith("_s") else v) for k, v in pick.items()}
+    viewport = QRectF(editor.view.viewport().rect())
+    results["select_rect"] = measure(lambda: editor.select_points_in_rect(viewport), repeat,
+                                     setup=lambda: editor.apply_selection(set()))
+    editor.apply_selection(set())
+
+    # tabulka bodů největší tratě
+    largest = max(editor.tracks.values(), key=lambda d: d["store"].n_points)
+    results["table_load"] = measure(lambda: editor.points_panel.load_points(largest["segments"]), repeat)
+
+    # uložení: malá editace jedné tratě a přepis všech tratí
+    def edit():
+        for i in rng.choice(store.n_points, size=min(100, store.n_points), replace=False).tolist():
+            store.point(i).z = store.point(i).z + 0.5
+
+    def save():
+        editor.save_changes()
+        editor.finish_jobs()
+    results["save_edit"] = measure(save, repeat, setup=edit)
+
+    def dirty_all():
+        for s in stores:
+            s.structure_dirty = True
+    results["save_all"] = measure(save, 1, setup=dirty_all)
+
+    points = int(sum(s.n_points for s in stores))
+    editor.close()
+    return results, points
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmarky editoru nad syntetickou mapou")
+    ap.add_argument("--scale", choices=sorted(SCALES), default="track")
+    ap.add_argument("--tracks", type=int, help="přepíše počet tratí z --scale")
+    ap.add_argument("--segments", type=int, help="přepíše počet segmentů na trať z --scale")
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--data", help="adresář pro vygenerovaná data (jinak dočasný)")
+    ap.add_argument("-o", "--output", help="soubor pro výsledky v JSON (jinak stdout)")
+    args = ap.parse_args()
+
+    n_tracks, n_segments = SCALES[args.scale]
+    n_tracks = args.tracks or n_tracks
+    n_segments = args.segments or n_segments
+
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    # dialogy s hlášením by čekaly na klik
+    QMessageBox.information = staticmethod(lambda *a, **k: QMessageBox.Ok)
+
+    tmp = None
+    directory = args.data
+    if directory is None:
+        tmp = tempfile.mkdtemp(prefix="track-bench-")
+        directory = tmp
+    try:
+        t0 = time.perf_counter()
+        xml = prepare_data(directory, n_tracks, n_segments)
+        print(f"data: {n_tracks} tratí x {n_segments} segmentů ({time.perf_counter() - t0:.1f} s)",
+              file=sys.stderr)
+        data_mb = sum(os.path.getsize(os.path.join(directory, f)) for f in os.listdir(directory)
+                      if f.endswith(".dat")) / 1e6
+        results, points = run(xml, args.repeat, app)
+    finally:
+        if tmp is not None:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    report = {"scale": args.scale, "tracks": n_tracks, "segments_per_track": n_segments, "points": points,
+              "data_mb": round(data_mb, 1), "environment": environment(), "results": results}
+    for name, r in results.items():
+        print(f"{name:<20} {r['median_s']*1000:>10.2f} ms", file=sys.stderr)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
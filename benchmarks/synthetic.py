@@ -0,0 +1,58 @@
+import os
+import math
+import random
+import numpy as np
+
+LINE = "c " + " ".join(["%.6f"] * 9) + " %.6f 0"
+BLOCK = 1 << 16
+
+
+def track_lines(n_segments, seed=0, origin=(0.0, 0.0, 40.0), step=4.0):
+    # Plynule zatáčející trať, občas se stanicí nebo výhybkou. Souřadnice se
+    # generují po blocích v numpy, aby šlo rychle vyrobit i mapu v měřítku 10×
+    rng = np.random.default_rng(seed)
+    heading = rng.uniform(0, 2*math.pi)
+    pos = np.array(origin, dtype=np.float64)
+    for lo in range(0, n_segments, BLOCK):
+        n = min(BLOCK, n_segments - lo)
+        # každý segment má dva půlkroky (p1->p2, p2->p3), p3 je p1 dalšího segmentu
+        turns = heading + np.cumsum(rng.uniform(-0.02, 0.02, 2*n))
+        heading = turns[-1]
+        steps = np.empty((2*n, 3))
+        steps[:, 0] = step/2*np.cos(turns)
+        steps[:, 1] = step/2*np.sin(turns)
+        steps[:, 2] = rng.uniform(-0.05, 0.05, 2*n)
+        pts = pos + np.concatenate((np.zeros((1, 3)), np.cumsum(steps, axis=0)))
+        pos = pts[-1]
+        seg = np.concatenate((pts[0:-1:2], pts[1::2], pts[2::2]), axis=1)
+        r = rng.random(n)
+        idx = np.arange(lo, lo + n)
+        for row, i, x in zip(seg.tolist(), idx.tolist(), r.tolist()):
+            line = LINE % (*row, step)
+            if x < 0.01:
+                line += f" station{i // 500}"
+            elif x < 0.015:
+                line += f" 8switch{seed}_{i // 200}"
+            yield line
+
+
+def write_dat(path, n_segments, seed=0, origin=(0.0, 0.0, 40.0)):
+    with open(path, "w", encoding="utf-8") as f:
+        for line in track_lines(n_segments, seed, origin):
+            f.write(line + "\n")
+    return path
+
+
+def write_track_set(directory, n_tracks, n_segments, seed=0):
+    os.makedirs(directory, exist_ok=True)
+    rnd = random.Random(seed)
+    entries = []
+    for t in range(n_tracks):
+        name = f"track{t:03d}.dat"
+        origin = (rnd.uniform(-5000, 5000), rnd.uniform(-5000, 5000), 40.0)
+        write_dat(os.path.join(directory, name), n_segments, seed + t, origin)
+        entries.append(f'  <train_track filename="common:/data/levels/rdr3/{name}" trainConfigName="synthetic{t:03d}" />')
+    xml_path = os.path.join(directory, "traintracks.xml")
+    with open(xml_path, "w", encoding="utf-8") as f:
+        f.write("<train_tracks>\n" + "\n".join(entries) + "\n</train_tracks>\n")
+    return xml_path
@@ -0,0 +1,139 @@
+import time
+import threading
+from collections import deque
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, QTimer, QCoreApplication, pyqtSignal
+
+# Kolik milisekund smí jedna dávka aplikace výsledků zabrat, než GUI znovu kreslí
+SLICE_MS = 8
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class JobSignals(QObject):
+    # Signály se vysílají z pracovního vlákna a doručují frontou ve vlákně GUI
+    progress = pyqtSignal(int, int, str)
+    result = pyqtSignal(object)
+    error = pyqtSignal(object)
+    finished = pyqtSignal()
+
+
+class Job(QRunnable):
+    # Úloha pro QThreadPool; funkce dostane úlohu jako první argument, hlásí přes
+    # ni průběh a mezi kroky volá job.check(), aby šla zrušit
+    def __init__(self, fn, *args):
+        super().__init__()
+        self.setAutoDelete(False)
+        self.fn = fn
+        self.args = args
+        self.signals = JobSignals()
+        self.cancel_event = threading.Event()
+        self.done = False
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def check(self):
+        if self.cancel_event.is_set():
+            raise JobCancelled()
+
+    def progress(self, done, total, text=""):
+        self.signals.progress.emit(done, total, text)
+
+    def run(self):
+        try:
+            result = self.fn(self, *self.args)
+        except JobCancelled:
+            pass
+        except Exception as e:
+            self.signals.error.emit(e)
+        else:
+            if not self.cancelled():
+                self.signals.result.emit(result)
+        finally:
+            self.signals.finished.emit()
+
+
+class JobScheduler(QObject):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        self.jobs = set()
+
+    def submit(self, fn, *args, on_result=None, on_progress=None, on_error=None, on_finished=None):
+        job = Job(fn, *args)
+        if on_result is not None:
+            job.signals.result.connect(on_result)
+        if on_progress is not None:
+            job.signals.progress.connect(on_progress)
+        if on_error is not None:
+            job.signals.error.connect(on_error)
+        if on_finished is not None:
+            job.signals.finished.connect(on_finished)
+        job.signals.finished.connect(lambda: self.job_finished(job))
+        self.jobs.add(job)
+        self.pool.start(job)
+        return job
+
+    def job_finished(self, job):
+        job.done = True
+        self.jobs.discard(job)
+
+    def busy(self):
+        return bool(self.jobs)
+
+    def cancel_all(self):
+        for job in list(self.jobs):
+            job.cancel()
+
+    def wait(self):
+        # Počká na všechny úlohy včetně doručení jejich výsledků (skripty, testy, ukončení)
+        while self.jobs:
+            self.pool.waitForDone(50)
+            QCoreApplication.processEvents()
+
+
+class TimeSlicer(QObject):
+    # Výsledky z úloh se aplikují na scénu po dávkách z časovače; každá dávka
+    # trvá nejvýš SLICE_MS, mezi dávkami GUI kreslí a reaguje na vstup
+    def __init__(self, parent=None, budget_ms=SLICE_MS):
+        super().__init__(parent)
+        self.budget = budget_ms / 1000.0
+        self.queue = deque()
+        self.timer = QTimer(self)
+        self.timer.setInterval(0)
+        self.timer.timeout.connect(self.step)
+
+    def add(self, fn, items):
+        self.queue.extend((fn, item) for item in items)
+        if self.queue and not self.timer.isActive():
+            self.timer.start()
+
+    def then(self, fn):
+        # zavolá fn, až budou aplikovány všechny dříve přidané položky
+        self.add(lambda _: fn(), [None])
+
+    def step(self):
+        deadline = time.perf_counter() + self.budget
+        while self.queue and time.perf_counter() < deadline:
+            fn, item = self.queue.popleft()
+            fn(item)
+        if not self.queue:
+            self.timer.stop()
+
+    def busy(self):
+        return bool(self.queue)
+
+    def flush(self):
+        while self.queue:
+            fn, item = self.queue.popleft()
+            fn(item)
+        self.timer.stop()
+
+    def cancel(self):
+        self.queue.clear()
+        self.timer.stop()
@@ -1,9 +1,21 @@
 import sys
+import argparse
 from PyQt5.QtWidgets import QApplication
 from track_editor import TrackEditor
+from trackcore.profiling import profile_session
 
 if __name__ == "__main__":
-    app = QApplication(sys.argv)
-    window = TrackEditor(xml_file="tracks\traintracks.xml")
-    window.show()
-    sys.exit(app.exec_())
+    ap = argparse.ArgumentParser(description="RDR2 Track Editor")
+    ap.add_argument("xml", nargs="?", default="tracks\traintracks.xml")
+    ap.add_argument("--profile", metavar="SOUBOR.prof", help="celé sezení pod cProfile (pstats, snakeviz)")
+    ap.add_argument("--trace", metavar="SOUBOR.json", help="záznam časovačů (chrome://tracing, Perfetto)")
+    ap.add_argument("--overlay", action="store_true", help="zobrazit překryv s měřením snímků")
+    args, qt_args = ap.parse_known_args()
+
+    app = QApplication(sys.argv[:1] + qt_args)
+    with profile_session(args.profile, args.trace):
+        window = TrackEditor(xml_file=args.xml)
+        window.act_overlay.setChecked(args.overlay)
+        window.show()
+        code = app.exec_()
+    sys.exit(code)
@@ -0,0 +1,82 @@
+from PyQt5.QtWidgets import (QWidget, QTreeWidget, QTreeWidgetItem, QVBoxLayout, QHBoxLayout, QLineEdit,
+                             QComboBox, QDockWidget)
+from PyQt5.QtCore import Qt, QTimer
+
+from trackcore.name_index import KINDS
+
+KIND_LABELS = {"station": "stanice", "switch": "výhybka"}
+# Po editaci názvů se výsledky obnoví až po krátké pauze
+REFRESH_MS = 200
+
+
+class SearchPanel(QDockWidget):
+    # Hledání stanic a výhybek v celé síti přes NameIndex editoru
+    def __init__(self, parent=None):
+        super().__init__("Hledat", parent)
+        self.setAllowedAreas(Qt.LeftDockWidgetArea | Qt.RightDockWidgetArea | Qt.BottomDockWidgetArea)
+        self.parent = parent
+
+        self.edit = QLineEdit()
+        self.edit.setPlaceholderText("Stanice nebo výhybka (stačí začátek nebo podobný název)")
+        self.edit.setClearButtonEnabled(True)
+        self.edit.textChanged.connect(self.search)
+        self.edit.returnPressed.connect(self.activate_first)
+        self.kind = QComboBox()
+        self.kind.addItems(["Vše", "Stanice", "Výhybky"])
+        self.kind.currentIndexChanged.connect(self.search)
+
+        self.tree = QTreeWidget()
+        self.tree.setHeaderLabels(["Název", "Druh", "Trať", "Segment", "Bodů"])
+        self.tree.setRootIsDecorated(False)
+        self.tree.setUniformRowHeights(True)
+        self.tree.itemActivated.connect(self.on_item_activated)
+        self.tree.itemClicked.connect(self.on_item_activated)
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(REFRESH_MS)
+        self.timer.timeout.connect(self.search)
+
+        top = QHBoxLayout()
+        top.addWidget(self.edit, 1)
+        top.addWidget(self.kind)
+        layout = QVBoxLayout()
+        layout.addLayout(top)
+        layout.addWidget(self.tree)
+        widget = QWidget()
+        widget.setLayout(layout)
+        self.setWidget(widget)
+
+    def focus(self):
+        self.show()
+        self.raise_()
+        self.edit.setFocus()
+        self.edit.selectAll()
+
+    def schedule_refresh(self):
+        if self.edit.text().strip():
+            self.timer.start()
+
+    def search(self):
+        self.timer.stop()
+        self.tree.clear()
+        if self.parent is None:
+            return
+        kinds = (KINDS, ("station",), ("switch",))[self.kind.currentIndex()]
+        items = []
+        for hit in self.parent.name_index.search(self.edit.text(), kinds):
+            item = QTreeWidgetItem([hit.name, KIND_LABELS[hit.kind], str(hit.track), str(hit.segment + 1),
+                                    str(hit.count)])
+            item.setData(0, Qt.UserRole, hit)
+            items.append(item)
+        self.tree.addTopLevelItems(items)
+
+    def activate_first(self):
+        item = self.tree.topLevelItem(0)
+        if item is not None:
+            self.on_item_activated(item, 0)
+
+    def on_item_activated(self, item, column):
+        hit = item.data(0, Qt.UserRole)
+        if hit is not None and self.parent is not None:
+            self.parent.show_name_hit(hit)
@@ -0,0 +1,150 @@
+import os
+import sys
+import argparse
+
+from trackcore.track_set import expand_inputs
+from trackcore.formats import read_track, write_track, track_format
+from trackcore.ops import translate, merge
+from trackcore.validation import Validator
+from trackcore.curves import resample
+
+
+# Dávkové zpracování tratí bez GUI. Vstupem jsou soubory .dat/.npz/.csv nebo
+# traintracks.xml; tratě se zpracují po jedné, takže v paměti je vždy jen jedna.
+#
+#   python track_cli.py validate tracks/traintracks.xml
+#   python track_cli.py convert a.dat -o a.npz
+#   python track_cli.py translate tracks/traintracks.xml --offset 10 0 0 -o posunute/
+#   python track_cli.py resample a.dat --spacing 2.5 -o a_2m5.dat
+#   python track_cli.py merge a.dat b.dat -o ab.dat
+
+
+def output_path(args, track_file, single):
+    # -o je u jednoho vstupu cílový soubor, jinak adresář; bez -o se přepisuje vstup (--in-place)
+    if args.output is None:
+        if not args.in_place:
+            raise SystemExit("Chybí -o/--output nebo --in-place")
+        return track_file
+    base = os.path.basename(track_file)
+    if args.format:
+        base = os.path.splitext(base)[0] + "." + args.format
+    if single and not os.path.isdir(args.output) and not args.output.endswith(os.sep):
+        return args.output
+    os.makedirs(args.output, exist_ok=True)
+    return os.path.join(args.output, base)
+
+
+def each_track(args):
+    # Projde vstupy; chyby čtení jednoho souboru nezastaví zbytek dávky
+    entries = list(expand_inputs(args.inputs))
+    for name, track_file in entries:
+        try:
+            store, errors = read_track(track_file, name=name)
+        except (OSError, ValueError, UnicodeDecodeError) as e:
+            print(f"{track_file}: {e}", file=sys.stderr)
+            args.failed += 1
+            continue
+        for err in errors:
+            print(err, file=sys.stderr)
+        yield track_file, store, errors, len(entries) == 1
+
+
+def write(args, store, dest):
+    try:
+        track_format(dest)
+        write_track(dest, store)
+    except (OSError, ValueError) as e:
+        print(f"{dest}: {e}", file=sys.stderr)
+        args.failed += 1
+        return
+    if args.verbose:
+        print(f"{dest}: {store.n_segments} segmentů")
+
+
+def cmd_validate(args):
+    # Tratě se kontrolují po jedné; z každé zůstanou jen nálezy a názvy výhybek,
+    # výhybky bez protějšku v jiné trati se vypíší až na konci
+    validator = Validator(incremental=False)
+    segments = {}
+    failed = set()
+    for track_file, store, errors, _ in each_track(args):
+        validator.check_track(track_file, store)
+        segments[track_file] = store.n_segments
+        if errors:
+            failed.add(track_file)
+    for issue in validator.all_issues():
+        # chybné řádky už vypsalo each_track
+        if issue.kind != "parse":
+            print(repr(issue), file=sys.stderr)
+        if issue.severity == "chyba" or args.strict:
+            failed.add(issue.track)
+    args.failed += len(failed)
+    if args.verbose:
+        for track_file, n in segments.items():
+            if track_file not in failed:
+                print(f"{track_file}: OK ({n} segmentů)")
+
+
+def cmd_convert(args):
+    for track_file, store, _, single in each_track(args):
+        # při převodu se nemá kopírovat původní text, ale zapsat vše znovu
+        store.structure_dirty = True
+        write(args, store, output_path(args, track_file, single))
+
+
+def cmd_translate(args):
+    dx, dy, dz = args.offset
+    for track_file, store, _, single in each_track(args):
+        write(args, translate(store, dx, dy, dz), output_path(args, track_file, single))
+
+
+def cmd_resample(args):
+    for track_file, store, _, single in each_track(args):
+        write(args, resample(store, args.spacing), output_path(args, track_file, single))
+
+
+def cmd_merge(args):
+    # Spojení potřebuje všechny tratě najednou, proto jako jediný příkaz nestreamuje
+    stores = [store for _, store, _, _ in each_track(args)]
+    if stores:
+        write(args, merge(stores), args.output)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="track_cli", description="Dávkové zpracování tratí bez GUI")
+    parser.add_argument("-v", "--verbose", action="store_true")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    def add(name, func, help, output=True):
+        p = sub.add_parser(name, help=help)
+        p.add_argument("inputs", nargs="+", help="soubory .dat/.npz/.csv nebo traintracks.xml")
+        if output:
+            p.add_argument("-o", "--output", help="cílový soubor (jeden vstup) nebo adresář")
+            p.add_argument("--in-place", action="store_true", help="přepsat vstupní soubory")
+            p.add_argument("--format", choices=("dat", "npz", "csv"), help="formát výstupu v adresáři")
+        p.set_defaults(func=func)
+        return p
+
+    p = add("validate", cmd_validate, "zkontroluje soubory, geometrii tratí a výhybky", output=False)
+    p.add_argument("--strict", action="store_true", help="i varování (zlomy, osamocené výhybky) jsou chyba")
+    add("convert", cmd_convert, "převede mezi .dat, .npz a .csv")
+    p = add("translate", cmd_translate, "posune všechny body")
+    p.add_argument("--offset", nargs=3, type=float, required=True, metavar=("DX", "DY", "DZ"))
+    p = add("resample", cmd_resample, "převzorkuje tratě podél křivek na daný rozestup bodů")
+    p.add_argument("--spacing", type=float, required=True)
+    p = sub.add_parser("merge", help="spojí tratě do jednoho souboru")
+    p.add_argument("inputs", nargs="+")
+    p.add_argument("-o", "--output", required=True)
+    p.set_defaults(func=cmd_merge)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.failed = 0
+    args.func(args)
+    return 1 if args.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,15 +1,36 @@
 import os
 import math
-import xml.etree.ElementTree as ET
-from PyQt5.QtWidgets import (QMainWindow, QGraphicsView, QMenuBar, QAction, QFileDialog,
-                             QMessageBox, QTreeWidget, QTreeWidgetItem, QDockWidget, QVBoxLayout, QWidget, QApplication)
-from PyQt5.QtGui import QPen, QBrush, QColor
-from PyQt5.QtCore import Qt, QPointF, QRectF, QPoint
-from PyQt5.QtWidgets import QGraphicsRectItem, QGraphicsScene
-
-from track_data import TrackPoint, CurveSegment
+import multiprocessing
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from PyQt5.QtWidgets import (QMainWindow, QMenuBar, QAction, QFileDialog,
+                             QMessageBox, QTreeWidget, QTreeWidgetItem, QDockWidget, QVBoxLayout, QWidget, QApplication,
+                             QProgressDialog, QInputDialog, QSplitter, QActionGroup)
+from PyQt5.QtGui import QPen, QBrush, QColor, QTransform, QKeySequence
+from PyQt5.QtCore import Qt, QRectF, QPoint, QFileSystemWatcher, QTimer, QEvent
+from PyQt5.QtWidgets import QGraphicsItem, QGraphicsRectItem, QGraphicsScene
+
+from trackcore.camera import transform_xy
+from trackcore.track_data import NAMES, TrackStore
+from trackcore.track_set import read_track_entries
+from trackcore.track_cache import (cache_dir_for, load_cached, load_mapped, parse_and_cache, parse_mapped,
+                                   refresh_from_store)
+from trackcore.dat_writer import save_store
+from trackcore.spatial_index import SpatialIndex
+from trackcore.topology import TrackGraph
+from trackcore.history import EditHistory
+from trackcore.validation import Validator
+from trackcore.name_index import NameIndex
+from trackcore.curves import resample
+from trackcore.ops import (translate_points, rotate_points, scale_points, set_points_z, profile_z,
+                           set_points_name, changed_segments, segment_diff, copy_segments)
 from point_edit_dialog import PointEditDialog
 from track_points_panel import TrackPointsPanel
+from validation_panel import ValidationPanel
+from search_panel import SearchPanel
+from trackcore.profiling import PROFILER
+from track_graphics import TrackPathItem, TrackView, ProjectionView, PathCache, level_for_scale
+from jobs import JobScheduler, TimeSlicer
 
 class PointGraphicsItem(QGraphicsRectItem):
     # Změna z QGraphicsEllipseItem na QGraphicsRectItem, aby byl výběr konzistentní
@@ -23,6 +44,138 @@ class PointGraphicsItem(QGraphicsRectItem):
 class CustomGraphicsScene(QGraphicsScene):
     pass
 
+# Od jakého přiblížení se kreslí značky bodů a kolik jich smí být najednou
+MARKER_MIN_ZOOM = 0.5
+MAX_MARKERS = 20000
+# Kolik ms po poslední změně souboru na disku se čeká, než se načte znovu
+# (externí nástroje často zapisují po částech)
+RELOAD_DELAY_MS = 300
+# Rezerva kolem výřezu (podíl jeho velikosti), pro kterou se cesty staví předem
+PREFETCH_MARGIN = 0.5
+# Poloměr výběru kliknutím v pixelech pohledu
+PICK_RADIUS_PX = 4.0
+
+
+
+@PROFILER.timed()
+def read_tracks(job, entries, cache_dir):
+    # Běží v pracovním vlákně: nezměněné soubory se namapují z binární cache
+    # i s rozdělením do dlaždic, ostatní se parsují paralelně v procesech. Proces
+    # zapíše cache a vrátí jen výsledek bez polí, trať se pak namapuje z cache stejně
+    # jako při teplém startu. Body tratí se tu neprocházejí; cesty ve scéně vznikají
+    # až pro dlaždice ve výřezu
+    results = [None] * len(entries)
+    pending_files = {}
+    for i, (_, dat_file) in enumerate(entries):
+        job.check()
+        if not os.path.exists(dat_file):
+            print(f"Soubor {dat_file} neexistuje!")
+            continue
+        if cache_dir:
+            results[i] = load_cached(dat_file, cache_dir)
+        if results[i] is None:
+            pending_files[i] = dat_file
+    step = 0
+    total = len(pending_files) + len(entries)
+    if pending_files:
+        # fork z vícevláknového procesu (Qt, pracovní vlákno) není bezpečný
+        pool = ProcessPoolExecutor(max_workers=min(len(pending_files), os.cpu_count() or 1),
+                                   mp_context=multiprocessing.get_context("spawn"))
+        try:
+            futures = {pool.submit(parse_and_cache, f, cache_dir, False): i for i, f in pending_files.items()}
+            pending = set(futures)
+            while pending:
+                job.check()
+                done, pending = wait(pending, timeout=0.05, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    i = futures[fut]
+                    print(f"Načteno: {entries[i][1]}")
+                    try:
+                        results[i] = load_mapped(entries[i][1], cache_dir, fut.result())
+                    except Exception as e:
+                        print("Chyba při načítání DAT souboru:", e)
+                    step += 1
+                    job.progress(step, total, f"Načteno: {os.path.basename(entries[i][1])}")
+        finally:
+            # při zrušení se nezačaté soubory už neparsují
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    loaded = []
+    for (track_name, track_file), parsed in zip(entries, results):
+        job.check()
+        step += 1
+        job.progress(step, total, f"Připravuji trať {track_name}")
+        if parsed is None:
+            continue
+        store = TrackEditor.store_from_parsed(parsed)
+        if store.n_segments:
+            store.name = track_name
+            store.tile_index()
+            loaded.append((track_name, track_file, store))
+    return loaded
+
+
+@PROFILER.timed()
+def save_tracks(job, items, cache_dir):
+    # Běží v pracovním vlákně; soubory se zapisují atomicky, takže zrušit lze mezi nimi
+    saved = []
+    errors = []
+    for k, (dat_file, store) in enumerate(items):
+        job.check()
+        job.progress(k, len(items), f"Ukládám {os.path.basename(dat_file)}")
+        try:
+            size, mtime_ns, sha1 = save_store(dat_file, store)
+        except Exception as e:
+            errors.append((dat_file, e))
+            continue
+        print(f"Uloženo: {dat_file}")
+        saved.append(dat_file)
+        if cache_dir:
+            try:
+                refresh_from_store(dat_file, store, cache_dir, size, mtime_ns, sha1)
+            except OSError as e:
+                print("Nelze zapsat cache:", e)
+    return saved, errors
+
+
+@PROFILER.timed()
+def build_topology(job, tracks):
+    return TrackGraph.build(tracks)
+
+
+@PROFILER.timed()
+def reparse_tracks(job, items, cache_dir):
+    # Soubory změněné na disku se parsují znovu (a zapíší do cache); porovnání
+    # s tratěmi v paměti proběhne až ve vlákně GUI
+    reloaded = []
+    for k, (track_name, dat_file) in enumerate(items):
+        job.check()
+        job.progress(k, len(items), f"Načítám znovu {os.path.basename(dat_file)}")
+        try:
+            parsed = parse_mapped(dat_file, cache_dir)
+        except (OSError, UnicodeDecodeError) as e:
+            print("Chyba při načítání DAT souboru:", e)
+            continue
+        store = TrackEditor.store_from_parsed(parsed)
+        store.name = track_name
+        store.tile_index()
+        reloaded.append((track_name, dat_file, store))
+    return reloaded
+
+
+@PROFILER.timed()
+def check_tracks(job, tracks):
+    validator = Validator()
+    for k, (tn, store) in enumerate(tracks):
+        job.check()
+        job.progress(k, len(tracks), f"Kontroluji trať {tn}")
+        validator.check_track(tn, store)
+    return validator
+
+
+# Dost velká plocha scény, aby se kamera dala vycentrovat kamkoli na mapě
+WORLD_RECT = QRectF(-100000, -100000, 200000, 200000)
+
 class TrackEditor(QMainWindow):
     def __init__(self, xml_file="tracks\\traintracks.xml"):
         super().__init__()
@@ -33,16 +186,62 @@ class TrackEditor(QMainWindow):
         self.current_track_name = None
         self.point_to_item = {}
         self.selected_points = set()
+        self.path_items = {}
+        self.marker_items = {}
+        self.spatial_index = SpatialIndex()
+        # stanice a výhybky -> úseky tratí, pro hledání v celé síti
+        self.name_index = NameIndex(NAMES)
+        self.topology = None
+        # zvyšuje se při každé změně bodů; graf postavený ze starších dat se zahodí
+        self.topology_generation = 0
+        self.history = EditHistory()
+        # výsledky kontroly dat; po první kontrole se drží aktuální po každé editaci
+        self.validator = None
+        # úpravy provedené během kontroly na pozadí, přepočítají se po jejím dokončení
+        self.validation_edits = None
+        self.cache_dir = None
+        self.scheduler = JobScheduler(self)
+        self.slicer = TimeSlicer(self)
+        # cesty dlaždic ve výřezu se staví zvlášť, aby šly při pohybu kamery přeplánovat
+        self.tile_slicer = TimeSlicer(self)
+        self.path_cache = PathCache()
+        # soubory tratí se sledují; změněné se po chvíli klidu načtou znovu a porovnají
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.fileChanged.connect(self.file_changed)
+        self.changed_files = set()
+        # trať -> (store, počet úprav) při odeslání k novému načtení
+        self.reload_pending = {}
+        self.reload_timer = QTimer(self)
+        self.reload_timer.setSingleShot(True)
+        self.reload_timer.setInterval(RELOAD_DELAY_MS)
+        self.reload_timer.timeout.connect(self.reload_changed_files)
+        self.track_pen = QPen(Qt.black)
+        self.track_pen.setWidth(2)
+        self.track_pen.setCosmetic(True)
 
         # Kamera
         self.cx, self.cy, self.cz = 0.0, 0.0, 100.0  
         self.yaw = 0.0  
+        self.zoom = 1.0
         self.move_speed = 5.0
         self.rotate_speed = 5.0
 
         self.scene = CustomGraphicsScene(self)
-        self.view = QGraphicsView(self.scene)
-        self.setCentralWidget(self.view)
+        self.view = TrackView(self.scene)
+        self.view.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.view.setVerticalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        # kolečko a klávesy by pohled posouval přes skryté posuvníky mimo kameru,
+        # proto je zpracuje editor (eventFilter)
+        self.view.installEventFilter(self)
+        self.view.viewport().installEventFilter(self)
+        # vedle pohledu shora může být profil nebo perspektiva (rozdělená obrazovka)
+        self.side_view = ProjectionView(self)
+        self.side_view.hide()
+        self.splitter = QSplitter(Qt.Vertical)
+        self.splitter.addWidget(self.view)
+        self.splitter.addWidget(self.side_view)
+        self.setCentralWidget(self.splitter)
+        self.view_mode = "top"
 
         self.init_menu()
         self.init_dock()
@@ -50,11 +249,17 @@ class TrackEditor(QMainWindow):
         # Dock pro body tratě
         self.points_panel = TrackPointsPanel(self)
         self.addDockWidget(Qt.BottomDockWidgetArea, self.points_panel)
+        self.validation_panel = ValidationPanel(self)
+        self.addDockWidget(Qt.BottomDockWidgetArea, self.validation_panel)
+        self.tabifyDockWidget(self.points_panel, self.validation_panel)
+        self.points_panel.raise_()
 
-        self.load_tracks(self.current_xml_file)
-        self.redraw_scene()
+        self.reset_scene()
+        self.open_tracks(self.current_xml_file)
 
         self.select_start = None
+        self.drag_last = None
+        self.drag_key = None
         self.pan_active = False
         self.last_mouse_pos = None
         self.mouse_moved = False  # sleduje, zda během držení myši došlo k tahu
@@ -75,6 +280,83 @@ class TrackEditor(QMainWindow):
         act_exit.triggered.connect(self.close)
         file_menu.addAction(act_exit)
 
+        edit_menu = menu_bar.addMenu("Úpravy")
+
+        self.act_undo = QAction("Zpět", self)
+        self.act_undo.setShortcut(QKeySequence.Undo)
+        self.act_undo.triggered.connect(self.undo)
+        edit_menu.addAction(self.act_undo)
+
+        self.act_redo = QAction("Znovu", self)
+        self.act_redo.setShortcut(QKeySequence.Redo)
+        self.act_redo.triggered.connect(self.redo)
+        edit_menu.addAction(self.act_redo)
+
+        act_resample = QAction("Převzorkovat trať…", self)
+        act_resample.triggered.connect(self.resample_track)
+        edit_menu.addAction(act_resample)
+
+        act_validate = QAction("Zkontrolovat data", self)
+        act_validate.setShortcut("F7")
+        act_validate.triggered.connect(self.validate_tracks)
+        edit_menu.addAction(act_validate)
+
+        act_search = QAction("Hledat stanici / výhybku…", self)
+        act_search.setShortcut(QKeySequence.Find)
+        act_search.triggered.connect(lambda: self.search_panel.focus())
+        edit_menu.addAction(act_search)
+
+        sel_menu = menu_bar.addMenu("Výběr")
+        for label, handler in (("Posunout…", self.translate_selection),
+                               ("Otočit…", self.rotate_selection),
+                               ("Změnit měřítko…", self.scale_selection),
+                               ("Nastavit výšku Z…", self.set_selection_z),
+                               ("Výškový profil…", self.profile_selection),
+                               ("Přiřadit stanici…", lambda: self.name_selection("station")),
+                               ("Přiřadit výhybku…", lambda: self.name_selection("switch"))):
+            act = QAction(label, self)
+            act.triggered.connect(handler)
+            sel_menu.addAction(act)
+
+        route_menu = menu_bar.addMenu("Trasy")
+
+        act_route = QAction("Nejkratší trasa mezi stanicemi…", self)
+        act_route.triggered.connect(self.find_route)
+        route_menu.addAction(act_route)
+
+        act_reach = QAction("Tratě dosažitelné z výhybky…", self)
+        act_reach.triggered.connect(self.show_switch_reach)
+        route_menu.addAction(act_reach)
+
+        view_menu = menu_bar.addMenu("Zobrazení")
+
+        modes = QActionGroup(self)
+        for i, (label, mode) in enumerate((("Shora", "top"), ("Profil", "profile"),
+                                           ("Perspektiva", "perspective"), ("Shora + profil", "top+profile"),
+                                           ("Shora + perspektiva", "top+perspective"))):
+            act = QAction(label, self)
+            act.setCheckable(True)
+            act.setChecked(mode == "top")
+            act.setShortcut(f"Ctrl+{i + 1}")
+            act.triggered.connect(lambda checked, m=mode: self.set_view_mode(m))
+            modes.addAction(act)
+            view_menu.addAction(act)
+
+        act_exaggeration = QAction("Převýšení profilu…", self)
+        act_exaggeration.triggered.connect(self.ask_exaggeration)
+        view_menu.addAction(act_exaggeration)
+        view_menu.addSeparator()
+
+        self.act_overlay = QAction("Měření výkonu", self)
+        self.act_overlay.setCheckable(True)
+        self.act_overlay.setShortcut("F3")
+        self.act_overlay.toggled.connect(self.set_profiling_overlay)
+        view_menu.addAction(self.act_overlay)
+
+        act_dump = QAction("Uložit měření do JSON…", self)
+        act_dump.triggered.connect(self.save_profile)
+        view_menu.addAction(act_dump)
+
     def init_dock(self):
         self.dock = QDockWidget("Seznam tratí", self)
         self.dock.setAllowedAreas(Qt.LeftDockWidgetArea | Qt.RightDockWidgetArea)
@@ -93,133 +375,298 @@ class TrackEditor(QMainWindow):
         self.dock.setWidget(dock_widget)
         self.addDockWidget(Qt.LeftDockWidgetArea, self.dock)
 
+        self.search_panel = SearchPanel(self)
+        self.addDockWidget(Qt.LeftDockWidgetArea, self.search_panel)
+
     def open_xml(self):
         filename, _ = QFileDialog.getOpenFileName(self, "Otevřít traintracks.xml", "", "XML soubory (*.xml)")
         if filename:
-            self.current_xml_file = filename
-            self.tracks.clear()
-            self.scene.clear()
-            self.point_to_item.clear()
-            self.selected_points.clear()
-            self.load_tracks(self.current_xml_file)
-            self.redraw_scene()
-            self.populate_track_list()
+            self.open_tracks(filename)
 
-    def save_changes(self):
-        for tn, data in self.tracks.items():
-            dat_file = data["file"]
-            segments = data["segments"]
-
-            lines = []
-            for seg in segments:
-                p = seg.get_points()
-                seg.update_station_switch()
-                station_part = ""
-                if seg.station_name and seg.switch_name:
-                    station_part = f"{seg.station_name} 8{seg.switch_name}"
-                elif seg.station_name:
-                    station_part = seg.station_name
-                elif seg.switch_name:
-                    station_part = "8"+seg.switch_name
-
-                line = f"c {p[0].x} {p[0].y} {p[0].z} {p[1].x} {p[1].y} {p[1].z} {p[2].x} {p[2].y} {p[2].z} 0 0"
-                if station_part:
-                    line += " " + station_part
-                lines.append(line)
+    def run_job(self, label, fn, *args, on_result=None, delay=500):
+        # Spustí fn na pozadí s dialogem průběhu; dialog se ukáže až po delay ms,
+        # takže krátké úlohy neblikají
+        progress = QProgressDialog(label, "Zrušit", 0, 0, self)
+        progress.setWindowTitle("Probíhá úloha")
+        progress.setWindowModality(Qt.WindowModal)
+        progress.setMinimumDuration(delay)
+        progress.setAutoClose(False)
+        progress.setAutoReset(False)
 
-            try:
-                with open(dat_file, "w", encoding="utf-8") as f:
-                    for l in lines:
-                        f.write(l+"\n")
-                print(f"Uloženo: {dat_file}")
-            except Exception as e:
-                QMessageBox.warning(self, "Chyba", f"Nepodařilo se uložit {dat_file}:\n{e}")
-        QMessageBox.information(self, "Uloženo", "Změny byly uloženy.")
+        def on_progress(done, total, text):
+            progress.setMaximum(total)
+            progress.setValue(done)
+            if text:
+                progress.setLabelText(text)
 
-    def populate_track_list(self):
-        self.track_list.clear()
-        for tn, data in self.tracks.items():
-            item = QTreeWidgetItem([tn])
-            item.setCheckState(1, Qt.Checked if data["visible"] else Qt.Unchecked)
-            self.track_list.addTopLevelItem(item)
+        def on_error(e):
+            QMessageBox.warning(self, "Chyba", f"{label}\n{e}")
+
+        def on_finished():
+            progress.canceled.disconnect()
+            progress.reset()
+            progress.close()
+            progress.deleteLater()
+
+        job = self.scheduler.submit(fn, *args, on_result=on_result, on_progress=on_progress,
+                                    on_error=on_error, on_finished=on_finished)
+        progress.canceled.connect(job.cancel)
+        return job
 
-    def load_tracks(self, xml_file):
+    def open_tracks(self, xml_file):
+        # Načítání běží na pozadí; dosavadní tratě zůstávají, dokud nejsou nové hotové
+        # (při zrušení se tedy nic nemění)
         try:
-            tree = ET.parse(xml_file)
-            root = tree.getroot()
+            entries = read_track_entries(xml_file)
         except Exception as e:
             QMessageBox.warning(self, "Chyba", f"Nelze načíst XML: {e}")
             return
+        cache_dir = cache_dir_for(xml_file)
+        self.run_job("Načítám tratě…", read_tracks, entries, cache_dir,
+                     on_result=lambda loaded: self.install_tracks(xml_file, cache_dir, loaded))
 
-        for track in root.findall('train_track'):
-            full_path = track.get('filename')
-            if full_path is None:
-                continue
-            track_file = os.path.basename(full_path)
-            if not os.path.exists(track_file):
-                track_file = os.path.join(os.path.dirname(xml_file), track_file)
-
-            print(f"Načítám: {track_file}")
-            segments = self.load_dat(track_file)
-            if segments:
-                track_name = track.get('trainConfigName', track_file)
-                self.tracks[track_name] = {
-                    "file": track_file,
-                    "segments": segments,
-                    "visible": True
-                }
+    def install_tracks(self, xml_file, cache_dir, loaded):
+        self.slicer.cancel()
+        self.current_xml_file = xml_file
+        self.cache_dir = cache_dir
+        self.tracks.clear()
+        self.selected_points.clear()
+        self.spatial_index.clear()
+        self.name_index.clear()
+        self.history.clear()
+        self.invalidate_topology()
+        self.validator = None
+        self.validation_edits = None
+        self.validation_panel.set_validator(None)
+        self.points_panel.model.set_store(None)
+        self.track_list.clear()
+        self.reset_scene()
+        # hotové tratě se vkládají do scény po dávkách, GUI mezitím reaguje
+        self.slicer.add(self.install_track, loaded)
+        self.slicer.then(self.tracks_installed)
+
+    @PROFILER.timed()
+    def install_track(self, loaded_track):
+        track_name, track_file, store = loaded_track
+        self.tracks[track_name] = {
+            "file": track_file,
+            "store": store,
+            "segments": store.segments,
+            "visible": True
+        }
+        self.spatial_index.add_track(track_name, store)
+        self.name_index.add_track(track_name, store)
+        item = TrackPathItem(store, self.track_pen, self.path_cache)
+        self.scene.addItem(item)
+        self.path_items[track_name] = item
 
+    @PROFILER.timed()
+    def tracks_installed(self):
+        self.view.setSceneRect(self.scene.itemsBoundingRect().united(WORLD_RECT))
         self.populate_track_list()
+        self.watch_files()
+        self.search_panel.search()
+        self.center_camera_on_tracks()
+        self.rebuild_topology()
+        if PROFILER.enabled:
+            self.update_counters()
 
-    def load_dat(self, dat_file):
-        segments = []
-        if not os.path.exists(dat_file):
-            print(f"Soubor {dat_file} neexistuje!")
-            return segments
-        try:
-            with open(dat_file, "r", encoding="utf-8") as f:
-                for line in f:
-                    line=line.strip()
-                    if line.startswith('c '):
-                        parts = line.split()
-                        if len(parts) < 11:
-                            continue
-                        try:
-                            x1, y1, z1 = float(parts[1]), float(parts[2]), float(parts[3])
-                            x2, y2, z2 = float(parts[4]), float(parts[5]), float(parts[6])
-                            x3, y3, z3 = float(parts[7]), float(parts[8]), float(parts[9])
-                        except ValueError:
-                            continue
-                        tail = parts[10:]
-                        if len(tail) < 2:
-                            length_val = 0
-                            flag_val = 0
-                            remain = []
-                        else:
-                            length_val = tail[0]
-                            flag_val = tail[1]
-                            remain = tail[2:]
-
-                        station_name = None
-                        switch_name = None
-                        for t in remain:
-                            if t.startswith('8'):
-                                switch_name = t[1:]
-                            else:
-                                station_name = t
-
-                        seg = CurveSegment(
-                            TrackPoint(x1, y1, z1, station_name, switch_name),
-                            TrackPoint(x2, y2, z2, station_name, switch_name),
-                            TrackPoint(x3, y3, z3, station_name, switch_name),
-                            station_name=station_name,
-                            switch_name=switch_name
-                        )
-                        segments.append(seg)
-        except Exception as e:
-            print("Chyba při načítání DAT souboru:", e)
-        
-        return segments
+    def watch_files(self):
+        if self.watcher.files():
+            self.watcher.removePaths(self.watcher.files())
+        self.changed_files.clear()
+        files = [d["file"] for d in self.tracks.values() if os.path.exists(d["file"])]
+        if files:
+            self.watcher.addPaths(files)
+
+    def file_changed(self, path):
+        self.changed_files.add(path)
+        self.reload_timer.start()
+
+    def reload_changed_files(self):
+        paths, self.changed_files = self.changed_files, set()
+        # nástroje, které soubor nahradí novým (přejmenováním), zruší jeho sledování
+        watched = set(self.watcher.files())
+        for path in paths:
+            if path not in watched and os.path.exists(path):
+                self.watcher.addPath(path)
+        items = []
+        for tn, data in self.tracks.items():
+            if data["file"] not in paths:
+                continue
+            try:
+                st = os.stat(data["file"])
+            except OSError:
+                # smazaný soubor: trať zůstává v paměti, uložením vznikne znovu
+                continue
+            store = data["store"]
+            stat = (st.st_size, st.st_mtime_ns)
+            if store.source_stat is not None and tuple(store.source_stat) == stat:
+                # vlastní uložení nebo jen změna času
+                continue
+            if store.ignored_stat == stat:
+                continue
+            if store.is_dirty():
+                answer = QMessageBox.question(self, "Soubor změněn",
+                                              f"Soubor trati {tn} se změnil na disku, ale trať má neuložené "
+                                              f"změny.\nNačíst ji znovu ze souboru a změny zahodit?")
+                if answer != QMessageBox.Yes:
+                    # na tuto verzi souboru se už znovu neptáme; čísla řádků trati
+                    # patří k předchozí verzi, takže uložení musí přepsat celý soubor
+                    store.ignored_stat = stat
+                    store.structure_dirty = True
+                    continue
+            items.append((tn, data["file"]))
+            self.reload_pending[tn] = (store, store.edits)
+        if items:
+            self.scheduler.submit(reparse_tracks, items, self.cache_dir, on_result=self.tracks_reloaded)
+
+    @PROFILER.timed()
+    def tracks_reloaded(self, reloaded):
+        for tn, dat_file, store in reloaded:
+            data = self.tracks.get(tn)
+            pending = self.reload_pending.pop(tn, None)
+            if data is None or data["file"] != dat_file:
+                continue
+            old = data["store"]
+            if pending != (old, old.edits):
+                # trať se během načítání upravila; bez souhlasu se úpravy nezahodí
+                answer = QMessageBox.question(self, "Soubor změněn",
+                                              f"Soubor trati {tn} se změnil na disku a trať byla mezitím "
+                                              f"upravena.\nNačíst ji znovu ze souboru a změny zahodit?")
+                if answer != QMessageBox.Yes:
+                    old.ignored_stat = store.source_stat
+                    old.structure_dirty = True
+                    continue
+            self.reload_track(tn, store)
+
+    def reload_track(self, tn, new):
+        # Trať z disku se porovná s tratí v paměti po segmentech. Při stejném počtu
+        # segmentů se změněné segmenty převezmou na místě a obnoví se jen jejich
+        # prvky; jinak trať dostane nový store a výběr se přenese mimo změněný úsek
+        old = self.tracks[tn]["store"]
+        if new.n_segments == old.n_segments:
+            segs = changed_segments(old, new)
+            if len(segs):
+                idx = copy_segments(old, new, segs)
+                self.history.forget(old)
+            old.source_linenos = new.source_linenos
+            old.source_stat = new.source_stat
+            old.ignored_stat = None
+            old.parse_errors = new.parse_errors
+            old.mark_clean()
+            if len(segs):
+                self.points_changed([(old, idx)])
+            self.validation_changed(tn, old, None)
+            print(f"Načteno znovu: {tn}, změněno {len(segs)} segmentů")
+            return
+        # Jiný počet segmentů posune indexy všech dalších bodů, běhů dlaždic i úseků
+        # názvů, takže se celá tato trať vymění přes replace_store (její cesty, index
+        # a názvy se postaví znovu, ostatní tratě zůstávají). Rozdíl slouží k přenesení
+        # výběru a ke zprávě o změněném úseku
+        prefix, old_end, new_end = segment_diff(old, new)
+        shift = 3 * (new_end - old_end)
+        kept = set()
+        for p in self.selected_points:
+            if p.store is not old:
+                kept.add(p)
+            elif p.segment_index < prefix:
+                kept.add(new.point(p.index))
+            elif p.segment_index >= old_end:
+                kept.add(new.point(p.index + shift))
+        self.replace_store(tn, old, new)
+        self.apply_selection(kept)
+        print(f"Načteno znovu: {tn}, od segmentu {prefix + 1} nahrazeno {old_end - prefix} segmentů "
+              f"{new_end - prefix} novými")
+
+    def set_view_mode(self, mode):
+        # "top", "profile", "perspective" nebo "top+profile" / "top+perspective"
+        self.view_mode = mode
+        top = mode.startswith("top")
+        side = None if mode == "top" else mode.split("+")[-1]
+        self.view.setVisible(top)
+        self.side_view.setVisible(side is not None)
+        if side is not None:
+            self.side_view.set_mode(side)
+        if top and side is not None:
+            total = sum(self.splitter.sizes())
+            self.splitter.setSizes([total * 2 // 3, total - total * 2 // 3])
+        self.apply_camera()
+
+    def ask_exaggeration(self):
+        value, ok = QInputDialog.getDouble(self, "Převýšení profilu", "Násobek výšek:",
+                                           self.side_view.exaggeration, 0.1, 100.0, 1)
+        if ok:
+            self.side_view.exaggeration = value
+            self.side_view.camera_changed()
+
+    def set_profiling_overlay(self, visible):
+        # při záznamu celého sezení (--trace) zůstává měření zapnuté i bez překryvu
+        PROFILER.enabled = visible or PROFILER.events is not None
+        self.view.set_overlay(visible)
+        self.update_counters()
+
+    def update_counters(self):
+        PROFILER.count("tratě", len(self.tracks))
+        PROFILER.count("body", sum(d["store"].n_points for d in self.tracks.values()))
+        PROFILER.count("značky", len(self.point_to_item))
+        PROFILER.count("vybrané body", len(self.selected_points))
+
+    def save_profile(self):
+        filename, _ = QFileDialog.getSaveFileName(self, "Uložit měření", "profile.json", "JSON (*.json)")
+        if filename:
+            PROFILER.write_trace(filename)
+            print(PROFILER.report())
+
+    def finish_jobs(self):
+        # Počká na úlohy na pozadí i na vložení jejich výsledků (skripty, benchmarky)
+        while self.scheduler.busy() or self.slicer.busy() or self.tile_slicer.busy():
+            self.scheduler.wait()
+            self.slicer.flush()
+            self.tile_slicer.flush()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.stream_tiles()
+
+    def closeEvent(self, event):
+        self.slicer.cancel()
+        self.tile_slicer.cancel()
+        self.scheduler.cancel_all()
+        self.scheduler.wait()
+        self.slicer.cancel()
+        super().closeEvent(event)
+
+    def save_changes(self):
+        # Přepisují se jen tratě se změnami a v nich, pokud to jde, jen změněné řádky;
+        # zápis běží na pozadí, dialog průběhu zatím blokuje editaci
+        items = []
+        for tn, data in self.tracks.items():
+            store = data["store"]
+            if store.is_dirty():
+                store.update_all_station_switch(np.flatnonzero(store.dirty))
+                items.append((data["file"], store))
+        self.run_job("Ukládám změny…", save_tracks, items, self.cache_dir,
+                     on_result=self.changes_saved, delay=0)
+
+    def changes_saved(self, result):
+        saved, errors = result
+        for dat_file, e in errors:
+            QMessageBox.warning(self, "Chyba", f"Nepodařilo se uložit {dat_file}:\n{e}")
+        QMessageBox.information(self, "Uloženo", f"Změny byly uloženy ({len(saved)} souborů).")
+
+    def populate_track_list(self):
+        self.track_list.clear()
+        for tn, data in self.tracks.items():
+            item = QTreeWidgetItem([tn])
+            item.setCheckState(1, Qt.Checked if data["visible"] else Qt.Unchecked)
+            self.track_list.addTopLevelItem(item)
+
+    @staticmethod
+    def store_from_parsed(parsed):
+        for err in parsed.errors:
+            print("Chybný řádek:", err)
+        return TrackStore.from_parsed(parsed)
 
     def on_track_visibility_changed(self, item, column):
         if column == 1:
@@ -229,7 +676,11 @@ class TrackEditor(QMainWindow):
 
     def set_track_visibility(self, track_name, visible):
         self.tracks[track_name]["visible"] = visible
-        self.redraw_scene()
+        item = self.path_items.get(track_name)
+        if item is not None:
+            item.setVisible(visible)
+        self.refresh_markers()
+        self.stream_tiles()
 
     def on_track_item_double_clicked(self, item, column):
         track_name = item.text(0)
@@ -238,64 +689,338 @@ class TrackEditor(QMainWindow):
         self.points_panel.load_points(data["segments"])
         self.current_track_name = track_name
 
+    def edit_point(self, p):
+        pending = self.history.capture([(p.store, [p.index])])
+        dlg = PointEditDialog(p, self)
+        if dlg.exec_():
+            self.history.push(pending, "Úprava bodu")
+            self.update_segments_after_edit(p)
+
+    def update_segments_after_edit(self, p):
+        p.store.update_station_switch(p.segment_index)
+        self.points_changed([(p.store, [p.index])])
+
+    @PROFILER.timed()
+    def points_changed(self, changes):
+        # Po změně bodů (editace, zpět/znovu, tažení) se obnoví jen jejich značky,
+        # dotčené kusy čar, index a řádky tabulky
+        for store, idx in changes:
+            tn = store.name
+            self.spatial_index.update(tn, idx)
+            self.name_index.update(tn, store, idx)
+            path_item = self.path_items.get(tn)
+            if path_item is not None:
+                path_item.update_points(idx)
+            items = self.marker_items.get(tn)
+            if items:
+                for i in np.asarray(idx).tolist():
+                    item = items.get(i)
+                    if item is not None:
+                        item.setPos(store.coords[i, 0], store.coords[i, 1])
+            self.points_panel.model.points_changed(store, idx)
+            self.validation_changed(tn, store, idx)
+        self.side_view.update()
+        self.search_panel.schedule_refresh()
+        # graf spojení se po editaci postaví znovu až při dalším dotazu
+        self.invalidate_topology()
+
+    @PROFILER.timed()
+    def undo(self):
+        result = self.history.undo()
+        if result is not None:
+            self.points_changed(result[1])
+
+    @PROFILER.timed()
+    def redo(self):
+        result = self.history.redo()
+        if result is not None:
+            self.points_changed(result[1])
+
+    def resample_track(self):
+        # Převzorkování mění počet segmentů, takže trať dostane nový store
+        if not self.tracks:
+            return
+        names = list(self.tracks)
+        current = names.index(self.current_track_name) if self.current_track_name in self.tracks else 0
+        tn, ok = QInputDialog.getItem(self, "Převzorkovat trať", "Trať:", names, current, False)
+        if not ok:
+            return
+        spacing, ok = QInputDialog.getDouble(self, "Převzorkovat trať", "Rozestup bodů:", 2.0, 0.01, 10000.0, 3)
+        if not ok:
+            return
+        old = self.tracks[tn]["store"]
+        store = resample(old, spacing)
+        store.source_linenos = None
+        self.replace_store(tn, old, store)
+
+    def replace_store(self, tn, old, store):
+        data = self.tracks[tn]
+        data["store"] = store
+        data["segments"] = store.segments
+        self.history.forget(old)
+        self.apply_selection({p for p in self.selected_points if p.store is not old})
+        self.drop_markers(tn, list(self.marker_items.get(tn, {})))
+        self.spatial_index.add_track(tn, store)
+        self.name_index.add_track(tn, store)
+        self.search_panel.schedule_refresh()
+        item = self.path_items.pop(tn, None)
+        if item is not None:
+            self.tile_slicer.cancel()
+            self.path_cache.drop(item)
+            self.scene.removeItem(item)
+            new_item = TrackPathItem(store, item.pen, self.path_cache)
+            new_item.setVisible(data["visible"])
+            self.scene.addItem(new_item)
+            self.path_items[tn] = new_item
+        if self.points_panel.model.store is old:
+            self.points_panel.load_points(store.segments)
+        self.invalidate_topology()
+        self.validation_changed(tn, store, None)
+        self.refresh_markers()
+        self.stream_tiles()
+
+    def selection_by_store(self):
+        groups = {}
+        for p in self.selected_points:
+            groups.setdefault(id(p.store), (p.store, []))[1].append(p.index)
+        return [(store, np.array(sorted(idx), dtype=np.intp)) for store, idx in groups.values()]
+
+    def invalidate_topology(self):
+        self.topology = None
+        self.topology_generation += 1
+
+    def rebuild_topology(self):
+        # Graf spojení se po načtení staví na pozadí; dotaz před jeho dokončením
+        # si ho postaví sám (ensure_topology)
+        self.invalidate_topology()
+        generation = self.topology_generation
+        tracks = [(tn, d["store"]) for tn, d in self.tracks.items()]
+        self.scheduler.submit(build_topology, tracks,
+                              on_result=lambda graph: self.topology_built(generation, graph))
+
+    def topology_built(self, generation, graph):
+        if generation == self.topology_generation and self.topology is None:
+            self.topology = graph
+
+    def ensure_topology(self):
+        if self.topology is None:
+            self.topology = TrackGraph.build([(tn, d["store"]) for tn, d in self.tracks.items()])
+        return self.topology
+
+    def find_route(self):
+        graph = self.ensure_topology()
+        stations = graph.station_names()
+        if len(stations) < 2:
+            QMessageBox.information(self, "Trasa", "Načtené tratě nemají dost stanic.")
+            return
+        a, ok = QInputDialog.getItem(self, "Trasa", "Ze stanice:", stations, 0, True)
+        if not ok:
+            return
+        b, ok = QInputDialog.getItem(self, "Trasa", "Do stanice:", stations, 1, True)
+        if not ok:
+            return
+        route = graph.shortest_route(a, b)
+        if route is None:
+            QMessageBox.information(self, "Trasa", f"Mezi stanicemi {a} a {b} nevede žádná trasa.")
+            return
+        # trasu ukážeme jako výběr bodů jejích segmentů
+        selection = set()
+        for tn, start, end in route.pieces:
+            store = self.tracks[tn]["store"]
+            selection.update(store.point(i) for i in range(3*start, 3*end))
+        self.apply_selection(selection)
+        if route.pieces:
+            tn, start, _ = route.pieces[0]
+            self.center_on_point(self.tracks[tn]["store"].point(3*start))
+        QMessageBox.information(self, "Trasa", f"{a} → {b}: {route.length:.1f} m, "
+                                               f"{len({tn for tn, _, _ in route.pieces})} tratí")
+
+    def show_switch_reach(self):
+        graph = self.ensure_topology()
+        switches = graph.switch_names()
+        if not switches:
+            QMessageBox.information(self, "Výhybka", "Načtené tratě nemají žádné výhybky.")
+            return
+        sw, ok = QInputDialog.getItem(self, "Výhybka", "Výhybka:", switches, 0, True)
+        if not ok:
+            return
+        joined = graph.switch_tracks(sw)
+        reachable = graph.reachable_tracks(sw)
+        QMessageBox.information(self, "Výhybka", f"Výhybka {sw} spojuje: {', '.join(joined) or '-'}\n\n"
+                                                 f"Dosažitelné tratě ({len(reachable)}): {', '.join(reachable)}")
+
+    def validate_tracks(self):
+        # Celá síť se kontroluje na pozadí; pak už se po editacích přepočítávají
+        # jen dotčené segmenty (validation_changed)
+        if not self.tracks:
+            return
+        self.validation_edits = []
+        tracks = [(tn, d["store"]) for tn, d in self.tracks.items()]
+        self.run_job("Kontroluji tratě…", check_tracks, tracks, on_result=self.tracks_validated)
+        self.validation_panel.show()
+        self.validation_panel.raise_()
+
+    def tracks_validated(self, validator):
+        if self.validation_edits is None:
+            # mezitím se načetly jiné tratě
+            return
+        edits, self.validation_edits = self.validation_edits, None
+        self.validator = validator
+        for tn, idx in edits:
+            if tn in self.tracks:
+                self.validation_changed(tn, self.tracks[tn]["store"], idx)
+        self.validation_panel.set_validator(validator)
+
+    def validation_changed(self, tn, store, idx):
+        # idx None znamená novou trať (převzorkování), jinak změněné body
+        if self.validation_edits is not None:
+            self.validation_edits.append((tn, idx))
+        if self.validator is None:
+            return
+        if idx is None:
+            self.validator.check_track(tn, store)
+        else:
+            self.validator.recheck(tn, store, idx)
+        self.validation_panel.schedule_refresh()
+
+    def show_issue(self, issue):
+        data = self.tracks.get(issue.track)
+        if data is None or issue.point is None:
+            return
+        store = data["store"]
+        if issue.point >= store.n_points:
+            return
+        p = store.point(issue.point)
+        self.apply_selection({p})
+        self.center_on_point(p)
+
+    def show_name_hit(self, hit):
+        # vybere úsek bodů s hledaným názvem a kamera skočí na jeho začátek
+        data = self.tracks.get(hit.track)
+        if data is None:
+            return
+        store = data["store"]
+        self.apply_selection({store.point(i) for i in range(hit.point, min(hit.point + hit.count, store.n_points))})
+        self.center_on_point(store.point(hit.point))
+
     def center_on_point(self, p):
         self.cx = p.x
         self.cy = p.y
-        self.redraw_scene()
+        self.apply_camera()
 
-    def redraw_scene(self):
+    def reset_scene(self):
+        self.tile_slicer.cancel()
+        self.path_cache.clear()
         self.scene.clear()
         self.point_to_item.clear()
+        self.path_items.clear()
+        self.marker_items.clear()
         self.rubber_band_item = QGraphicsRectItem()
         self.rubber_band_item.setPen(QPen(Qt.blue, 1, Qt.DashLine))
         self.rubber_band_item.setBrush(QBrush(QColor(0,0,255,50)))
         self.rubber_band_item.setZValue(50)
+        self.rubber_band_item.setFlag(QGraphicsItem.ItemIgnoresTransformations)
         self.rubber_band_item.hide()
         self.scene.addItem(self.rubber_band_item)
+        self.view.setSceneRect(WORLD_RECT)
 
-        pen = QPen(Qt.black)
-        pen.setWidth(2)
-
-        for tn, data in self.tracks.items():
-            if not data["visible"]:
+    @PROFILER.timed()
+    def stream_tiles(self):
+        # Cesty tratí se staví jen pro běhy dlaždic ve výřezu a v rezervě kolem něj,
+        # nejbližší ke středu pohledu první a po dávkách mezi snímky. Vzdálené cesty
+        # časem vytlačí z PathCache novější (LRU v rámci rozpočtu paměti)
+        view_rect = self.view.mapToScene(self.view.viewport().rect()).boundingRect()
+        margin = max(view_rect.width(), view_rect.height()) * PREFETCH_MARGIN
+        rect = view_rect.adjusted(-margin, -margin, margin, margin)
+        level = level_for_scale(self.zoom)
+        wanted = []
+        for item in self.path_items.values():
+            if not item.isVisible():
                 continue
-            segments = data["segments"]
-            for seg in segments:
-                self.draw_curve_segment(seg, pen, track_name=tn)
+            runs = item.missing_runs(rect, level)
+            if len(runs):
+                b = item.tiles.bbox[runs]
+                dist = np.hypot((b[:, 0] + b[:, 2]) / 2 - self.cx, (b[:, 1] + b[:, 3]) / 2 - self.cy)
+                wanted.extend(zip(dist.tolist(), [item] * len(runs), runs.tolist()))
+        wanted.sort(key=lambda w: w[0])
+        self.tile_slicer.cancel()
+        self.tile_slicer.add(lambda w: w[1].build(w[2], level), wanted)
 
-        self.view.setSceneRect(self.scene.itemsBoundingRect())
+    @PROFILER.timed()
+    def refresh_markers(self):
+        # Značky bodů existují jen při dostatečném přiblížení a jen kolem výřezu
+        if self.zoom < MARKER_MIN_ZOOM:
+            for tn in list(self.marker_items):
+                self.drop_markers(tn, list(self.marker_items[tn]))
+            return
+        view_rect = self.view.mapToScene(self.view.viewport().rect()).boundingRect()
+        margin = max(view_rect.width(), view_rect.height()) * 0.5
+        rect = view_rect.adjusted(-margin, -margin, margin, margin)
 
-    def draw_curve_segment(self, segment, pen, track_name):
-        p1 = self.project_point(segment.p1.x, segment.p1.y, segment.p1.z)
-        p2 = self.project_point(segment.p2.x, segment.p2.y, segment.p2.z)
-        p3 = self.project_point(segment.p3.x, segment.p3.y, segment.p3.z)
+        wanted = self.spatial_index.query_rect(rect.left(), rect.top(), rect.right(), rect.bottom(),
+                                               self.visible_tracks())
+        if sum(len(idx) for idx in wanted.values()) > MAX_MARKERS:
+            wanted = {}
 
-        self.scene.addLine(p1.x(), p1.y(), p2.x(), p2.y(), pen)
-        self.scene.addLine(p2.x(), p2.y(), p3.x(), p3.y(), pen)
+        for tn in list(self.marker_items):
+            have = np.fromiter(self.marker_items[tn], dtype=np.intp)
+            self.drop_markers(tn, np.setdiff1d(have, wanted.get(tn, []), assume_unique=True).tolist())
+        for tn, idx in wanted.items():
+            have = self.marker_items.setdefault(tn, {})
+            if have:
+                idx = np.setdiff1d(idx, np.fromiter(have, dtype=np.intp), assume_unique=True)
+            store = self.tracks[tn]["store"]
+            for i, (x, y) in zip(idx.tolist(), store.coords[idx, :2].tolist()):
+                have[i] = self.create_point_item(store.point(i), tn, x, y)
 
-        self.create_point_item(segment.p1, track_name)
-        self.create_point_item(segment.p2, track_name)
-        self.create_point_item(segment.p3, track_name)
+    def drop_markers(self, track_name, indices):
+        items = self.marker_items.get(track_name, {})
+        for i in indices:
+            item = items.pop(i)
+            self.point_to_item.pop(item.point, None)
+            self.scene.removeItem(item)
+        if not items:
+            self.marker_items.pop(track_name, None)
 
-    def create_point_item(self, point, track_name):
-        pt_2d = self.project_point(point.x, point.y, point.z)
+    def create_point_item(self, point, track_name, x, y):
         item = PointGraphicsItem(point, track_name)
-        item.setRect(pt_2d.x()-3, pt_2d.y()-3, 6, 6)
-        item.setBrush(QBrush(Qt.red))
+        item.setRect(-3, -3, 6, 6)
+        item.setPos(x, y)
+        item.setBrush(QBrush(Qt.green if point in self.selected_points else Qt.red))
         self.scene.addItem(item)
         self.point_to_item[point] = item
-        if point in self.selected_points:
-            item.setBrush(QBrush(Qt.green))
-
-    def project_point(self, x, y, z):
-        dx = x - self.cx
-        dy = y - self.cy
-        dz = z - self.cz
-        cos_y = math.cos(math.radians(self.yaw))
-        sin_y = math.sin(math.radians(self.yaw))
-        x2 = dx*cos_y + dy*sin_y
-        y2 = -dx*sin_y + dy*cos_y
-        return QPointF(x2, y2)
+        return item
+
+    @PROFILER.timed()
+    def apply_camera(self):
+        # Pohyb kamery je jen transformace pohledu, prvky scény zůstávají beze změny
+        t = QTransform()
+        t.rotate(-self.yaw)
+        t.scale(self.zoom, self.zoom)
+        self.view.setTransform(t)
+        self.view.centerOn(self.cx, self.cy)
+        self.refresh_markers()
+        self.stream_tiles()
+        if self.side_view.isVisible():
+            self.side_view.camera_changed()
+        if PROFILER.enabled:
+            self.update_counters()
+
+    def center_camera_on_tracks(self):
+        # obálka z dlaždic, body tratí se kvůli tomu nečtou
+        bounds = np.array([d["store"].tile_index().bounds() for d in self.tracks.values()
+                           if d["visible"] and d["store"].n_segments])
+        if len(bounds):
+            self.cx = float(bounds[:, 0].min() + bounds[:, 2].max()) / 2
+            self.cy = float(bounds[:, 1].min() + bounds[:, 3].max()) / 2
+            # výška kamery doprostřed výšek tratí (stačí začátky běhů dlaždic)
+            z = np.concatenate([d["store"].coords[3*d["store"].tile_index().start, 2]
+                                for d in self.tracks.values() if d["visible"] and d["store"].n_segments])
+            self.cz = float(z.min() + z.max()) / 2
+        self.apply_camera()
+
+    def view_pos(self, event):
+        return self.view.viewport().mapFrom(self, event.pos())
 
     def keyPressEvent(self, event):
         if event.key() == Qt.Key_W:
@@ -319,42 +1044,54 @@ class TrackEditor(QMainWindow):
         elif event.key() == Qt.Key_Right:
             self.yaw += self.rotate_speed
 
-        self.redraw_scene()
+        self.apply_camera()
 
     def mousePressEvent(self, event):
+        if event.button() == Qt.LeftButton and event.modifiers() == Qt.NoModifier:
+            # tažení za vybraný bod posouvá celý výběr
+            p = self.point_at(self.view_pos(event))
+            if p is not None and p in self.selected_points:
+                self.drag_last = self.view.mapToScene(self.view_pos(event))
+                self.drag_key = object()
+                super().mousePressEvent(event)
+                return
         if event.button() == Qt.LeftButton:
-            self.select_start = event.pos()
-            self.rubber_band_item.setRect(QRectF(self.select_start, self.select_start))
+            self.select_start = self.view_pos(event)
+            self.set_rubber_band(QRectF(self.select_start, self.select_start))
             self.rubber_band_item.show()
             self.mouse_moved = False
         super().mousePressEvent(event)
 
     def mouseMoveEvent(self, event):
-        if self.select_start is not None:
-            rect = QRectF(self.select_start, event.pos()).normalized()
-            self.rubber_band_item.setRect(rect)
+        if self.drag_last is not None:
+            pos = self.view.mapToScene(self.view_pos(event))
+            self.move_selection(pos.x() - self.drag_last.x(), pos.y() - self.drag_last.y())
+            self.drag_last = pos
+        elif self.select_start is not None:
+            rect = QRectF(self.select_start, self.view_pos(event)).normalized()
+            self.set_rubber_band(rect)
             self.mouse_moved = True
         super().mouseMoveEvent(event)
 
+    def set_rubber_band(self, rect):
+        # Obdélník je v pixelech pohledu, proto ignoruje rotaci a zoom kamery
+        self.rubber_band_item.setPos(self.view.mapToScene(rect.topLeft().toPoint()))
+        self.rubber_band_item.setRect(0, 0, rect.width(), rect.height())
+
     def mouseReleaseEvent(self, event):
-        if event.button() == Qt.LeftButton and self.select_start is not None:
-            rect = QRectF(self.select_start, event.pos()).normalized()
+        if event.button() == Qt.LeftButton and self.drag_last is not None:
+            self.drag_last = None
+            self.drag_key = None
+        elif event.button() == Qt.LeftButton and self.select_start is not None:
+            pos = self.view_pos(event)
+            rect = QRectF(self.select_start, pos).normalized()
             self.rubber_band_item.hide()
 
             # pokud se myš téměř nepohnula, bereme to jako klik
             if not self.mouse_moved or rect.width() < 2 and rect.height() < 2:
                 # zkusíme vybrat bod pod kurzorem
-                scene_pos = self.view.mapToScene(event.pos())
-                items = self.scene.items(scene_pos)
-                # najdeme první PointGraphicsItem
-                clicked_points = set()
-                for it in items:
-                    if isinstance(it, PointGraphicsItem):
-                        # nalezen bod
-                        clicked_points.add(it.point)
-                        break
-
-                self.apply_selection(clicked_points)
+                p = self.point_at(pos)
+                self.apply_selection({p} if p is not None else set())
             else:
                 # standardní obdélníkový výběr
                 self.select_points_in_rect(rect)
@@ -362,48 +1099,180 @@ class TrackEditor(QMainWindow):
             self.select_start = None
         super().mouseReleaseEvent(event)
 
+    def move_selection(self, dx, dy):
+        # jednotlivé posuny jednoho tažení se v historii slučují do jednoho kroku
+        groups = self.selection_by_store()
+        pending = self.history.capture(groups)
+        for store, idx in groups:
+            translate_points(store, idx, dx, dy)
+        self.history.push(pending, "Posun výběru", key=self.drag_key)
+        self.points_changed(groups)
+
+    @PROFILER.timed()
+    def transform_selection(self, label, op, *args):
+        # Hromadná úprava výběru: jedna operace nad polem pro každou trať,
+        # jeden krok historie a jedno překreslení dotčených prvků
+        groups = self.selection_by_store()
+        if not groups:
+            QMessageBox.information(self, label, "Nejsou vybrány žádné body.")
+            return
+        pending = self.history.capture(groups)
+        for store, idx in groups:
+            op(store, idx, *args)
+        self.history.push(pending, label)
+        self.points_changed(groups)
+
+    def selection_pivot(self):
+        # střed obálky výběru v rovině XY
+        xy = np.concatenate([store.coords[idx, :2] for store, idx in self.selection_by_store()])
+        return ((xy.min(axis=0) + xy.max(axis=0)) / 2).tolist()
+
+    def ask_numbers(self, title, label, count):
+        text, ok = QInputDialog.getText(self, title, label)
+        if not ok:
+            return None
+        try:
+            values = [float(v) for v in text.replace(",", " ").split()]
+        except ValueError:
+            values = []
+        if len(values) != count:
+            QMessageBox.warning(self, "Chyba", "Neplatné číselné hodnoty!")
+            return None
+        return values
+
+    def translate_selection(self):
+        if not self.selected_points:
+            return
+        values = self.ask_numbers("Posunout", "Posun dx dy dz:", 3)
+        if values is not None:
+            self.transform_selection("Posun výběru", translate_points, *values)
+
+    def rotate_selection(self):
+        if not self.selected_points:
+            return
+        angle, ok = QInputDialog.getDouble(self, "Otočit", "Úhel ve stupních:", 0.0, -360.0, 360.0, 3)
+        if ok:
+            self.transform_selection("Otočení výběru", rotate_points, angle, *self.selection_pivot())
+
+    def scale_selection(self):
+        if not self.selected_points:
+            return
+        factor, ok = QInputDialog.getDouble(self, "Změnit měřítko", "Měřítko:", 1.0, 0.001, 1000.0, 4)
+        if ok:
+            self.transform_selection("Změna měřítka výběru", scale_points, factor, *self.selection_pivot())
+
+    def set_selection_z(self):
+        if not self.selected_points:
+            return
+        z, ok = QInputDialog.getDouble(self, "Nastavit výšku", "Z:", next(iter(self.selected_points)).z,
+                                       -100000.0, 100000.0, 3)
+        if ok:
+            self.transform_selection("Nastavení výšky", set_points_z, z)
+
+    def profile_selection(self):
+        # profil jako dvojice staničení:výška, např. "0:40; 250:42.5"
+        if not self.selected_points:
+            return
+        text, ok = QInputDialog.getText(self, "Výškový profil", "Staničení:výška; …")
+        if not ok:
+            return
+        try:
+            knots = [tuple(float(v) for v in part.split(":")) for part in text.split(";") if part.strip()]
+        except ValueError:
+            knots = []
+        if not knots or any(len(k) != 2 for k in knots):
+            QMessageBox.warning(self, "Chyba", "Neplatný profil!")
+            return
+        self.transform_selection("Výškový profil", profile_z, knots)
+
+    def name_selection(self, kind):
+        if not self.selected_points:
+            return
+        label = "Stanice:" if kind == "station" else "Výhybka:"
+        name, ok = QInputDialog.getText(self, "Přiřadit název", label)
+        if ok:
+            self.transform_selection("Přiřazení názvu", set_points_name, name.strip() or None, kind)
+
+    @PROFILER.timed()
     def select_points_in_rect(self, rect):
         mods = QApplication.keyboardModifiers()
         add_mode = bool(mods & Qt.ControlModifier)
         remove_mode = bool(mods & Qt.AltModifier)
 
+        # index vrátí kandidáty z obálky (při otočené kameře je obdélník ve scéně kosý),
+        # přesný test pak proběhne v souřadnicích pohledu
+        bounds = self.view.mapToScene(rect.toRect()).boundingRect()
+        candidates = self.spatial_index.query_rect(bounds.left(), bounds.top(), bounds.right(), bounds.bottom(),
+                                                   self.visible_tracks())
         new_selection = set()
-        for p, it in self.point_to_item.items():
-            center = self.view.mapFromScene(it.sceneBoundingRect().center())
-            if rect.contains(center):
-                new_selection.add(p)
+        for tn, idx in candidates.items():
+            store = self.tracks[tn]["store"]
+            xy = self.map_to_view(store.coords[idx])
+            inside = ((xy[:, 0] >= rect.left()) & (xy[:, 0] <= rect.right()) &
+                      (xy[:, 1] >= rect.top()) & (xy[:, 1] <= rect.bottom()))
+            new_selection.update(store.point(i) for i in idx[inside].tolist())
 
         self.apply_selection(new_selection, add_mode, remove_mode)
 
+    @PROFILER.timed()
+    def point_at(self, pos):
+        # Nejbližší bod pod kurzorem; značka má 6x6 jednotek, při oddálení bereme pár pixelů
+        scene_pos = self.view.mapToScene(pos)
+        radius = max(3.0, PICK_RADIUS_PX / self.zoom)
+        hit = self.spatial_index.nearest(scene_pos.x(), scene_pos.y(), radius, self.visible_tracks())
+        if hit is None:
+            return None
+        tn, i, _ = hit
+        return self.tracks[tn]["store"].point(i)
+
+    def visible_tracks(self):
+        return {tn for tn, data in self.tracks.items() if data["visible"]}
+
+    def map_to_view(self, coords):
+        t = self.view.viewportTransform()
+        return transform_xy(coords, t.m11(), t.m12(), t.m21(), t.m22(), t.dx(), t.dy())
+
+    @PROFILER.timed()
     def apply_selection(self, new_selection, add_mode=False, remove_mode=False):
+        old_selection = self.selected_points
         if add_mode:
-            self.selected_points |= new_selection
+            self.selected_points = old_selection | new_selection
         elif remove_mode:
-            self.selected_points -= new_selection
+            self.selected_points = old_selection - new_selection
         else:
             self.selected_points = new_selection
 
-        for p, it in self.point_to_item.items():
+        # přebarvíme jen body, kterým se stav výběru změnil
+        for p in old_selection ^ self.selected_points:
+            it = self.point_to_item.get(p)
+            if it is None:
+                continue
             if p in self.selected_points:
                 it.setBrush(QBrush(Qt.green))
             else:
                 it.setBrush(QBrush(Qt.red))
+        self.side_view.update()
+        if PROFILER.enabled:
+            self.update_counters()
 
     def mouseDoubleClickEvent(self, event):
-        scene_pos = self.view.mapToScene(event.pos())
-        items = self.scene.items(scene_pos)
-        for it in items:
-            if isinstance(it, PointGraphicsItem):
-                p = it.point
-                dlg = PointEditDialog(p, self)
-                if dlg.exec_():
-                    self.update_segments_after_edit(p)
-                    self.redraw_scene()
-                break
+        p = self.point_at(self.view_pos(event))
+        if p is not None:
+            self.edit_point(p)
         super().mouseDoubleClickEvent(event)
 
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Wheel and obj is self.view.viewport():
+            self.wheelEvent(event)
+            return True
+        if event.type() == QEvent.KeyPress and obj is self.view:
+            self.keyPressEvent(event)
+            return True
+        return super().eventFilter(obj, event)
+
     def wheelEvent(self, event):
         # Zoom kolečkem myši
         angle = event.angleDelta().y()
         factor = 1.1 if angle > 0 else 1.0/1.1
-        self.view.scale(factor, factor)
+        self.zoom *= factor
+        self.apply_camera()
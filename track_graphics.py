@@ -0,0 +1,342 @@
+import time
+from collections import OrderedDict
+import numpy as np
+from PyQt5.QtGui import QPainterPath, QPolygonF, QColor, QFontMetrics, QPainter, QPen
+from PyQt5.QtCore import Qt, QRectF, QPointF
+from PyQt5.QtWidgets import QGraphicsItem, QGraphicsView, QStyleOptionGraphicsItem, QWidget
+
+from trackcore.geometry import segment_runs, run_polyline, simplify
+from trackcore.curves import run_curves
+from trackcore.camera import profile_camera, perspective_camera, project_points
+from trackcore.profiling import PROFILER
+
+# Tolerance zjednodušení ve scénických jednotkách pro jednotlivé úrovně detailu
+LOD_TOLERANCES = (0.0, 1.0, 4.0, 16.0, 64.0)
+# Rozpočet paměti pro cesty běhů dlaždic; nejdéle nepoužité se zahazují
+PATH_BUDGET = 256 << 20
+# Odhad velikosti jednoho prvku QPainterPath (x, y a typ)
+PATH_ELEMENT_BYTES = 24
+
+
+def polygon_from_xy(xy):
+    # Naplní QPolygonF přímo z pole (N,2) bez tvorby QPointF po jednom
+    xy = np.ascontiguousarray(xy, dtype=np.float64)
+    poly = QPolygonF(len(xy))
+    if len(xy):
+        ptr = poly.data()
+        ptr.setsize(xy.nbytes)
+        np.frombuffer(ptr, dtype=np.float64)[:] = xy.ravel()
+    return poly
+
+
+def level_for_scale(scale):
+    # Nejhrubší úroveň, jejíž odchylka zůstane pod jedním pixelem
+    pixel = 1.0 / scale if scale > 0 else float("inf")
+    level = 0
+    for i, tol in enumerate(LOD_TOLERANCES):
+        if tol <= pixel:
+            level = i
+    return level
+
+
+@PROFILER.timed()
+def build_run_path(coords, start, end, level):
+    # Cesta jednoho běhu segmentů [start, end) na jedné úrovni detailu. Používá jen
+    # hodnotové třídy Qt, takže se dá stavět i mimo vlákno GUI
+    part = coords[3*start:3*end]
+    tol = LOD_TOLERANCES[level]
+    if tol == 0:
+        # nejjemnější úroveň kreslí segmenty jako křivky, hrubším stačí lomené čáry
+        lines = [xy[:, :2] for xy in run_curves(part)]
+    else:
+        lines = []
+        for s, e in segment_runs(part):
+            xy = run_polyline(part, s, e)[:, :2]
+            lines.append(xy[simplify(xy, tol)])
+    path = QPainterPath()
+    for xy in lines:
+        path.addPolygon(polygon_from_xy(xy))
+    return path
+
+
+class PathCache:
+    # Hotové cesty běhů všech tratí s rozpočtem paměti (LRU). Klíč je
+    # (prvek tratě, běh, úroveň detailu)
+    def __init__(self, budget=PATH_BUDGET):
+        self.budget = budget
+        self.paths = OrderedDict()
+        self.size = 0
+
+    def __contains__(self, key):
+        return key in self.paths
+
+    def __len__(self):
+        return len(self.paths)
+
+    def get(self, key):
+        entry = self.paths.get(key)
+        if entry is None:
+            return None
+        self.paths.move_to_end(key)
+        return entry[0]
+
+    def peek(self, key):
+        # bez změny pořadí LRU
+        entry = self.paths.get(key)
+        return None if entry is None else entry[0]
+
+    def put(self, key, path):
+        old = self.paths.pop(key, None)
+        if old is not None:
+            self.size -= old[1]
+        nbytes = path.elementCount() * PATH_ELEMENT_BYTES
+        self.paths[key] = (path, nbytes)
+        self.size += nbytes
+        while self.size > self.budget and len(self.paths) > 1:
+            _, (_, evicted) = self.paths.popitem(last=False)
+            self.size -= evicted
+
+    def drop(self, item):
+        for key in [k for k in self.paths if k[0] is item]:
+            self.size -= self.paths.pop(key)[1]
+
+    def clear(self):
+        self.paths.clear()
+        self.size = 0
+
+
+class TrackPathItem(QGraphicsItem):
+    # Celá trať jako jeden prvek scény. Kreslí jen běhy dlaždic (TileIndex tratě),
+    # jejichž cesty jsou v PathCache; chybějící staví editor podle výřezu kamery
+    def __init__(self, store, pen, cache):
+        super().__init__()
+        self.store = store
+        self.tiles = store.tile_index()
+        self.pen = pen
+        self.cache = cache
+        self.bounds = QRectF()
+        self.setFlag(QGraphicsItem.ItemUsesExtendedStyleOption)
+        self.update_bounds()
+
+    def update_bounds(self):
+        b = self.tiles.bounds()
+        rect = QRectF() if b is None else QRectF(b[0], b[1], b[2]-b[0], b[3]-b[1]).adjusted(-1, -1, 1, 1)
+        if rect != self.bounds:
+            self.prepareGeometryChange()
+            self.bounds = rect
+
+    def run_rect(self, run):
+        x0, y0, x1, y1 = self.tiles.bbox[run].tolist()
+        return QRectF(x0, y0, x1-x0, y1-y0).adjusted(-1, -1, 1, 1)
+
+    def missing_runs(self, rect, level):
+        # Běhy zasahující do obdélníku, pro které ještě není cesta na dané úrovni
+        runs = self.tiles.query(rect.left(), rect.top(), rect.right(), rect.bottom())
+        return np.array([r for r in runs.tolist() if (self, r, level) not in self.cache], dtype=np.intp)
+
+    def build(self, run, level):
+        self.cache.put((self, run, level), build_run_path(self.store.coords, int(self.tiles.start[run]),
+                                                          int(self.tiles.end[run]), level))
+        self.update(self.run_rect(run))
+
+    def update_points(self, indices):
+        # Přestaví jen cesty běhů s upravenými body, a to jen na úrovních, které už byly postavené
+        runs = self.tiles.runs_of(indices)
+        self.tiles.refit(runs)
+        for r in runs.tolist():
+            for level in range(len(LOD_TOLERANCES)):
+                if (self, r, level) in self.cache:
+                    self.cache.put((self, r, level), build_run_path(
+                        self.store.coords, int(self.tiles.start[r]), int(self.tiles.end[r]), level))
+        self.update_bounds()
+        self.update()
+
+    def boundingRect(self):
+        # rezerva na tloušťku pera; kosmetické pero má šířku v pixelech, proto velkoryse
+        return self.bounds.adjusted(-2, -2, 2, 2)
+
+    def paint(self, painter, option, widget=None):
+        t = painter.worldTransform()
+        level = level_for_scale(abs(t.determinant()) ** 0.5)
+        exposed = option.exposedRect if isinstance(option, QStyleOptionGraphicsItem) else self.bounds
+        runs = self.tiles.query(exposed.left(), exposed.top(), exposed.right(), exposed.bottom())
+        painter.setPen(self.pen)
+        drawn = 0
+        with PROFILER.timer("TrackPathItem.paint"):
+            for r in runs.tolist():
+                path = self.cache.get((self, r, level))
+                if path is None:
+                    # dokud se běh na této úrovni nepostaví, kreslí se jiná hotová úroveň
+                    for other in range(len(LOD_TOLERANCES)):
+                        path = self.cache.peek((self, r, other))
+                        if path is not None:
+                            break
+                if path is not None:
+                    painter.drawPath(path)
+                    drawn += 1
+        PROFILER.tally("kreslené běhy", drawn)
+
+
+class TrackView(QGraphicsView):
+    # Pohled, který při zapnutém měření zaznamenává čas každého snímku a umí přes
+    # scénu nakreslit překryv s časy z posledního snímku a čítači
+    def __init__(self, scene, parent=None):
+        super().__init__(scene, parent)
+        self.show_overlay = False
+
+    def set_overlay(self, visible):
+        self.show_overlay = visible
+        # překryv leží mimo změněné oblasti, takže se musí kreslit celý výřez
+        self.setViewportUpdateMode(QGraphicsView.FullViewportUpdate if visible
+                                   else QGraphicsView.MinimalViewportUpdate)
+        self.viewport().update()
+
+    def paintEvent(self, event):
+        if not PROFILER.enabled:
+            super().paintEvent(event)
+            return
+        start = time.perf_counter()
+        super().paintEvent(event)
+        elapsed = time.perf_counter() - start
+        PROFILER.add("TrackView.paintEvent", elapsed, start)
+        PROFILER.end_frame(elapsed)
+
+    def overlay_lines(self):
+        avg, worst = PROFILER.frame_summary()
+        lines = [f"snímek: {avg*1000:.2f} ms průměr, {worst*1000:.2f} ms max"]
+        frame = sorted(PROFILER.last_frame.items(), key=lambda kv: -kv[1])
+        lines += [f"{name}: {t*1000:.2f} ms" for name, t in frame[:8]]
+        lines += [f"{name}: {value}" for name, value in sorted(PROFILER.counters.items())]
+        return lines
+
+    def drawForeground(self, painter, rect):
+        if not self.show_overlay:
+            return
+        lines = self.overlay_lines()
+        painter.save()
+        # kreslí se v souřadnicích výřezu, nezávisle na kameře
+        painter.resetTransform()
+        metrics = QFontMetrics(painter.font())
+        height = metrics.height()
+        width = max(metrics.horizontalAdvance(line) for line in lines)
+        painter.fillRect(QRectF(4, 4, width + 12, height * len(lines) + 8), QColor(0, 0, 0, 160))
+        painter.setPen(Qt.white)
+        for i, line in enumerate(lines):
+            painter.drawText(10, 8 + metrics.ascent() + i * height, line)
+        painter.restore()
+
+
+def projected_polylines(coords, tiles, runs, m):
+    # Body vybraných běhů promítnuté maticí m jako lomené čáry (N,2) v pixelech;
+    # čáry se dělí na hranicích běhů, v mezerách trati a u bodů mimo ořezový prostor
+    idx = tiles.run_points(runs)
+    if not len(idx):
+        return []
+    xy, visible = project_points(coords[idx], m)
+    # první bod segmentu, který neleží na konci předchozího, začíná novou čáru
+    gap = np.zeros(len(idx), dtype=bool)
+    first = idx % 3 == 0
+    gap[1:] = first[1:] & np.any(coords[idx[1:]] != coords[idx[:-1]], axis=1)
+    # navazující běhy (konec jednoho je začátek dalšího) tvoří jednu čáru
+    counts = 3 * (tiles.end[runs] - tiles.start[runs])
+    jump = tiles.start[runs[1:]] != tiles.end[runs[:-1]]
+    gap[np.cumsum(counts)[:-1][jump]] = True
+    gap[0] = True
+    cut = gap | ~visible
+    cut[1:] |= ~visible[:-1]
+    starts = np.flatnonzero(cut)
+    ends = np.append(starts[1:], len(idx))
+    keep = (ends - starts > 1) & visible[starts]
+    return [xy[a:b] for a, b in zip(starts[keep].tolist(), ends[keep].tolist())]
+
+
+class ProjectionView(QWidget):
+    # Boční (profil) nebo perspektivní pohled na tratě z kamery editoru. Matice
+    # pohledu se počítá jen při změně kamery; promítnuté čáry se drží pro každou
+    # trať a přepočítají se, jen když se změní kamera nebo body tratě (store.version)
+    def __init__(self, editor, mode="profile"):
+        super().__init__(editor)
+        self.editor = editor
+        self.mode = mode
+        self.exaggeration = 1.0
+        self.camera_key = None
+        self.matrix = None
+        self.roi = None
+        self.projected = {}     # id(store) -> (klíč kamery, verze, [QPolygonF])
+        self.pen = QPen(Qt.black)
+        self.pen.setCosmetic(True)
+        self.setMinimumHeight(120)
+
+    def set_mode(self, mode):
+        self.mode = mode
+        self.camera_changed()
+
+    def camera_changed(self):
+        # matice se přepočítá až při kreslení, a jen pokud se kamera opravdu změnila
+        self.update()
+
+    def update_camera(self):
+        e = self.editor
+        key = (self.mode, e.cx, e.cy, e.cz, e.yaw, e.zoom, self.width(), self.height(), self.exaggeration)
+        if key == self.camera_key:
+            return
+        if self.mode == "profile":
+            self.matrix, self.roi = profile_camera(e.cx, e.cy, e.cz, e.yaw, e.zoom, self.width(), self.height(),
+                                                   self.exaggeration)
+        else:
+            self.matrix, self.roi = perspective_camera(e.cx, e.cy, e.cz, e.yaw, e.zoom, self.width(),
+                                                       self.height())
+        self.camera_key = key
+
+    @PROFILER.timed()
+    def polylines(self, store):
+        cached = self.projected.get(id(store))
+        if cached is not None and cached[0] == self.camera_key and cached[1] == store.version:
+            return cached[2]
+        tiles = store.tile_index()
+        runs = tiles.query(*self.roi)
+        polys = [polygon_from_xy(xy) for xy in projected_polylines(store.coords, tiles, runs, self.matrix)]
+        self.projected[id(store)] = (self.camera_key, store.version, polys)
+        return polys
+
+    def paintEvent(self, event):
+        self.update_camera()
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), Qt.white)
+        stores = [d["store"] for d in self.editor.tracks.values() if d["visible"]]
+        # zahodí promítnutí tratí, které už nejsou načtené nebo viditelné
+        alive = {id(s) for s in stores}
+        for k in [k for k in self.projected if k not in alive]:
+            del self.projected[k]
+        if self.mode == "profile":
+            # vodorovná čára ve výšce kamery (Q/E)
+            painter.setPen(QPen(QColor(120, 120, 255), 1, Qt.DashLine))
+            painter.drawLine(0, self.height() // 2, self.width(), self.height() // 2)
+        painter.setPen(self.pen)
+        for store in stores:
+            for poly in self.polylines(store):
+                painter.drawPolyline(poly)
+        selected = self.editor.selected_points
+        if selected:
+            pts = np.array([(p.x, p.y, p.z) for p in selected])
+            xy, visible = project_points(pts, self.matrix)
+            painter.setPen(QPen(Qt.green, 5))
+            for x, y in xy[visible].tolist():
+                painter.drawPoint(QPointF(x, y))
+        painter.setPen(Qt.darkGray)
+        label = "Profil" if self.mode == "profile" else "Perspektiva"
+        painter.drawText(8, 16, f"{label}  z = {self.editor.cz:.1f}")
+        painter.end()
+
+    # myš v tomto pohledu nic nevybírá; kolečko (zoom) projde do editoru
+    def mousePressEvent(self, event):
+        event.accept()
+
+    def mouseMoveEvent(self, event):
+        event.accept()
+
+    def mouseReleaseEvent(self, event):
+        event.accept()
+
+    def mouseDoubleClickEvent(self, event):
+        event.accept()
@@ -1,7 +1,111 @@
-from PyQt5.QtWidgets import (QWidget, QTableWidget, QTableWidgetItem, QMenu, QVBoxLayout, QHBoxLayout,
-                             QPushButton, QDockWidget, QMessageBox)
-from PyQt5.QtCore import Qt
+import numpy as np
+from PyQt5.QtWidgets import (QWidget, QTableView, QMenu, QVBoxLayout, QHBoxLayout, QLineEdit,
+                             QPushButton, QDockWidget, QAbstractItemView)
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QVariant
 from point_edit_dialog import PointEditDialog
+from trackcore.profiling import PROFILER
+
+COLUMNS = ["X", "Y", "Z", "Stanice", "Výhybka"]
+
+
+class TrackPointsModel(QAbstractTableModel):
+    # Tabulka čte přímo z TrackStore; řádek je jen index do pole bodů,
+    # texty buněk vznikají až při vykreslení viditelných řádků
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.store = None
+        self.rows = np.empty(0, dtype=np.intp)
+        self.row_of = np.empty(0, dtype=np.intp)
+        self.filter_text = ""
+        self.sort_key = None
+
+    def set_store(self, store):
+        self.beginResetModel()
+        self.store = store
+        self._rebuild_rows()
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return QVariant()
+        if orientation == Qt.Horizontal:
+            return COLUMNS[section]
+        return str(int(self.rows[section]) + 1)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole or not index.isValid():
+            return QVariant()
+        i = self.rows[index.row()]
+        col = index.column()
+        if col < 3:
+            return str(float(self.store.coords[i, col]))
+        ids = self.store.point_station if col == 3 else self.store.point_switch
+        return self.store.names.lookup(ids[i]) or ""
+
+    def point_at(self, row):
+        return self.store.point(int(self.rows[row]))
+
+    def points_changed(self, store, indices):
+        if store is not self.store or len(indices) == 0:
+            return
+        rows = self.row_of[np.asarray(indices, dtype=np.intp)]
+        rows = rows[rows >= 0]
+        if len(rows):
+            self.dataChanged.emit(self.index(int(rows.min()), 0), self.index(int(rows.max()), len(COLUMNS) - 1))
+
+    def set_filter(self, text):
+        self.beginResetModel()
+        self.filter_text = text.strip().lower()
+        self._rebuild_rows()
+        self.endResetModel()
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        self.layoutAboutToBeChanged.emit()
+        self.sort_key = (column, order) if column >= 0 else None
+        self._rebuild_rows()
+        self.layoutChanged.emit()
+
+    @PROFILER.timed()
+    def _rebuild_rows(self):
+        if self.store is None:
+            self.rows = np.empty(0, dtype=np.intp)
+            self.row_of = np.empty(0, dtype=np.intp)
+            return
+        n = self.store.n_points
+        rows = np.arange(n)
+        if self.filter_text:
+            # filtr podle názvu stanice nebo výhybky (podřetězec, bez ohledu na velikost písmen)
+            names = self.store.names.names
+            hits = np.array([i for i, name in enumerate(names) if name and self.filter_text in name.lower()],
+                            dtype=np.int32)
+            mask = np.isin(self.store.point_station, hits) | np.isin(self.store.point_switch, hits)
+            rows = rows[mask]
+        if self.sort_key is not None:
+            column, order = self.sort_key
+            rows = rows[np.argsort(self._sort_values(column)[rows], kind="stable")]
+            if order == Qt.DescendingOrder:
+                rows = rows[::-1]
+        self.rows = rows
+        self.row_of = np.full(n, -1, dtype=np.intp)
+        self.row_of[rows] = np.arange(len(rows))
+
+    def _sort_values(self, column):
+        if column < 3:
+            return self.store.coords[:, column]
+        # id názvů převedeme na pořadí podle abecedy; body bez názvu jdou na začátek
+        names = self.store.names.names
+        rank = np.zeros(len(names), dtype=np.int64)
+        named = sorted(range(1, len(names)), key=lambda i: names[i])
+        rank[named] = np.arange(1, len(named) + 1)
+        ids = self.store.point_station if column == 3 else self.store.point_switch
+        return rank[ids]
+
 
 class TrackPointsPanel(QDockWidget):
     def __init__(self, parent=None):
@@ -9,65 +113,56 @@ class TrackPointsPanel(QDockWidget):
         self.setAllowedAreas(Qt.LeftDockWidgetArea | Qt.RightDockWidgetArea | Qt.BottomDockWidgetArea)
         self.parent = parent
         self.main_widget = QWidget()
-        self.table = QTableWidget()
-        self.table.setColumnCount(5)
-        self.table.setHorizontalHeaderLabels(["X","Y","Z","Stanice","Výhybka"])
+        self.model = TrackPointsModel(self)
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        # bez indikátoru zůstává původní pořadí bodů, řadí se až po kliknutí na záhlaví
+        self.table.horizontalHeader().setSortIndicator(-1, Qt.AscendingOrder)
+        self.table.setSortingEnabled(True)
+        # pevná výška řádků, aby pohled nemusel měřit obsah všech řádků
+        self.table.verticalHeader().setDefaultSectionSize(20)
         self.table.setContextMenuPolicy(Qt.CustomContextMenu)
         self.table.customContextMenuRequested.connect(self.on_context_menu)
 
+        self.filter_edit = QLineEdit()
+        self.filter_edit.setPlaceholderText("Filtr stanice / výhybky")
+        self.filter_edit.textChanged.connect(self.model.set_filter)
+
         layout = QVBoxLayout()
         btn_layout = QHBoxLayout()
         self.btn_center = QPushButton("Zaměřit na vybraný bod")
         self.btn_center.clicked.connect(self.select_point)
 
         btn_layout.addWidget(self.btn_center)
+        layout.addWidget(self.filter_edit)
         layout.addWidget(self.table)
         layout.addLayout(btn_layout)
         self.main_widget.setLayout(layout)
         self.setWidget(self.main_widget)
 
-        self.points = []  # current list of points
-
+    @PROFILER.timed()
     def load_points(self, segments):
-        self.points.clear()
-        for seg in segments:
-            for p in seg.get_points():
-                self.points.append(p)
-
-        self.table.setRowCount(len(self.points))
-        for i, p in enumerate(self.points):
-            self.table.setItem(i,0,QTableWidgetItem(str(p.x)))
-            self.table.setItem(i,1,QTableWidgetItem(str(p.y)))
-            self.table.setItem(i,2,QTableWidgetItem(str(p.z)))
-            self.table.setItem(i,3,QTableWidgetItem(p.station_name if p.station_name else ""))
-            self.table.setItem(i,4,QTableWidgetItem(p.switch_name if p.switch_name else ""))
+        self.model.set_store(segments.store)
 
     def on_context_menu(self, pos):
-        item = self.table.itemAt(pos)
-        if item:
-            row = item.row()
-            p = self.points[row]
+        index = self.table.indexAt(pos)
+        if index.isValid():
+            p = self.model.point_at(index.row())
 
             menu = QMenu(self)
             act_info = menu.addAction("Nastavení bodu")
             chosen = menu.exec_(self.table.mapToGlobal(pos))
             if chosen == act_info:
-                dlg = PointEditDialog(p, self)
-                if dlg.exec_():
-                    self.table.setItem(row,0,QTableWidgetItem(str(p.x)))
-                    self.table.setItem(row,1,QTableWidgetItem(str(p.y)))
-                    self.table.setItem(row,2,QTableWidgetItem(str(p.z)))
-                    self.table.setItem(row,3,QTableWidgetItem(p.station_name if p.station_name else ""))
-                    self.table.setItem(row,4,QTableWidgetItem(p.switch_name if p.switch_name else ""))
-                    if self.parent:
-                        self.parent.update_segments_after_edit(p)
-                        self.parent.redraw_scene()
+                if self.parent:
+                    self.parent.edit_point(p)
+                else:
+                    PointEditDialog(p, self).exec_()
 
     def select_point(self):
-        items = self.table.selectedItems()
-        if not items:
+        rows = self.table.selectionModel().selectedRows() if self.table.selectionModel() else []
+        if not rows:
             return
-        row = items[0].row()
-        p = self.points[row]
+        p = self.model.point_at(rows[0].row())
         if self.parent:
             self.parent.center_on_point(p)
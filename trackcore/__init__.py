@@ -0,0 +1,12 @@
+# Jádro editoru tratí bez závislosti na Qt: data, čtení/zápis souborů a geometrie
+from .track_data import NAMES, NameTable, TrackStore, TrackPoint, CurveSegment
+from .dat_parser import DatParseError, ParsedDat, parse_dat, parse_dat_text
+from .dat_writer import save_store
+from .track_set import read_track_entries, expand_inputs
+from .formats import read_track, write_track
+from .ops import translate, merge, check_store
+from .curves import arc_lengths, resample
+from .topology import TrackGraph, Route
+from .tiles import TileIndex
+from .validation import Issue, Validator, check_segments
+from .name_index import NameIndex, NameHit
@@ -0,0 +1,99 @@
+import math
+import numpy as np
+
+
+def transform_xy(coords, m11, m12, m21, m22, dx, dy):
+    # Afinní transformace v konvenci QTransform (řádkové vektory) pro pole (N,3)
+    m = np.array([[m11, m12],
+                  [m21, m22]])
+    return coords[:, :2] @ m + np.array([dx, dy])
+
+
+# Matice 4×4 pro 3D pohledy ve stejné konvenci řádkových vektorů: [x y z 1] @ M.
+# Výsledek view @ projekce @ výřez dává po vydělení w přímo pixely widgetu
+
+def view_matrix(eye, target, up=(0.0, 0.0, 1.0)):
+    # Světové souřadnice -> souřadnice kamery, kamera se dívá ve směru -z
+    eye = np.asarray(eye, dtype=np.float64)
+    f = np.asarray(target, dtype=np.float64) - eye
+    f /= np.linalg.norm(f)
+    s = np.cross(f, up)
+    s /= np.linalg.norm(s)
+    u = np.cross(s, f)
+    m = np.eye(4)
+    m[:3, 0] = s
+    m[:3, 1] = u
+    m[:3, 2] = -f
+    m[3, :3] = -eye @ m[:3, :3]
+    return m
+
+
+def perspective_matrix(fov_y, aspect, near, far):
+    f = 1.0 / math.tan(math.radians(fov_y) / 2)
+    m = np.zeros((4, 4))
+    m[0, 0] = f / aspect
+    m[1, 1] = f
+    m[2, 2] = (far + near) / (near - far)
+    m[2, 3] = -1.0
+    m[3, 2] = 2.0 * far * near / (near - far)
+    return m
+
+
+def orthographic_matrix(left, right, bottom, top, near, far):
+    m = np.eye(4)
+    m[0, 0] = 2.0 / (right - left)
+    m[1, 1] = 2.0 / (top - bottom)
+    m[2, 2] = -2.0 / (far - near)
+    m[3, 0] = -(right + left) / (right - left)
+    m[3, 1] = -(top + bottom) / (top - bottom)
+    m[3, 2] = -(far + near) / (far - near)
+    return m
+
+
+def viewport_matrix(width, height):
+    # Normalizované souřadnice [-1, 1] -> pixely, osa y dolů
+    m = np.eye(4)
+    m[0, 0] = width / 2.0
+    m[1, 1] = -height / 2.0
+    m[3, 0] = width / 2.0
+    m[3, 1] = height / 2.0
+    return m
+
+
+def project_points(coords, m):
+    # Pixely (N,2) a maska bodů mezi blízkou a vzdálenou rovinou
+    h = coords @ m[:3] + m[3]
+    w = h[:, 3]
+    visible = (w > 1e-9) & (np.abs(h[:, 2]) <= w)
+    xy = h[:, :2] / np.where(visible, w, 1.0)[:, None]
+    return xy, visible
+
+
+def profile_camera(cx, cy, cz, yaw, zoom, width, height, exaggeration=1.0):
+    # Boční pohled na výřez shora: vodorovná osa je osa x horního pohledu (směr yaw),
+    # svislá je výška kolem cz; hloubka je omezená na čtverec výřezu
+    half = max(width, height) / (2.0 * zoom)
+    right = np.array([math.cos(math.radians(yaw)), math.sin(math.radians(yaw)), 0.0])
+    forward = np.array([-right[1], right[0], 0.0])
+    target = np.array([cx, cy, cz])
+    view = view_matrix(target - forward * half, target)
+    w = width / (2.0 * zoom)
+    h = height / (2.0 * zoom * exaggeration)
+    proj = orthographic_matrix(-w, w, -h, h, 0.0, 2.0 * half)
+    roi = (cx - half, cy - half, cx + half, cy + half)
+    return view @ proj @ viewport_matrix(width, height), roi
+
+
+def perspective_camera(cx, cy, cz, yaw, zoom, width, height, pitch=30.0, fov=60.0):
+    # Perspektiva za cílem (cx, cy, cz) ve směru jízdy (W), skloněná o pitch stupňů;
+    # vzdálenost od cíle odpovídá šířce výřezu shora při stejném přiblížení
+    dist = max(width, height) / zoom * 0.75
+    forward = np.array([math.cos(math.radians(yaw)), math.sin(math.radians(yaw)), 0.0])
+    target = np.array([cx, cy, cz])
+    eye = (target - forward * dist * math.cos(math.radians(pitch)) +
+           np.array([0.0, 0.0, dist * math.sin(math.radians(pitch))]))
+    near = dist * 0.01
+    far = dist * 20.0
+    proj = perspective_matrix(fov, width / max(height, 1), near, far)
+    roi = (cx - far, cy - far, cx + far, cy + far)
+    return view_matrix(eye, target) @ proj @ viewport_matrix(width, height), roi
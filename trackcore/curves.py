@@ -0,0 +1,151 @@
+import numpy as np
+
+from .geometry import segment_runs
+from .track_data import TrackStore
+from .profiling import PROFILER
+
+# Segment p1-p2-p3 je kvadratická Bézierova křivka, která prochází p1 (t=0),
+# p2 (t=0.5) a p3 (t=1). Rychlost |B'(t)| je odmocnina z kvadratického polynomu
+# v t, délka se z ní počítá Gaussovou–Legendreovou kvadraturou: na téměř rovných
+# segmentech stačí 4 uzly, silně zakřivené se přepočítají s 16 uzly
+GL_FAST = np.polynomial.legendre.leggauss(4)
+GL_FINE = np.polynomial.legendre.leggauss(16)
+# Poměr |a|²/|b|², od kterého se segment počítá jemnou kvadraturou
+BEND_LIMIT = 1e-2
+BLOCK = 1 << 17
+
+
+def segments_of(coords):
+    n = len(coords) // 3
+    return coords[:3*n].reshape(n, 3, 3)
+
+
+def control_points(seg):
+    # řídicí bod C tak, aby křivka v t=0.5 procházela p2
+    return 2.0*seg[:, 1] - 0.5*(seg[:, 0] + seg[:, 2])
+
+
+def evaluate(seg, t):
+    # body křivek (S,3,3) v parametrech t (T,) -> (S,T,3)
+    t = np.asarray(t, dtype=np.float64)[None, :, None]
+    c = control_points(seg)[:, None]
+    p1 = seg[:, None, 0]
+    p3 = seg[:, None, 2]
+    u = 1.0 - t
+    return u*u*p1 + 2.0*u*t*c + t*t*p3
+
+
+def speed_poly(seg):
+    # |B'(t)|² = A t² + B t + C pro B'(t) = 4 a t + b, kde a = p1 - 2 p2 + p3
+    # a b = 3(p2 - p1) - (p3 - p2)
+    d = np.diff(seg, axis=1)
+    a = d[:, 1] - d[:, 0]
+    b = 3.0*d[:, 0] - d[:, 1]
+    return (16.0*np.einsum("ij,ij->i", a, a), 8.0*np.einsum("ij,ij->i", a, b),
+            np.einsum("ij,ij->i", b, b))
+
+
+def gauss_length(A, B, C, rule):
+    nodes, weights = rule
+    out = np.zeros(len(A))
+    for x, w in zip(nodes.tolist(), weights.tolist()):
+        t = (x + 1.0) / 2.0
+        out += w / 2.0 * np.sqrt(np.maximum((A*t + B)*t + C, 0.0))
+    return out
+
+
+@PROFILER.timed()
+def arc_lengths(coords, segs=None):
+    # Délky oblouků vybraných (nebo všech) segmentů trati
+    seg = segments_of(coords)
+    if segs is not None:
+        seg = seg[segs]
+    out = np.empty(len(seg))
+    for lo in range(0, len(seg), BLOCK):
+        A, B, C = speed_poly(seg[lo:lo+BLOCK])
+        length = gauss_length(A, B, C, GL_FAST)
+        bent = np.flatnonzero(A > BEND_LIMIT * C)
+        if len(bent):
+            length[bent] = gauss_length(A[bent], B[bent], C[bent], GL_FINE)
+        out[lo:lo+BLOCK] = length
+    return out
+
+
+def refresh_lengths(store):
+    # Před uložením: segmentům s posunutými body a segmentům bez délky spočítá
+    # skutečnou délku; segmenty změněné jen v názvech si délku ze souboru ponechají
+    segs = np.flatnonzero(store.coords_dirty | (store.lengths <= 0))
+    if len(segs):
+        store.lengths[segs] = arc_lengths(store.coords, segs)
+        store.dirty[segs] = True
+    return segs
+
+
+def run_curves(coords, per_segment=4):
+    # Souvislé úseky trati jako lomené čáry po křivkách (per_segment úseček na segment)
+    seg = segments_of(coords)
+    t = np.linspace(0.0, 1.0, per_segment + 1)[:-1]
+    return [np.concatenate((evaluate(seg[start:end], t).reshape(-1, 3), seg[end-1:end, 2]))
+            for start, end in segment_runs(coords)]
+
+
+def arc_to_param(A, B, C, lengths, local):
+    # Parametr t, ve kterém délka oblouku od začátku segmentu dosáhne local;
+    # Newtonova metoda, délka do t je t * kvadratura polynomu P(t u) přes u v [0,1]
+    t = np.clip(np.divide(local, lengths, out=np.zeros_like(local), where=lengths > 0), 0.0, 1.0)
+    for _ in range(4):
+        s = t * gauss_length(A*t*t, B*t, C, GL_FAST)
+        v = np.sqrt(np.maximum((A*t + B)*t + C, 0.0))
+        t = np.clip(t - np.divide(s - local, v, out=np.zeros_like(s), where=v > 0), 0.0, 1.0)
+    return t
+
+
+@PROFILER.timed()
+def resample(store, spacing):
+    # Převzorkuje každý souvislý úsek trati podél křivek tak, aby sousední body
+    # byly od sebe nejvýš spacing (měřeno po oblouku). Nové segmenty přebírají
+    # názvy a příznak původního segmentu, ve kterém leží jejich prostřední bod
+    if spacing <= 0:
+        raise ValueError("Rozestup musí být kladný")
+    seg = segments_of(store.coords)
+    lengths = arc_lengths(store.coords)
+    A, B, C = speed_poly(seg)
+    out_coords = []
+    out_src = []
+    for start, end in segment_runs(store.coords):
+        cum = np.concatenate(([0.0], np.cumsum(lengths[start:end])))
+        total = cum[-1]
+        k = max(1, int(np.ceil(total / (2.0 * spacing))))
+        s = np.linspace(0.0, total, 2*k + 1)
+        s_seg = np.clip(np.searchsorted(cum, s, side="right") - 1, 0, end - start - 1)
+        g = start + s_seg
+        t = arc_to_param(A[g], B[g], C[g], lengths[g], s - cum[s_seg])
+        pts = evaluate_at(seg[start:end], s_seg, t)
+        new = np.empty((k, 3, 3))
+        new[:, 0] = pts[0:-1:2]
+        new[:, 1] = pts[1::2]
+        new[:, 2] = pts[2::2]
+        out_coords.append(new.reshape(-1, 3))
+        out_src.append(start + s_seg[1::2])
+    if not out_coords:
+        return TrackStore(np.empty((0, 3)), name=store.name, names=store.names)
+    coords = np.concatenate(out_coords)
+    src = np.concatenate(out_src)
+    seg_station = store.seg_station[src]
+    seg_switch = store.seg_switch[src]
+    out = TrackStore(coords, seg_station=seg_station, seg_switch=seg_switch,
+                     lengths=arc_lengths(coords), flags=store.flags[src],
+                     name=store.name, names=store.names)
+    if store.flag_tokens:
+        out.flag_tokens = {k: store.flag_tokens[s] for k, s in enumerate(src.tolist()) if s in store.flag_tokens}
+    out.structure_dirty = True
+    return out
+
+
+def evaluate_at(seg, s_seg, t):
+    # jeden bod na segment: segment s_seg[i] v parametru t[i]
+    sel = seg[s_seg]
+    c = control_points(sel)
+    t = t[:, None]
+    u = 1.0 - t
+    return u*u*sel[:, 0] + 2.0*u*t*c + t*t*sel[:, 2]
@@ -0,0 +1,214 @@
+import os
+import warnings
+import numpy as np
+
+
+class DatParseError(ValueError):
+    def __init__(self, path, lineno, message):
+        super().__init__(f"{path}:{lineno}: {message}")
+        self.path = path
+        self.lineno = lineno
+        self.message = message
+
+    def __reduce__(self):
+        # kvůli přenosu z procesů při paralelním načítání
+        return (DatParseError, (self.path, self.lineno, self.message))
+
+
+class ParsedDat:
+    # Výsledek parsování jednoho .dat souboru: pole po segmentech + chybné řádky.
+    # Názvy jsou jako lokální tabulka (0 = bez názvu) a indexy do ní, aby šly uložit do cache
+    def __init__(self, coords, lengths, flags, name_table, station_idx, switch_idx, errors, linenos):
+        self.coords = coords            # (3*S, 3) float64
+        self.lengths = lengths          # (S,) float64
+        self.flags = flags              # (S,) int32
+        self.name_table = name_table    # list, name_table[0] je None
+        self.station_idx = station_idx  # (S,) int32
+        self.switch_idx = switch_idx    # (S,) int32
+        self.errors = errors            # list DatParseError
+        self.linenos = linenos          # (S,) čísla řádků v souboru
+        self.source_stat = None         # (velikost, mtime_ns) čteného souboru, pokud je známé
+        self.flag_tokens = {}           # segment -> nečíselný příznak ze souboru (zapisuje se zpět)
+
+    @classmethod
+    def from_name_lists(cls, coords, lengths, flags, stations, switches, errors, linenos):
+        table = [None]
+        ids = {}
+
+        def index(names):
+            out = np.zeros(len(names), dtype=np.int32)
+            for i, name in enumerate(names):
+                if name:
+                    if name not in ids:
+                        ids[name] = len(table)
+                        table.append(name)
+                    out[i] = ids[name]
+            return out
+
+        return cls(coords, lengths, flags, table, index(stations), index(switches), errors, linenos)
+
+    @property
+    def n_segments(self):
+        return len(self.lengths)
+
+    @property
+    def stations(self):
+        return [self.name_table[i] for i in self.station_idx.tolist()]
+
+    @property
+    def switches(self):
+        return [self.name_table[i] for i in self.switch_idx.tolist()]
+
+
+def parse_dat(path):
+    with open(path, "rb") as f:
+        st = os.fstat(f.fileno())
+        data = f.read()
+    parsed = parse_dat_text(data.decode("utf-8"), path)
+    parsed.source_stat = (st.st_size, st.st_mtime_ns)
+    return parsed
+
+
+def parse_dat_text(text, path="<text>"):
+    raw = text.splitlines()
+    lines = [line for line in raw if line.startswith("c ")]
+    if len(lines) == len(raw):
+        linenos = np.arange(1, len(raw) + 1, dtype=np.int64)
+    else:
+        # hlavičky, prázdné řádky nebo odsazené záznamy – projdeme pomaleji se strip()
+        lines = []
+        linenos = []
+        for lineno, line in enumerate(raw, 1):
+            if not line.startswith("c "):
+                line = line.strip()
+                if not line.startswith("c "):
+                    continue
+            lines.append(line)
+            linenos.append(lineno)
+        linenos = np.array(linenos, dtype=np.int64)
+
+    parsed = _parse_fast(lines, linenos)
+    if parsed is None:
+        parsed = _parse_checked(lines, linenos.tolist(), path)
+    return parsed
+
+
+def _parse_fast(lines, linenos):
+    # Čistý soubor: souřadnice, délku i příznak převede np.loadtxt v C najednou;
+    # po jednom se dělí jen řádky, které mají za příznakem ještě názvy
+    if not lines:
+        return None
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            table = np.loadtxt(lines, usecols=range(1, 12), comments=None, ndmin=2)
+    except ValueError:
+        return None
+    stations = [None] * len(lines)
+    switches = [None] * len(lines)
+    named = [i for i, line in enumerate(lines) if line.count(" ") > 11 or "\t" in line]
+    for i in named:
+        for t in lines[i].split()[12:]:
+            if t.startswith("8"):
+                switches[i] = t[1:]
+            else:
+                stations[i] = t
+    return ParsedDat.from_name_lists(table[:, :9].reshape(-1, 3), table[:, 9].copy(), table[:, 10].astype(np.int32),
+                     stations, switches, [], linenos)
+
+
+def _parse_checked(lines, linenos, path):
+    # Pomalejší cesta pro soubory s vadnými řádky; ty se hlásí s číslem řádku
+    rows = []
+    row_linenos = []
+    errors = []
+    for line, lineno in zip(lines, linenos):
+        parts = line.split(None, 10)
+        if len(parts) < 11:
+            errors.append(DatParseError(path, lineno, "málo polí na řádku 'c'"))
+            continue
+        rows.append(parts)
+        row_linenos.append(lineno)
+    linenos = row_linenos
+
+    coords, bad = _parse_coords(rows)
+    if bad:
+        bad_set = set(bad)
+        for i in bad:
+            errors.append(DatParseError(path, linenos[i], "neplatné souřadnice"))
+        rows = [r for i, r in enumerate(rows) if i not in bad_set]
+        linenos = [n for i, n in enumerate(linenos) if i not in bad_set]
+        errors.sort(key=lambda e: e.lineno)
+
+    flag_tokens = {}
+    lengths, flags, stations, switches = _parse_tails(rows, linenos, path, errors, flag_tokens)
+    parsed = ParsedDat.from_name_lists(coords.reshape(-1, 3), lengths, flags, stations, switches, errors,
+                                       np.array(linenos, dtype=np.int64))
+    parsed.flag_tokens = flag_tokens
+    return parsed
+
+
+def _parse_coords(rows):
+    # Všech devět souřadnic všech řádků se převede jedním voláním v C;
+    # jen když počet nesedí, dohledáváme vadné řádky po jednom
+    if not rows:
+        return np.empty((0, 9)), []
+    flat = " ".join([" ".join(r[1:10]) for r in rows])
+    try:
+        # starší NumPy při nečíselném tokenu jen varuje a vrátí kratší pole
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", DeprecationWarning)
+            values = np.fromstring(flat, sep=" ")
+    except ValueError:
+        values = None
+    if values is not None and len(values) == 9 * len(rows):
+        return values.reshape(-1, 9), []
+
+    good = []
+    bad = []
+    for i, r in enumerate(rows):
+        try:
+            good.append([float(v) for v in r[1:10]])
+        except ValueError:
+            bad.append(i)
+    return np.array(good, dtype=np.float64).reshape(-1, 9), bad
+
+
+def _parse_tails(rows, linenos, path, errors, flag_tokens):
+    # Konec řádku: délka, příznak a volitelně stanice / 8výhybka. Nečíselný příznak
+    # se nahlásí a v poli je 0, ale původní text se drží ve flag_tokens
+    n = len(rows)
+    length_strs = ["0"] * n
+    flag_strs = ["0"] * n
+    stations = [None] * n
+    switches = [None] * n
+    for i, r in enumerate(rows):
+        tail = r[10].split()
+        if len(tail) < 2:
+            continue
+        length_strs[i] = tail[0]
+        flag_strs[i] = tail[1]
+        for t in tail[2:]:
+            if t.startswith("8"):
+                switches[i] = t[1:]
+            else:
+                stations[i] = t
+    lengths = _to_float(length_strs, linenos, path, errors, "neplatná délka")
+    flags = _to_float(flag_strs, linenos, path, errors, "neplatný příznak", flag_tokens).astype(np.int32)
+    return lengths, flags, stations, switches
+
+
+def _to_float(strs, linenos, path, errors, message, raw=None):
+    try:
+        return np.array(strs, dtype=np.float64)
+    except ValueError:
+        out = np.zeros(len(strs))
+        for i, v in enumerate(strs):
+            try:
+                out[i] = float(v)
+            except ValueError:
+                errors.append(DatParseError(path, linenos[i], f"{message} '{v}'"))
+                if raw is not None:
+                    raw[i] = v
+        errors.sort(key=lambda e: e.lineno)
+        return out
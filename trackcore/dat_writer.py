@@ -0,0 +1,126 @@
+import os
+import uuid
+import hashlib
+import numpy as np
+
+from .curves import refresh_lengths
+from .dat_parser import DatParseError
+from .profiling import PROFILER
+
+# Velikost bufferu pro zápis; soubor se skládá z bloků a zapisuje najednou
+WRITE_BUFFER = 1 << 20
+
+
+def format_lines(store, segs):
+    # Řádky 'c' pro vybrané segmenty ve stejném tvaru, jaký vždy zapisoval save_changes
+    segs = np.asarray(segs, dtype=np.intp)
+    rows = store.coords[:3*store.n_segments].reshape(-1, 9)[segs].tolist()
+    lengths = store.lengths[segs].tolist()
+    flags = store.flags[segs].tolist()
+    if store.flag_tokens:
+        flags = [store.flag_tokens.get(s, f) for s, f in zip(segs.tolist(), flags)]
+    lookup = store.names.lookup
+    stations = store.seg_station[segs].tolist()
+    switches = store.seg_switch[segs].tolist()
+    lines = []
+    for row, length, flag, st, sw in zip(rows, lengths, flags, stations, switches):
+        line = "c " + " ".join(map(str, row)) + f" {length} {flag}"
+        if st:
+            line += " " + lookup(st)
+        if sw:
+            line += " 8" + lookup(sw)
+        lines.append(line)
+    return lines
+
+
+def write_atomic(path, chunks):
+    # Zápis do dočasného souboru ve stejném adresáři a pak os.replace: po pádu
+    # zůstane buď celý starý, nebo celý nový soubor
+    directory = os.path.dirname(os.path.abspath(path))
+    tmp = os.path.join(directory, f".{os.path.basename(path)}.{uuid.uuid4().hex[:8]}.tmp")
+    digest = hashlib.sha1()
+    try:
+        with open(tmp, "wb", buffering=WRITE_BUFFER) as f:
+            for chunk in chunks:
+                digest.update(chunk)
+                f.write(chunk)
+            f.flush()
+            os.fsync(f.fileno())
+        if os.path.exists(path):
+            try:
+                os.chmod(tmp, os.stat(path).st_mode & 0o7777)
+            except OSError:
+                pass
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+    st = os.stat(path)
+    return st.st_size, st.st_mtime_ns, digest.hexdigest()
+
+
+def full_chunks(store):
+    block = 65536
+    for lo in range(0, store.n_segments, block):
+        segs = np.arange(lo, min(lo + block, store.n_segments))
+        yield ("\n".join(format_lines(store, segs)) + "\n").encode("utf-8")
+
+
+def splice_chunks(store, data):
+    # Nezměněné řádky se kopírují z původního souboru beze změny, formátují se
+    # jen upravené segmenty; vrací None, pokud původní soubor neodpovídá
+    buf = np.frombuffer(data, dtype=np.uint8)
+    starts = np.concatenate(([0], np.flatnonzero(buf == 10) + 1))
+    dirty = np.flatnonzero(store.dirty)
+    linenos = store.source_linenos[dirty]
+    if len(linenos) and linenos.max() > len(starts):
+        return None
+    new_lines = format_lines(store, dirty)
+    chunks = []
+    pos = 0
+    for lineno, text in zip(linenos.tolist(), new_lines):
+        a = int(starts[lineno - 1])
+        b = int(starts[lineno]) if lineno < len(starts) else len(data)
+        old = data[a:b]
+        if not old.lstrip().startswith(b"c "):
+            return None
+        ending = b"\r\n" if old.endswith(b"\r\n") else (b"\n" if old.endswith(b"\n") else b"")
+        chunks.append(data[pos:a])
+        chunks.append(text.encode("utf-8") + ending)
+        pos = b
+    chunks.append(data[pos:])
+    return chunks
+
+
+@PROFILER.timed()
+def save_store(path, store):
+    # Uloží trať do .dat; když se změnily jen hodnoty některých segmentů a soubor
+    # na disku je stále ten načtený, přepíše jen jejich řádky
+    refresh_lengths(store)
+    chunks = None
+    spliced = False
+    if not store.structure_dirty and store.source_linenos is not None and store.source_stat is not None:
+        try:
+            st = os.stat(path)
+            if (st.st_size, st.st_mtime_ns) == tuple(store.source_stat):
+                with open(path, "rb") as f:
+                    chunks = splice_chunks(store, f.read())
+                spliced = chunks is not None
+        except OSError:
+            chunks = None
+    if chunks is None:
+        chunks = full_chunks(store)
+    size, mtime_ns, sha1 = write_atomic(path, chunks)
+    if not spliced:
+        # celý soubor je nově zapsaný z paměti, chybné řádky v něm už nejsou kromě
+        # zachovaných nečíselných příznaků; při přepsání jen upravených řádků zůstávají
+        # i s čísly řádků
+        store.source_linenos = np.arange(1, store.n_segments + 1, dtype=np.int64)
+        store.parse_errors = [DatParseError(path, s + 1, f"neplatný příznak '{token}'")
+                              for s, token in sorted(store.flag_tokens.items())]
+    store.source_stat = (size, mtime_ns)
+    store.mark_clean()
+    return size, mtime_ns, sha1
@@ -0,0 +1,102 @@
+import os
+import csv
+import numpy as np
+
+from .dat_parser import parse_dat
+from .dat_writer import save_store, write_atomic
+from .track_data import TrackStore
+
+FORMATS = (".dat", ".npz", ".csv")
+CSV_HEADER = ["x1", "y1", "z1", "x2", "y2", "z2", "x3", "y3", "z3",
+              "length", "flag", "station", "switch"]
+
+
+def track_format(path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in FORMATS:
+        raise ValueError(f"Nepodporovaný formát: {path}")
+    return ext
+
+
+def read_track(path, name=None, names=None):
+    # Vrací (store, chyby parsování); chyby mají smysl jen u .dat
+    ext = track_format(path)
+    if ext == ".dat":
+        parsed = parse_dat(path)
+        return TrackStore.from_parsed(parsed, name=name, names=names), parsed.errors
+    if ext == ".npz":
+        return read_npz(path, name, names), []
+    return read_csv(path, name, names), []
+
+
+def write_track(path, store):
+    ext = track_format(path)
+    if ext == ".dat":
+        save_store(path, store)
+    elif ext == ".npz":
+        write_npz(path, store)
+    else:
+        write_csv(path, store)
+
+
+def write_npz(path, store):
+    # Názvy se ukládají jako lokální tabulka, id ve sdílené tabulce se mezi běhy liší
+    used = np.unique(np.concatenate(([0], store.seg_station, store.seg_switch,
+                                     store.point_station, store.point_switch)))
+    local = np.zeros(max(len(store.names), 1), dtype=np.int32)
+    local[used] = np.arange(len(used))
+    table = np.array([store.names.lookup(i) or "" for i in used.tolist()])
+    path_tmp = path + ".tmp.npz"
+    np.savez(path_tmp, coords=store.coords, lengths=store.lengths, flags=store.flags,
+             seg_station=local[store.seg_station], seg_switch=local[store.seg_switch],
+             point_station=local[store.point_station], point_switch=local[store.point_switch],
+             names=table)
+    os.replace(path_tmp, path)
+
+
+def read_npz(path, name=None, names=None):
+    with np.load(path, allow_pickle=False) as data:
+        store = TrackStore(data["coords"], lengths=data["lengths"], flags=data["flags"],
+                           name=name, names=names)
+        ids = store.names.intern_many(data["names"].tolist())
+        store.seg_station = ids[data["seg_station"]]
+        store.seg_switch = ids[data["seg_switch"]]
+        store.point_station = ids[data["point_station"]]
+        store.point_switch = ids[data["point_switch"]]
+    store.structure_dirty = True
+    return store
+
+
+def write_csv(path, store):
+    # Jeden řádek na segment, stejné sloupce jako .dat, ale s hlavičkou
+    def chunks():
+        yield (",".join(CSV_HEADER) + "\n").encode("utf-8")
+        block = 65536
+        lookup = store.names.lookup
+        rows = store.coords[:3*store.n_segments].reshape(-1, 9)
+        for lo in range(0, store.n_segments, block):
+            hi = min(lo + block, store.n_segments)
+            lines = []
+            for row, length, flag, st, sw in zip(rows[lo:hi].tolist(), store.lengths[lo:hi].tolist(),
+                                                 store.flags[lo:hi].tolist(), store.seg_station[lo:hi].tolist(),
+                                                 store.seg_switch[lo:hi].tolist()):
+                lines.append(",".join(map(str, row)) + f",{length},{flag},{lookup(st) or ''},{lookup(sw) or ''}")
+            yield ("\n".join(lines) + "\n").encode("utf-8")
+    write_atomic(path, chunks())
+
+
+def read_csv(path, name=None, names=None):
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header != CSV_HEADER:
+            raise ValueError(f"{path}: neočekávaná hlavička CSV")
+        rows = list(reader)
+    coords = np.array([r[:9] for r in rows], dtype=np.float64).reshape(-1, 3)
+    store = TrackStore.from_segment_records(
+        coords, [r[11] for r in rows], [r[12] for r in rows],
+        lengths=np.array([r[9] for r in rows], dtype=np.float64),
+        flags=np.array([r[10] for r in rows], dtype=np.int32),
+        name=name, names=names)
+    store.structure_dirty = True
+    return store
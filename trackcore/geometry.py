@@ -0,0 +1,51 @@
+import numpy as np
+
+
+def segment_runs(coords):
+    # Rozdělí trať na souvislé úseky: segment navazuje, pokud jeho p1 leží na p3 předchozího
+    n_segs = len(coords) // 3
+    if n_segs == 0:
+        return []
+    seg = coords[:3*n_segs].reshape(n_segs, 3, 3)
+    joined = np.all(seg[1:, 0] == seg[:-1, 2], axis=1)
+    starts = np.concatenate(([0], np.flatnonzero(~joined) + 1))
+    ends = np.concatenate((starts[1:], [n_segs]))
+    return list(zip(starts.tolist(), ends.tolist()))
+
+
+def run_polyline(coords, start, end):
+    # Body souvislého úseku segmentů [start, end) bez zdvojených napojení
+    seg = coords[3*start:3*end].reshape(-1, 3, 3)
+    return np.concatenate((seg[:1, 0], seg[:, 1:].reshape(-1, 3)))
+
+
+def simplify(xy, tolerance):
+    # Douglas–Peucker; vrací masku ponechaných bodů, krajní body zůstávají vždy
+    n = len(xy)
+    keep = np.zeros(n, dtype=bool)
+    if n == 0:
+        return keep
+    keep[0] = keep[-1] = True
+    if n < 3 or tolerance <= 0:
+        keep[:] = True
+        return keep
+    stack = [(0, n - 1)]
+    while stack:
+        i, j = stack.pop()
+        if j - i < 2:
+            continue
+        a = xy[i]
+        d = xy[j] - a
+        pts = xy[i+1:j] - a
+        norm = np.hypot(d[0], d[1])
+        if norm > 0:
+            dist = np.abs(pts[:, 0]*d[1] - pts[:, 1]*d[0]) / norm
+        else:
+            dist = np.hypot(pts[:, 0], pts[:, 1])
+        k = int(np.argmax(dist))
+        if dist[k] > tolerance:
+            m = i + 1 + k
+            keep[m] = True
+            stack.append((i, m))
+            stack.append((m, j))
+    return keep
@@ -0,0 +1,186 @@
+import time
+from collections import deque
+import numpy as np
+
+# Kolik paměti smí historie zabrat; nejstarší kroky se zahazují
+HISTORY_BUDGET = 64 << 20
+# Úpravy se stejným klíčem v tomto odstupu se slučují do jednoho kroku (tažení myší)
+COALESCE_SECONDS = 0.6
+
+
+def compact_indices(indices):
+    # Souvislý rozsah se uloží jen jako dvojice čísel
+    idx = np.unique(np.asarray(indices, dtype=np.intp))
+    if len(idx) and idx[-1] - idx[0] + 1 == len(idx):
+        return slice(int(idx[0]), int(idx[-1]) + 1)
+    return idx
+
+
+def expand_indices(indices):
+    if isinstance(indices, slice):
+        return np.arange(indices.start, indices.stop)
+    return indices
+
+
+class PointDelta:
+    # Změna bodů jedné tratě: indexy (nebo rozsah) a staré/nové souřadnice a id názvů
+    __slots__ = ("store", "indices", "old", "new")
+
+    def __init__(self, store, indices, old, new):
+        self.store = store
+        self.indices = indices
+        self.old = old
+        self.new = new
+
+    @staticmethod
+    def read(store, indices):
+        return (store.coords[indices].copy(), store.point_station[indices].copy(),
+                store.point_switch[indices].copy())
+
+    def write(self, values):
+        store = self.store
+        coords, station, switch = values
+        # krok může měnit jen názvy; délky se pak nemají přepočítávat
+        moved = np.any(store.coords[self.indices] != coords, axis=1)
+        store.coords[self.indices] = coords
+        store.point_station[self.indices] = station
+        store.point_switch[self.indices] = switch
+        idx = expand_indices(self.indices)
+        segs = np.unique(idx // 3)
+        store.mark_dirty(segs, coords=False)
+        if moved.any():
+            store.mark_dirty(np.unique(idx[moved] // 3))
+        store.update_all_station_switch(segs)
+        return idx
+
+    def nbytes(self):
+        arrays = self.old + self.new
+        if not isinstance(self.indices, slice):
+            arrays += (self.indices,)
+        return sum(a.nbytes for a in arrays)
+
+
+class Edit:
+    def __init__(self, label, deltas, key=None):
+        self.label = label
+        self.deltas = deltas
+        self.key = key
+        self.time = time.monotonic()
+        self.size = sum(d.nbytes() for d in deltas)
+
+
+class PendingEdit:
+    # Stav bodů před úpravou; z něj a ze stavu po úpravě vznikne krok historie
+    def __init__(self, changes):
+        self.before = []
+        for store, indices in changes:
+            indices = compact_indices(indices)
+            self.before.append((store, indices, PointDelta.read(store, indices)))
+
+
+class EditHistory:
+    def __init__(self, budget=HISTORY_BUDGET):
+        self.budget = budget
+        self.undo_stack = deque()
+        self.redo_stack = []
+        self.size = 0
+        # slučovat lze jen do kroku, který byl právě přidán
+        self.last = None
+
+    def capture(self, changes):
+        # changes: [(store, indices)] bodů, které se chystáme změnit
+        return PendingEdit(changes)
+
+    def push(self, pending, label, key=None):
+        deltas = []
+        for store, indices, old in pending.before:
+            new = PointDelta.read(store, indices)
+            if all(np.array_equal(a, b) for a, b in zip(old, new)):
+                continue
+            deltas.append(PointDelta(store, indices, old, new))
+        if not deltas:
+            return None
+        self.redo_stack.clear()
+        top = self.undo_stack[-1] if self.undo_stack else None
+        if (key is not None and top is not None and top is self.last and top.key == key and
+                time.monotonic() - top.time < COALESCE_SECONDS):
+            self.size -= top.size
+            top.deltas = self.coalesce(top.deltas, deltas)
+            top.time = time.monotonic()
+            top.size = sum(d.nbytes() for d in top.deltas)
+            edit = top
+        else:
+            edit = Edit(label, deltas, key)
+            self.undo_stack.append(edit)
+        self.size += edit.size
+        self.last = edit
+        self.evict()
+        return edit
+
+    @staticmethod
+    def coalesce(older, newer):
+        # Sloučený krok má původní hodnoty z prvního kroku a nové z posledního
+        merged = []
+        stores = {id(d.store): d.store for d in older + newer}
+        for sid, store in stores.items():
+            a = [d for d in older if id(d.store) == sid]
+            b = [d for d in newer if id(d.store) == sid]
+            if not b:
+                merged.extend(a)
+                continue
+            if not a:
+                merged.extend(b)
+                continue
+            idx = np.concatenate([expand_indices(d.indices) for d in a + b])
+            # u bodů změněných vícekrát platí nejstarší původní hodnota
+            uniq, first = np.unique(idx, return_index=True)
+            old = tuple(np.concatenate([d.old[k] for d in a + b])[first] for k in range(3))
+            indices = compact_indices(uniq)
+            merged.append(PointDelta(store, indices, old, PointDelta.read(store, indices)))
+        return merged
+
+    def evict(self):
+        # nejnovější krok zůstane i tehdy, když je sám větší než rozpočet
+        while self.size > self.budget and len(self.undo_stack) > 1:
+            self.size -= self.undo_stack.popleft().size
+
+    def can_undo(self):
+        return bool(self.undo_stack)
+
+    def can_redo(self):
+        return bool(self.redo_stack)
+
+    def undo(self):
+        # Vrací (krok, [(store, indexy bodů)]), aby šlo obnovit jen dotčené prvky scény a tabulky
+        if not self.undo_stack:
+            return None
+        edit = self.undo_stack.pop()
+        self.size -= edit.size
+        self.redo_stack.append(edit)
+        self.last = None
+        return edit, [(d.store, d.write(d.old)) for d in reversed(edit.deltas)]
+
+    def redo(self):
+        if not self.redo_stack:
+            return None
+        edit = self.redo_stack.pop()
+        self.undo_stack.append(edit)
+        self.size += edit.size
+        self.last = None
+        self.evict()
+        return edit, [(d.store, d.write(d.new)) for d in edit.deltas]
+
+    def forget(self, store):
+        # Kroky, které mění zahozenou trať (např. po převzorkování), už nejdou vrátit
+        for stack in (self.undo_stack, self.redo_stack):
+            kept = [e for e in stack if all(d.store is not store for d in e.deltas)]
+            stack.clear()
+            stack.extend(kept)
+        self.size = sum(e.size for e in self.undo_stack)
+        self.last = None
+
+    def clear(self):
+        self.undo_stack.clear()
+        self.redo_stack.clear()
+        self.size = 0
+        self.last = None
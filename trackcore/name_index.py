@@ -0,0 +1,197 @@
+import bisect
+import unicodedata
+from collections import Counter
+import numpy as np
+
+from .profiling import PROFILER
+
+KINDS = ("station", "switch")
+# Kolik trojic písmen musí mít název s dotazem společných, aby prošel jako podobný
+FUZZY_MIN_SCORE = 0.3
+
+
+def normalize(name):
+    # Hledá se bez ohledu na velikost písmen a diakritiku
+    text = unicodedata.normalize("NFKD", name.lower())
+    return "".join(ch for ch in text if not unicodedata.combining(ch))
+
+
+def trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i+3] for i in range(len(padded) - 2)}
+
+
+def name_runs(ids):
+    # Souvislé úseky bodů se stejným názvem: (id, první bod, konec) bez bodů bez názvu
+    if not len(ids):
+        empty = np.empty(0, dtype=np.int64)
+        return ids[:0].copy(), empty, empty
+    brk = np.ones(len(ids), dtype=bool)
+    brk[1:] = ids[1:] != ids[:-1]
+    start = np.flatnonzero(brk)
+    end = np.append(start[1:], len(ids))
+    named = ids[start] != 0
+    return ids[start][named], start[named], end[named]
+
+
+class NameHit:
+    # Jeden úsek trati nesoucí hledaný název; bod je první bod úseku
+    __slots__ = ("name", "kind", "track", "point", "count", "rank")
+
+    def __init__(self, name, kind, track, point, count, rank):
+        self.name = name
+        self.kind = kind
+        self.track = track
+        self.point = point
+        self.count = count
+        self.rank = rank
+
+    @property
+    def segment(self):
+        return self.point // 3
+
+    def __repr__(self):
+        return f"{self.name} ({self.kind}) {self.track}: segment {self.segment + 1}, {self.count} bodů"
+
+
+class NameIndex:
+    # Invertovaný index názvů stanic a výhybek: úseky bodů po tratích a pro každé
+    # id názvu množina tratí, kde se vyskytuje. Dotaz tedy prochází jen tabulku
+    # názvů (předpona přes seřazený seznam, podobnost přes trojice písmen) a úseky
+    # tratí, které název opravdu obsahují. Po editaci bodů se úseky přepočítají
+    # jen v okolí změny
+    def __init__(self, names):
+        self.names = names
+        self.runs = {}          # (trať, druh) -> (id, první bod, konec)
+        self.where = {}         # (druh, id) -> Counter tratí (počet úseků)
+        self.sorted = []        # [(normalizovaný název, id)] seřazené
+        self.grams = {}         # trojice písmen -> množina id
+        self.indexed = 1        # kolik názvů z tabulky už je v sorted/grams
+
+    def clear(self):
+        self.runs.clear()
+        self.where.clear()
+
+    def _sync_names(self):
+        # Tabulka názvů jen roste; nové názvy (přiřazení v editoru) se doplní líně
+        table = self.names.names
+        if self.indexed == len(table):
+            return
+        added = [(normalize(table[i]), i) for i in range(self.indexed, len(table))]
+        for key, i in added:
+            for g in trigrams(key):
+                self.grams.setdefault(g, set()).add(i)
+        self.sorted = sorted(self.sorted + added)
+        self.indexed = len(table)
+
+    def _count(self, track, kind, ids, sign):
+        for i, n in zip(*np.unique(ids, return_counts=True)):
+            where = self.where.setdefault((kind, int(i)), Counter())
+            where[track] += sign * int(n)
+            if where[track] <= 0:
+                del where[track]
+
+    @PROFILER.timed()
+    def add_track(self, track, store):
+        self.remove_track(track)
+        for kind in KINDS:
+            if store.point_ids_loaded():
+                runs = name_runs(self._ids(store, kind))
+            else:
+                # body mají názvy svých segmentů; úseky se spočítají po segmentech
+                ids, start, end = name_runs(store.seg_station if kind == "station" else store.seg_switch)
+                runs = (ids, 3*start, 3*end)
+            self.runs[(track, kind)] = runs
+            self._count(track, kind, runs[0], 1)
+
+    def remove_track(self, track):
+        for kind in KINDS:
+            runs = self.runs.pop((track, kind), None)
+            if runs is not None:
+                self._count(track, kind, runs[0], -1)
+
+    @staticmethod
+    def _ids(store, kind):
+        return store.point_station if kind == "station" else store.point_switch
+
+    @PROFILER.timed()
+    def update(self, track, store, indices):
+        # Přepočítá úseky mezi první a poslední změněným bodem včetně úseků, které do
+        # rozsahu zasahují. Body těsně před a za rozsahem se nezměnily, takže úseky
+        # mimo něj zůstávají maximální a nemusí se slučovat
+        indices = np.asarray(indices, dtype=np.intp)
+        if not len(indices):
+            return
+        lo = max(int(indices.min()) - 1, 0)
+        hi = min(int(indices.max()) + 2, store.n_points)
+        for kind in KINDS:
+            key = (track, kind)
+            if key not in self.runs:
+                continue
+            ids, start, end = self.runs[key]
+            a = int(np.searchsorted(end, lo, side="right"))
+            b = int(np.searchsorted(start, hi, side="left"))
+            rs, re = lo, hi
+            if a < b:
+                rs = min(rs, int(start[a]))
+                re = max(re, int(end[b - 1]))
+            new_ids, new_start, new_end = name_runs(self._ids(store, kind)[rs:re])
+            self._count(track, kind, ids[a:b], -1)
+            self._count(track, kind, new_ids, 1)
+            self.runs[key] = (np.concatenate((ids[:a], new_ids, ids[b:])),
+                              np.concatenate((start[:a], new_start + rs, start[b:])),
+                              np.concatenate((end[:a], new_end + rs, end[b:])))
+
+    def match_names(self, text, limit=50):
+        # [(rank, id)]: 0 přesná shoda, 1 předpona, 2 podřetězec, 3 podobný název;
+        # v rámci stejného ranku napřed názvy s víc společnými trojicemi písmen
+        self._sync_names()
+        query = normalize(text.strip())
+        if not query:
+            return []
+        found = {}
+        lo = bisect.bisect_left(self.sorted, (query, 0))
+        for key, i in self.sorted[lo:lo + limit]:
+            if not key.startswith(query):
+                break
+            found[i] = (0 if key == query else 1, 0.0)
+        if len(found) < limit:
+            # podřetězec i podobnost se hledají přes trojice písmen dotazu
+            grams = trigrams(query)
+            hits = Counter()
+            for g in grams:
+                for i in self.grams.get(g, ()):
+                    hits[i] += 1
+            table = self.names.names
+            for i, n in hits.most_common():
+                if len(found) >= limit:
+                    break
+                if i in found:
+                    continue
+                score = n / len(grams)
+                if score < FUZZY_MIN_SCORE:
+                    break
+                found[i] = (2 if query in normalize(table[i]) else 3, -score)
+        table = self.names.names
+        ranked = sorted(found.items(), key=lambda kv: (kv[1], table[kv[0]]))
+        return [(rank, i) for i, (rank, _) in ranked]
+
+    @PROFILER.timed()
+    def search(self, text, kinds=KINDS, limit=200):
+        # Úseky tratí s názvy odpovídajícími dotazu, nejlepší shody první
+        hits = []
+        for rank, i in self.match_names(text):
+            name = self.names.lookup(i)
+            for kind in kinds:
+                for track in self.where.get((kind, i), ()):
+                    ids, start, end = self.runs[(track, kind)]
+                    for k in np.flatnonzero(ids == i).tolist():
+                        hits.append(NameHit(name, kind, track, int(start[k]), int(end[k] - start[k]), rank))
+                        if len(hits) >= limit:
+                            return hits
+        return hits
+
+    def tracks_with(self, name, kind):
+        # Tratě, kde se název vyskytuje (přesná shoda)
+        i = self.names.ids.get(name)
+        return sorted(self.where.get((kind, i), ())) if i is not None else []
@@ -0,0 +1,157 @@
+import math
+import numpy as np
+
+from .track_data import TrackStore
+
+
+def translate(store, dx=0.0, dy=0.0, dz=0.0):
+    store.coords += (dx, dy, dz)
+    store.mark_dirty()
+    return store
+
+
+def merge(stores, name=None):
+    # Spojí tratě za sebou do jedné; všechny musí sdílet tabulku názvů
+    stores = list(stores)
+    if not stores:
+        raise ValueError("Není co spojit")
+    names = stores[0].names
+    if any(s.names is not names for s in stores):
+        raise ValueError("Tratě nemají společnou tabulku názvů")
+
+    def cat(attr):
+        return np.concatenate([getattr(s, attr) for s in stores])
+
+    out = TrackStore(cat("coords"),
+                     point_station=cat("point_station"), point_switch=cat("point_switch"),
+                     seg_station=cat("seg_station"), seg_switch=cat("seg_switch"),
+                     lengths=cat("lengths"), flags=cat("flags"), name=name, names=names)
+    offset = 0
+    for s in stores:
+        out.flag_tokens.update((offset + k, token) for k, token in s.flag_tokens.items())
+        offset += s.n_segments
+    out.structure_dirty = True
+    return out
+
+
+def check_store(store):
+    # Základní kontrola dat, která parser nepozná: neplatná čísla a neúplné segmenty
+    problems = []
+    if len(store.coords) % 3:
+        problems.append(f"počet bodů {len(store.coords)} není násobkem 3")
+    bad = np.flatnonzero(~np.isfinite(store.coords[:3*store.n_segments]).all(axis=1).reshape(-1, 3).all(axis=1))
+    for s in bad[:20].tolist():
+        problems.append(f"segment {s + 1}: neplatná souřadnice")
+    if len(bad) > 20:
+        problems.append(f"… a dalších {len(bad) - 20} segmentů s neplatnou souřadnicí")
+    return problems
+
+
+# Porovnání dvou verzí jedné trati (např. po změně souboru na disku) po segmentech:
+# souřadnice, názvy bodů, délka a příznak. Obě tratě musí sdílet tabulku názvů
+
+def _segment_rows(store):
+    n = store.n_segments
+    if store.point_ids_loaded():
+        station, switch = store.point_station[:3*n], store.point_switch[:3*n]
+    else:
+        # needitovaná trať: názvy bodů jsou názvy segmentů, pole po bodech se nevytváří
+        station, switch = np.repeat(store.seg_station[:n], 3), np.repeat(store.seg_switch[:n], 3)
+    return np.hstack((store.coords[:3*n].reshape(n, 9), station.reshape(n, 3),
+                      switch.reshape(n, 3), store.lengths[:n, None], store.flags[:n, None]))
+
+
+def _same_rows(a, b):
+    # NaN v obou verzích se bere jako shoda
+    return ((a == b) | (np.isnan(a) & np.isnan(b))).all(axis=1)
+
+
+def changed_segments(old, new):
+    # Indexy segmentů, které se liší; obě verze mají stejný počet segmentů
+    return np.flatnonzero(~_same_rows(_segment_rows(old), _segment_rows(new)))
+
+
+def segment_diff(old, new):
+    # Nejmenší souvislý rozdíl: segmenty old[prefix:old_end] nahrazuje new[prefix:new_end],
+    # začátek a konec trati jsou v obou verzích stejné
+    a, b = _segment_rows(old), _segment_rows(new)
+    m = min(len(a), len(b))
+    head = _same_rows(a[:m], b[:m])
+    prefix = m if head.all() else int(np.argmin(head))
+    tail = _same_rows(a[len(a) - m:][::-1], b[len(b) - m:][::-1])
+    suffix = m if tail.all() else int(np.argmin(tail))
+    suffix = min(suffix, m - prefix)
+    return prefix, len(a) - suffix, len(b) - suffix
+
+
+def copy_segments(store, src, segs):
+    # Převezme segmenty segs ze src (stejně dlouhé verze trati); vrací indexy jejich bodů
+    segs = np.asarray(segs, dtype=np.intp)
+    idx = (3 * segs[:, None] + np.arange(3)).ravel()
+    store.coords[idx] = src.coords[idx]
+    store.point_station[idx] = src.point_station[idx]
+    store.point_switch[idx] = src.point_switch[idx]
+    for attr in ("seg_station", "seg_switch", "lengths", "flags"):
+        getattr(store, attr)[segs] = getattr(src, attr)[segs]
+    for s in segs.tolist():
+        if s in src.flag_tokens:
+            store.flag_tokens[s] = src.flag_tokens[s]
+        else:
+            store.flag_tokens.pop(s, None)
+    store.mark_dirty(segs)
+    # délky jsou převzaté ze src, nepřepočítávají se
+    store.coords_dirty[segs] = False
+    return idx
+
+
+# Hromadné úpravy vybraných bodů; idx jsou indexy bodů v jedné trati, vše jednou
+# operací nad polem. Vrací indexy změněných bodů.
+
+def _touched(store, idx, coords=True):
+    segs = np.unique(idx // 3)
+    store.mark_dirty(segs, coords=coords)
+    store.update_all_station_switch(segs)
+    return idx
+
+
+def translate_points(store, idx, dx=0.0, dy=0.0, dz=0.0):
+    store.coords[idx] += (dx, dy, dz)
+    return _touched(store, idx)
+
+
+def rotate_points(store, idx, angle, cx, cy):
+    # otočení kolem svislé osy v bodě (cx, cy), úhel ve stupních proti směru hodinek
+    a = math.radians(angle)
+    c, s = math.cos(a), math.sin(a)
+    x = store.coords[idx, 0] - cx
+    y = store.coords[idx, 1] - cy
+    store.coords[idx, 0] = cx + c*x - s*y
+    store.coords[idx, 1] = cy + s*x + c*y
+    return _touched(store, idx)
+
+
+def scale_points(store, idx, factor, cx, cy):
+    store.coords[idx, 0] = cx + (store.coords[idx, 0] - cx) * factor
+    store.coords[idx, 1] = cy + (store.coords[idx, 1] - cy) * factor
+    return _touched(store, idx)
+
+
+def set_points_z(store, idx, z):
+    store.coords[idx, 2] = z
+    return _touched(store, idx)
+
+
+def profile_z(store, idx, knots):
+    # Výška podle profilu: knots = [(staničení, z)], staničení se měří podél
+    # vybraných bodů od prvního z nich, mezi uzly se interpoluje lineárně
+    knots = sorted(knots)
+    pts = store.coords[idx]
+    dist = np.concatenate(([0.0], np.cumsum(np.linalg.norm(np.diff(pts[:, :2], axis=0), axis=1))))
+    store.coords[idx, 2] = np.interp(dist, [k[0] for k in knots], [k[1] for k in knots])
+    return _touched(store, idx)
+
+
+def set_points_name(store, idx, name, kind="station"):
+    ids = store.point_station if kind == "station" else store.point_switch
+    ids[idx] = store.names.intern(name)
+    return _touched(store, idx, coords=False)
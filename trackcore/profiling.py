@@ -0,0 +1,150 @@
+import os
+import json
+import time
+import cProfile
+import threading
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+
+# Kolik posledních snímků se drží pro průměr a maximum v překryvu
+FRAME_HISTORY = 120
+
+
+class Profiler:
+    # Měření horkých míst: časovače podle názvu, čítače prvků a časy snímků.
+    # Vypnutý profiler stojí jen jedno porovnání na volání. Se zapnutým
+    # záznamem se každé měření uloží i jako událost pro trace (chrome://tracing)
+    def __init__(self):
+        self.enabled = False
+        self.lock = threading.Lock()
+        self.stats = {}         # název -> [počet, celkem s, max s]
+        self.frame = {}         # název -> čas v rozpracovaném snímku
+        self.last_frame = {}    # název -> čas v posledním dokončeném snímku
+        self.counters = {}
+        self.frame_counts = {}
+        self.frame_times = deque(maxlen=FRAME_HISTORY)
+        self.events = None
+        self.origin = time.perf_counter()
+
+    def add(self, name, seconds, start=None):
+        with self.lock:
+            s = self.stats.get(name)
+            if s is None:
+                s = self.stats[name] = [0, 0.0, 0.0]
+            s[0] += 1
+            s[1] += seconds
+            if seconds > s[2]:
+                s[2] = seconds
+            self.frame[name] = self.frame.get(name, 0.0) + seconds
+            if self.events is not None and start is not None:
+                self.events.append({"name": name, "ph": "X", "pid": os.getpid(),
+                                    "tid": threading.get_ident(),
+                                    "ts": (start - self.origin) * 1e6, "dur": seconds * 1e6})
+
+    @contextmanager
+    def timer(self, name):
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start, start)
+
+    def timed(self, name=None):
+        # Dekorátor: měří každé volání funkce pod daným názvem (výchozí je název funkce)
+        def decorate(fn):
+            label = name or fn.__qualname__
+
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    self.add(label, time.perf_counter() - start, start)
+            return wrapper
+        return decorate
+
+    def count(self, name, value):
+        if self.enabled:
+            self.counters[name] = value
+
+    def tally(self, name, n=1):
+        # Čítač za jeden snímek (např. počet nakreslených bloků), sčítá se do end_frame
+        if self.enabled:
+            self.frame_counts[name] = self.frame_counts.get(name, 0) + n
+
+    def end_frame(self, seconds):
+        # Uzavře snímek: jeho časovače se přesunou do last_frame pro překryv
+        if not self.enabled:
+            return
+        with self.lock:
+            self.frame_times.append(seconds)
+            self.last_frame = self.frame
+            self.frame = {}
+            self.counters.update(self.frame_counts)
+            self.frame_counts = {}
+
+    def frame_summary(self):
+        if not self.frame_times:
+            return 0.0, 0.0
+        times = list(self.frame_times)
+        return sum(times) / len(times), max(times)
+
+    def reset(self):
+        with self.lock:
+            self.stats.clear()
+            self.frame.clear()
+            self.last_frame = {}
+            self.counters.clear()
+            self.frame_counts = {}
+            self.frame_times.clear()
+
+    def start_trace(self):
+        self.enabled = True
+        self.origin = time.perf_counter()
+        self.events = []
+
+    def write_trace(self, path):
+        # JSON ve formátu Trace Event (chrome://tracing, Perfetto) a souhrn časovačů
+        with self.lock:
+            events = list(self.events or [])
+            summary = {name: {"count": c, "total_ms": t * 1000, "max_ms": m * 1000}
+                       for name, (c, t, m) in sorted(self.stats.items())}
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms", "summary": summary,
+                       "counters": dict(self.counters)}, f)
+
+    def report(self):
+        lines = []
+        for name, (c, t, m) in sorted(self.stats.items(), key=lambda kv: -kv[1][1]):
+            lines.append(f"{name:<40} {c:>8}× {t*1000:>10.1f} ms celkem {m*1000:>8.2f} ms max")
+        return "\n".join(lines)
+
+
+PROFILER = Profiler()
+
+
+@contextmanager
+def profile_session(profile_path=None, trace_path=None):
+    # Celé sezení pod cProfile (soubor .prof pro pstats/snakeviz) a/nebo se záznamem
+    # časovačů do JSON trace
+    profile = None
+    if trace_path:
+        PROFILER.start_trace()
+    if profile_path:
+        profile = cProfile.Profile()
+        profile.enable()
+    try:
+        yield PROFILER
+    finally:
+        if profile is not None:
+            profile.disable()
+            profile.dump_stats(profile_path)
+        if trace_path:
+            PROFILER.write_trace(trace_path)
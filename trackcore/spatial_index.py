@@ -0,0 +1,52 @@
+import numpy as np
+
+
+class SpatialIndex:
+    # Prostorové dotazy nad všemi tratěmi přes jejich rozdělení do dlaždic
+    # (TileIndex): prohledávají se jen body běhů, jejichž obálka zasahuje do dotazu
+    def __init__(self, cell=64.0):
+        # počáteční poloměr hledání nejbližšího bodu
+        self.cell = cell
+        self.tiles = {}
+
+    def add_track(self, track_name, store):
+        self.tiles[track_name] = store.tile_index()
+
+    def remove_track(self, track_name):
+        self.tiles.pop(track_name, None)
+
+    def clear(self):
+        self.tiles.clear()
+
+    def update(self, track_name, indices):
+        tiles = self.tiles.get(track_name)
+        if tiles is not None:
+            tiles.refit(tiles.runs_of(indices))
+
+    def query_rect(self, xmin, ymin, xmax, ymax, tracks=None):
+        result = {}
+        for tn, tiles in self.tiles.items():
+            if tracks is not None and tn not in tracks:
+                continue
+            idx = tiles.points_in_rect(xmin, ymin, xmax, ymax)
+            if len(idx):
+                result[tn] = idx
+        return result
+
+    def nearest(self, x, y, max_dist, tracks=None):
+        # Čtverec hledání se zdvojuje, dokud nejbližší nalezený bod neleží uvnitř kruhu,
+        # který čtverec celý pokrývá; pak je výsledek skutečně nejbližší
+        r = min(self.cell, max_dist)
+        while True:
+            best = None
+            for tn, idx in self.query_rect(x - r, y - r, x + r, y + r, tracks).items():
+                xy = self.tiles[tn].coords
+                d = np.hypot(xy[idx, 0] - x, xy[idx, 1] - y)
+                k = int(np.argmin(d))
+                if best is None or d[k] < best[2]:
+                    best = (tn, int(idx[k]), float(d[k]))
+            if best is not None and best[2] <= r:
+                return best if best[2] <= max_dist else None
+            if r >= max_dist:
+                return None
+            r = min(r * 2, max_dist)
@@ -0,0 +1,89 @@
+import numpy as np
+
+# Hrana čtvercové dlaždice ve scénických jednotkách a nejdelší běh segmentů v jedné dlaždici
+TILE_SIZE = 512.0
+RUN_SEGMENTS = 512
+# Posun, aby záporné indexy dlaždic v ose Y zůstaly v dolních 32 bitech klíče
+_Y_OFFSET = 1 << 31
+
+
+def tile_keys(xy, tile_size=TILE_SIZE):
+    c = np.floor(xy / tile_size).astype(np.int64)
+    return (c[:, 0] << 32) | (c[:, 1] + _Y_OFFSET)
+
+
+class TileIndex:
+    # Rozdělení segmentů jedné tratě do čtvercových dlaždic. Běh je souvislý rozsah
+    # segmentů, jejichž prostřední bod leží ve stejné dlaždici, s obálkou všech svých
+    # bodů. Po bězích se staví cesty ve scéně a hledají body ve výřezu, takže se
+    # kvůli výřezu nikdy neprochází celá trať. Ukládá se do cache vedle polí tratě
+    def __init__(self, coords, runs, bbox):
+        self.coords = coords
+        self.runs = runs        # (R, 3) int64: klíč dlaždice, první segment, konec segmentů
+        self.bbox = bbox        # (R, 4) float64: xmin, ymin, xmax, ymax
+        self.start = runs[:, 1]
+        self.end = runs[:, 2]
+
+    @classmethod
+    def build(cls, coords, tile_size=TILE_SIZE):
+        n = len(coords) // 3
+        if n == 0:
+            return cls(coords, np.empty((0, 3), dtype=np.int64), np.empty((0, 4)))
+        keys = tile_keys(coords[1:3*n:3, :2], tile_size)
+        brk = np.ones(n, dtype=bool)
+        brk[1:] = keys[1:] != keys[:-1]
+        first = np.flatnonzero(brk)
+        # dlouhé běhy v jedné dlaždici se rozdělí, aby editace přestavěla jen kousek
+        pieces = -(-np.diff(np.append(first, n)) // RUN_SEGMENTS)
+        offset = np.arange(pieces.sum()) - np.repeat(np.cumsum(pieces) - pieces, pieces)
+        start = np.repeat(first, pieces) + offset * RUN_SEGMENTS
+        end = np.append(start[1:], n)
+        runs = np.stack((keys[start], start, end), axis=1)
+        xy = coords[:3*n, :2]
+        at = 3 * start
+        bbox = np.stack((np.minimum.reduceat(xy[:, 0], at), np.minimum.reduceat(xy[:, 1], at),
+                         np.maximum.reduceat(xy[:, 0], at), np.maximum.reduceat(xy[:, 1], at)), axis=1)
+        return cls(coords, runs, bbox)
+
+    @property
+    def n_runs(self):
+        return len(self.runs)
+
+    def bounds(self):
+        if not len(self.bbox):
+            return None
+        return (float(self.bbox[:, 0].min()), float(self.bbox[:, 1].min()),
+                float(self.bbox[:, 2].max()), float(self.bbox[:, 3].max()))
+
+    def query(self, xmin, ymin, xmax, ymax):
+        # Běhy, jejichž obálka zasahuje do obdélníku, vzestupně
+        b = self.bbox
+        return np.flatnonzero((b[:, 0] <= xmax) & (b[:, 2] >= xmin) & (b[:, 1] <= ymax) & (b[:, 3] >= ymin))
+
+    def run_points(self, runs):
+        # Indexy bodů vybraných běhů; běhy jsou seřazené, takže i body jsou
+        first = 3 * self.start[runs]
+        counts = 3 * (self.end[runs] - self.start[runs])
+        return np.repeat(first - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+
+    def points_in_rect(self, xmin, ymin, xmax, ymax):
+        runs = self.query(xmin, ymin, xmax, ymax)
+        if not len(runs):
+            return np.empty(0, dtype=np.intp)
+        cand = self.run_points(runs)
+        pts = self.coords[cand]
+        inside = ((pts[:, 0] >= xmin) & (pts[:, 0] <= xmax) &
+                  (pts[:, 1] >= ymin) & (pts[:, 1] <= ymax))
+        return cand[inside]
+
+    def runs_of(self, indices):
+        # Běhy obsahující dané body
+        segs = np.asarray(indices, dtype=np.intp) // 3
+        return np.unique(np.searchsorted(self.start, segs, side="right") - 1)
+
+    def refit(self, runs):
+        # Po posunu bodů se obálky dotčených běhů spočítají znovu; bod zůstává ve
+        # svém běhu, i když se přesune do jiné dlaždice (rozdělení se obnoví s cache)
+        for r in np.asarray(runs).tolist():
+            xy = self.coords[3*self.start[r]:3*self.end[r], :2]
+            self.bbox[r] = (*xy.min(axis=0), *xy.max(axis=0))
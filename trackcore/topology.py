@@ -0,0 +1,271 @@
+import math
+import heapq
+import numpy as np
+
+from .profiling import PROFILER
+
+# Konce segmentů bližší než tato vzdálenost se považují za spojené
+JOIN_TOLERANCE = 0.05
+
+
+def snap_endpoints(xyz, tol):
+    # Sloučí body vzdálené nejvýš zhruba tol. Místo porovnání každého s každým se
+    # body roztřídí do mřížky s buňkou tol a porovnávají se jen sousední buňky.
+    # Vrací (id uzlu pro každý bod, počet uzlů)
+    n = len(xyz)
+    if n == 0:
+        return np.empty(0, dtype=np.intp), 0
+    col = np.floor(xyz[:, 0] / tol).astype(np.int64)
+    row = np.floor(xyz[:, 1] / tol).astype(np.int64)
+    keys = (col << 32) | (row + 2**31)
+    order = np.argsort(keys)
+    k = keys[order]
+    brk = np.ones(n, dtype=bool)
+    brk[1:] = k[1:] != k[:-1]
+    group = np.cumsum(brk) - 1
+    first = np.flatnonzero(brk)
+    gkeys = k[first]
+    rep = xyz[order[first]]
+
+    # ve stejné buňce můžou být body nad sebou (mosty, křížení v různé výšce);
+    # takové buňky jsou vzácné, rozdělí se podle výšky zvlášť
+    z = xyz[order, 2]
+    spread = np.maximum.reduceat(z, first) - np.minimum.reduceat(z, first)
+    ends = np.append(first[1:], n)
+    extra_keys = []
+    extra_rep = []
+    for g in np.flatnonzero(spread > tol).tolist():
+        lo, hi = first[g], ends[g]
+        sub = lo + np.argsort(z[lo:hi])
+        rep[g] = xyz[order[sub[0]]]
+        for j in np.flatnonzero(np.diff(z[sub]) > tol).tolist():
+            # každá další vrstva dostane vlastní skupinu
+            group[sub[j+1:]] = len(gkeys) + len(extra_keys)
+            extra_keys.append(gkeys[g])
+            extra_rep.append(xyz[order[sub[j+1]]])
+    if extra_keys:
+        gkeys = np.concatenate((gkeys, extra_keys))
+        rep = np.vstack((rep, extra_rep))
+        # pro hledání sousedů musí být skupiny seřazené podle buňky
+        gorder = np.argsort(gkeys, kind="stable")
+        rank = np.empty_like(gorder)
+        rank[gorder] = np.arange(len(gorder))
+        group = rank[group]
+        gkeys = gkeys[gorder]
+        rep = rep[gorder]
+
+    parent = np.arange(len(gkeys))
+    pairs = []
+    for dc, dr in ((1, -1), (1, 0), (1, 1), (0, 1)):
+        nk = gkeys + (dc << 32) + dr
+        lo = np.searchsorted(gkeys, nk)
+        hit = gkeys[np.minimum(lo, len(gkeys) - 1)] == nk
+        for g in np.flatnonzero(hit).tolist():
+            h = lo[g]
+            while h < len(gkeys) and gkeys[h] == nk[g]:
+                if np.linalg.norm(rep[g] - rep[h]) <= tol:
+                    pairs.append((g, h))
+                h += 1
+    for g, h in pairs:
+        while parent[g] != g:
+            g = parent[g]
+        while parent[h] != h:
+            h = parent[h]
+        if g != h:
+            parent[max(g, h)] = min(g, h)
+    while True:
+        up = parent[parent]
+        if np.array_equal(up, parent):
+            break
+        parent = up
+    roots, compact = np.unique(parent, return_inverse=True)
+    node = np.empty(n, dtype=np.intp)
+    node[order] = compact[group]
+    return node, len(roots)
+
+
+class Route:
+    def __init__(self, length, pieces):
+        self.length = length
+        self.pieces = pieces    # [(název tratě, první segment, konec segmentů)] v pořadí trasy
+
+    def __repr__(self):
+        return f"Route({self.length:.1f}, {len(self.pieces)} úseků)"
+
+
+class TrackGraph:
+    # Graf spojení všech tratí. Uzly jsou konce segmentů sloučené podle vzdálenosti,
+    # hrany jsou řetězce segmentů jedné tratě bez odbočení a se stejnou stanicí a
+    # výhybkou; vnitřní body řetězců v grafu nejsou, takže dotazy procházejí jen
+    # křižovatky a hranice pojmenovaných úseků
+    def __init__(self, track_names, names, u, v, weight, track, seg_start, seg_end, station, switch, node_xyz):
+        self.track_names = track_names
+        self.names = names
+        self.u = u
+        self.v = v
+        self.weight = weight
+        self.track = track
+        self.seg_start = seg_start
+        self.seg_end = seg_end
+        self.station = station
+        self.switch = switch
+        self.node_xyz = node_xyz
+        n_nodes = int(max(u.max(), v.max())) + 1 if len(u) else 0
+        src = np.concatenate((u, v))
+        dst = np.concatenate((v, u))
+        chain = np.tile(np.arange(len(u)), 2)
+        order = np.argsort(src, kind="stable")
+        indptr = np.concatenate(([0], np.cumsum(np.bincount(src, minlength=n_nodes))))
+        # Dijkstra běží v Pythonu, se seznamy je rychlejší než s indexováním polí
+        self.indptr = indptr.tolist()
+        self.adj_node = dst[order].tolist()
+        self.adj_chain = chain[order].tolist()
+        self.chain_weight = weight.tolist()
+        self.n_nodes = n_nodes
+
+    @classmethod
+    @PROFILER.timed()
+    def build(cls, tracks, tol=JOIN_TOLERANCE):
+        # tracks: [(název, TrackStore)], všechny se sdílenou tabulkou názvů
+        tracks = [(tn, s) for tn, s in tracks if s.n_segments]
+        track_names = [tn for tn, _ in tracks]
+        names = tracks[0][1].names if tracks else None
+        if not tracks:
+            empty = np.empty(0, dtype=np.intp)
+            return cls(track_names, names, empty, empty, np.empty(0), empty, empty, empty, empty, empty,
+                       np.empty((0, 3)))
+        segs = [s.coords[:3*s.n_segments].reshape(-1, 3, 3) for _, s in tracks]
+        p1 = np.concatenate([c[:, 0] for c in segs])
+        p3 = np.concatenate([c[:, 2] for c in segs])
+        chord = np.concatenate([np.linalg.norm(c[:, 1] - c[:, 0], axis=1) +
+                                np.linalg.norm(c[:, 2] - c[:, 1], axis=1) for c in segs])
+        lengths = np.concatenate([s.lengths for _, s in tracks])
+        # váha nesmí být kratší než přímá vzdálenost konců, jinak by A* nemuselo najít nejkratší trasu
+        weight = np.maximum(np.where(lengths > 0, lengths, chord), np.linalg.norm(p3 - p1, axis=1))
+        track = np.concatenate([np.full(s.n_segments, t, dtype=np.intp) for t, (_, s) in enumerate(tracks)])
+        seg = np.concatenate([np.arange(s.n_segments) for _, s in tracks])
+        station = np.concatenate([s.seg_station for _, s in tracks])
+        switch = np.concatenate([s.seg_switch for _, s in tracks])
+
+        n_edges = len(p1)
+        node, n_nodes = snap_endpoints(np.concatenate((p1, p3)), tol)
+        a = node[:n_edges]
+        b = node[n_edges:]
+        deg = np.bincount(a, minlength=n_nodes) + np.bincount(b, minlength=n_nodes)
+
+        # segment navazuje na předchozí v řetězci, pokud jde o stejnou trať, sdílí s ním
+        # uzel bez odbočení a nemění se stanice ani výhybka
+        join = ((track[1:] == track[:-1]) & (b[:-1] == a[1:]) & (deg[b[:-1]] == 2) &
+                (station[1:] == station[:-1]) & (switch[1:] == switch[:-1]))
+        first = np.flatnonzero(np.concatenate(([True], ~join)))
+        last = np.concatenate((first[1:] - 1, [n_edges - 1]))
+
+        # uzly přečíslujeme jen na ty, které zůstaly jako konce řetězců
+        _, compact = np.unique(np.concatenate((a[first], b[last])), return_inverse=True)
+        n_chains = len(first)
+        node_xyz = np.empty((int(compact.max()) + 1, 3))
+        node_xyz[compact] = np.concatenate((p1[first], p3[last]))
+        return cls(track_names, names, compact[:n_chains], compact[n_chains:],
+                   np.add.reduceat(weight, first), track[first], seg[first], seg[last] + 1,
+                   station[first], switch[first], node_xyz)
+
+    @property
+    def n_chains(self):
+        return len(self.u)
+
+    def chains_named(self, name, kind="station"):
+        i = self.names.ids.get(name) if self.names is not None else None
+        if i is None:
+            return np.empty(0, dtype=np.intp)
+        ids = self.station if kind == "station" else self.switch
+        return np.flatnonzero(ids == i)
+
+    def nodes_of(self, chains):
+        return set(self.u[chains].tolist()) | set(self.v[chains].tolist())
+
+    def piece(self, c):
+        return (self.track_names[self.track[c]], int(self.seg_start[c]), int(self.seg_end[c]))
+
+    def dijkstra(self, sources, targets=None, max_dist=None):
+        # Vrací (vzdálenosti, předchozí řetězec, první dosažený cíl). S cíli jde o A*
+        # s odhadem přímou vzdáleností k obálce cílů (stanice leží na jednom místě),
+        # takže se neprohledává celý graf kolem zdroje
+        dist = {n: 0.0 for n in sources}
+        prev = {}
+        estimate = None
+        if targets:
+            goal = self.node_xyz[np.fromiter(targets, dtype=np.intp)]
+            lo = goal.min(axis=0).tolist()
+            hi = goal.max(axis=0).tolist()
+            xyz = self.node_xyz
+
+            def estimate(n):
+                d2 = 0.0
+                for c, a, b in zip(xyz[n].tolist(), lo, hi):
+                    e = a - c if c < a else (c - b if c > b else 0.0)
+                    d2 += e * e
+                return math.sqrt(d2)
+        heap = [(estimate(n) if estimate else 0.0, 0.0, n) for n in sources]
+        heapq.heapify(heap)
+        indptr, adj_node, adj_chain, w = self.indptr, self.adj_node, self.adj_chain, self.chain_weight
+        done = set()
+        while heap:
+            _, d, n = heapq.heappop(heap)
+            if n in done:
+                continue
+            done.add(n)
+            if targets is not None and n in targets:
+                return dist, prev, n
+            for k in range(indptr[n], indptr[n + 1]):
+                m = adj_node[k]
+                c = adj_chain[k]
+                nd = d + w[c]
+                if max_dist is not None and nd > max_dist:
+                    continue
+                if nd < dist.get(m, float("inf")):
+                    dist[m] = nd
+                    prev[m] = (n, c)
+                    heapq.heappush(heap, (nd + estimate(m) if estimate else nd, nd, m))
+        return dist, prev, None
+
+    def shortest_route(self, station_a, station_b):
+        # Nejkratší trasa mezi kterýmkoli úsekem stanice A a kterýmkoli úsekem stanice B
+        sources = self.nodes_of(self.chains_named(station_a))
+        targets = self.nodes_of(self.chains_named(station_b))
+        if not sources or not targets:
+            return None
+        dist, prev, hit = self.dijkstra(sources, targets)
+        if hit is None:
+            return None
+        pieces = []
+        n = hit
+        while n in prev:
+            n, c = prev[n]
+            pieces.append(self.piece(c))
+        pieces.reverse()
+        return Route(dist[hit], pieces)
+
+    def switch_tracks(self, switch):
+        # Tratě, které výhybka přímo spojuje (mají úsek v některém z jejích uzlů)
+        nodes = self.nodes_of(self.chains_named(switch, "switch"))
+        if not nodes:
+            return []
+        node_list = np.fromiter(nodes, dtype=np.intp)
+        touching = np.isin(self.u, node_list) | np.isin(self.v, node_list)
+        return sorted({self.track_names[t] for t in np.unique(self.track[touching]).tolist()})
+
+    def reachable_tracks(self, switch, max_dist=None):
+        # Tratě dosažitelné z výhybky po spojených segmentech, volitelně do dané vzdálenosti
+        sources = self.nodes_of(self.chains_named(switch, "switch"))
+        if not sources:
+            return []
+        dist, prev, _ = self.dijkstra(sources, max_dist=max_dist)
+        nodes = np.fromiter(dist, dtype=np.intp)
+        reached = np.isin(self.u, nodes) | np.isin(self.v, nodes)
+        return sorted({self.track_names[t] for t in np.unique(self.track[reached]).tolist()})
+
+    def station_names(self):
+        return sorted({self.names.lookup(i) for i in np.unique(self.station).tolist() if i})
+
+    def switch_names(self):
+        return sorted({self.names.lookup(i) for i in np.unique(self.switch).tolist() if i})
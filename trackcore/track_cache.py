@@ -0,0 +1,159 @@
+import os
+import json
+import uuid
+import hashlib
+import numpy as np
+
+from .dat_parser import ParsedDat, DatParseError, parse_dat_text
+from .tiles import TileIndex
+
+CACHE_VERSION = 3
+CACHE_DIR_NAME = ".trackcache"
+ARRAYS = ("coords", "lengths", "flags", "station_idx", "switch_idx", "linenos")
+# rozdělení do dlaždic (trackcore.tiles), aby se po startu nemusela procházet celá trať
+TILE_ARRAYS = ("tile_runs", "tile_bbox")
+
+
+def cache_dir_for(xml_file):
+    return os.path.join(os.path.dirname(os.path.abspath(xml_file)), CACHE_DIR_NAME)
+
+
+def entry_dir(cache_dir, path):
+    path = os.path.abspath(path)
+    key = hashlib.sha1(path.encode("utf-8")).hexdigest()[:16]
+    return os.path.join(cache_dir, f"{os.path.basename(path)}-{key}")
+
+
+def file_digest(path):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def read_meta(entry):
+    try:
+        with open(os.path.join(entry, "meta.json"), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_meta(entry, meta):
+    tmp = os.path.join(entry, f"meta.{uuid.uuid4().hex}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(tmp, os.path.join(entry, "meta.json"))
+
+
+def load_cached(path, cache_dir):
+    # Platná cache se namapuje (copy-on-write), jinak None.
+    # Shoda velikosti a mtime stačí; při jiném mtime rozhodne obsahový hash
+    entry = entry_dir(cache_dir, path)
+    meta = read_meta(entry)
+    if meta is None or meta.get("version") != CACHE_VERSION:
+        return None
+    st = os.stat(path)
+    if meta["size"] != st.st_size:
+        return None
+    if meta["mtime_ns"] != st.st_mtime_ns:
+        if file_digest(path) != meta["sha1"]:
+            return None
+        meta["mtime_ns"] = st.st_mtime_ns
+        try:
+            write_meta(entry, meta)
+        except OSError:
+            pass
+    try:
+        arrays = {k: np.load(os.path.join(entry, meta["files"][k]), mmap_mode="c") for k in ARRAYS + TILE_ARRAYS}
+    except (OSError, ValueError, KeyError):
+        return None
+    errors = [DatParseError(path, lineno, message) for lineno, message in meta["errors"]]
+    parsed = ParsedDat(arrays["coords"], arrays["lengths"], arrays["flags"], meta["names"],
+                       arrays["station_idx"], arrays["switch_idx"], errors, arrays["linenos"])
+    parsed.source_stat = (st.st_size, st.st_mtime_ns)
+    parsed.flag_tokens = {s: token for s, token in meta["flag_tokens"]}
+    parsed.tiles = TileIndex(arrays["coords"], arrays["tile_runs"], arrays["tile_bbox"])
+    return parsed
+
+
+def store_cached(path, parsed, cache_dir, size, mtime_ns, sha1):
+    # Pole se ukládají pod novými jmény a až nakonec se atomicky přepíše meta.json,
+    # takže čtenář nikdy neuvidí napůl zapsaný záznam a staré namapované soubory
+    # se nemusí přepisovat (na Windows by to nešlo)
+    entry = entry_dir(cache_dir, path)
+    os.makedirs(entry, exist_ok=True)
+    tag = uuid.uuid4().hex[:12]
+    tiles = getattr(parsed, "tiles", None) or TileIndex.build(parsed.coords)
+    arrays = {k: getattr(parsed, k) for k in ARRAYS}
+    arrays["tile_runs"] = tiles.runs
+    arrays["tile_bbox"] = tiles.bbox
+    files = {}
+    for k, a in arrays.items():
+        files[k] = f"{tag}.{k}.npy"
+        np.save(os.path.join(entry, files[k]), np.ascontiguousarray(a))
+    write_meta(entry, {
+        "version": CACHE_VERSION,
+        "source": os.path.abspath(path),
+        "size": size,
+        "mtime_ns": mtime_ns,
+        "sha1": sha1,
+        "names": list(parsed.name_table),
+        "errors": [(e.lineno, e.message) for e in parsed.errors],
+        "flag_tokens": sorted(parsed.flag_tokens.items()),
+        "files": files,
+    })
+    for name in os.listdir(entry):
+        if name.endswith(".npy") and not name.startswith(tag):
+            try:
+                os.remove(os.path.join(entry, name))
+            except OSError:
+                pass
+
+
+def parse_and_cache(path, cache_dir, keep=True):
+    # Hash i parsování vycházejí ze stejně načtených bajtů, aby cache odpovídala obsahu.
+    # S keep=False se po zápisu do cache vrací None: pole se pak namapují z cache
+    # (load_mapped) a celá trať se nepřenáší mezi procesy ani nedrží v paměti
+    with open(path, "rb") as f:
+        st = os.fstat(f.fileno())
+        data = f.read()
+    parsed = parse_dat_text(data.decode("utf-8"), path)
+    parsed.source_stat = (st.st_size, st.st_mtime_ns)
+    parsed.tiles = TileIndex.build(parsed.coords)
+    if cache_dir:
+        try:
+            store_cached(path, parsed, cache_dir, st.st_size, st.st_mtime_ns, hashlib.sha1(data).hexdigest())
+            if not keep:
+                return None
+        except OSError as e:
+            print("Nelze zapsat cache:", e)
+    return parsed
+
+
+def load_mapped(path, cache_dir, parsed=None):
+    # Výsledek parse_and_cache(keep=False): bez výsledku se čerstvá cache namapuje;
+    # když se soubor mezitím znovu změnil, parsuje se ještě jednou do paměti
+    if parsed is not None:
+        return parsed
+    parsed = load_cached(path, cache_dir)
+    return parsed if parsed is not None else parse_and_cache(path, cache_dir)
+
+
+def parse_mapped(path, cache_dir):
+    return load_mapped(path, cache_dir, parse_and_cache(path, cache_dir, keep=False))
+
+
+def refresh_from_store(path, store, cache_dir, size, mtime_ns, sha1):
+    # Po uložení se cache zapíše rovnou z paměti, takže příští start nic neparsuje.
+    # Chybné řádky, které uložení v souboru ponechalo, se převezmou ze store
+    used = np.union1d(store.seg_station, store.seg_switch)
+    used = used[used != 0]
+    table = [None] + [store.names.lookup(i) for i in used.tolist()]
+    local = lambda ids: np.where(ids == 0, 0, np.searchsorted(used, ids) + 1).astype(np.int32)
+    parsed = ParsedDat(store.coords, store.lengths, store.flags, table,
+                       local(store.seg_station), local(store.seg_switch), list(store.parse_errors),
+                 store.source_linenos)
+    parsed.flag_tokens = store.flag_tokens
+    store_cached(path, parsed, cache_dir, size, mtime_ns, sha1)
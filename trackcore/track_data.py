@@ -0,0 +1,443 @@
+import numpy as np
+
+from .tiles import TileIndex
+
+
+class NameTable:
+    # Internované názvy stanic a výhybek, id 0 znamená "bez názvu"
+    def __init__(self):
+        self.names = [None]
+        self.ids = {}
+
+    def __len__(self):
+        return len(self.names)
+
+    def intern(self, name):
+        if not name:
+            return 0
+        i = self.ids.get(name)
+        if i is None:
+            i = len(self.names)
+            self.names.append(name)
+            self.ids[name] = i
+        return i
+
+    def intern_many(self, names):
+        out = np.empty(len(names), dtype=np.int32)
+        for i, name in enumerate(names):
+            out[i] = self.intern(name)
+        return out
+
+    def lookup(self, i):
+        return self.names[i]
+
+
+# Sdílená tabulka pro všechny tratě, aby id byla porovnatelná napříč tratěmi
+NAMES = NameTable()
+
+
+class TrackStore:
+    # Jedna trať jako struktura polí: body segmentu s leží na řádcích 3*s .. 3*s+2
+    def __init__(self, coords, point_station=None, point_switch=None,
+                 seg_station=None, seg_switch=None, lengths=None, flags=None,
+                 name=None, names=None):
+        self.coords = np.ascontiguousarray(coords, dtype=np.float64).reshape(-1, 3)
+        n_points = len(self.coords)
+        n_segs = n_points // 3
+        self.names = names if names is not None else NAMES
+        self.name = name
+        # Zvyšuje se při každé změně souřadnic, slouží k zneplatnění cache
+        self.version = 0
+        # Zvyšuje se při každé úpravě (i názvů); podle něj se pozná úprava během načítání
+        self.edits = 0
+        # Názvy po bodech se bez zadání odvodí z názvů segmentů až při prvním použití
+        self._point_station = None if point_station is None else self._ids(point_station, n_points)
+        self._point_switch = None if point_switch is None else self._ids(point_switch, n_points)
+        self.seg_station = self._ids(seg_station, n_segs)
+        self.seg_switch = self._ids(seg_switch, n_segs)
+        self.lengths = np.zeros(n_segs) if lengths is None else np.asarray(lengths, dtype=np.float64)
+        self.flags = np.zeros(n_segs, dtype=np.int32) if flags is None else np.asarray(flags, dtype=np.int32)
+        # Sledování změn pro ukládání: upravené segmenty a zda se změnil počet/pořadí segmentů
+        self.dirty = np.zeros(n_segs, dtype=bool)
+        # segmenty s posunutými body; jen jim se před uložením přepočítá délka
+        # (přejmenování nesmí přepsat délky z hry)
+        self.coords_dirty = np.zeros(n_segs, dtype=bool)
+        self.structure_dirty = False
+        # Původ v souboru: čísla řádků segmentů a (velikost, mtime_ns) při načtení
+        self.source_linenos = None
+        self.source_stat = None
+        # Verze souboru změněného na disku, kterou uživatel odmítl načíst (editor se už neptá)
+        self.ignored_stat = None
+        # Řádky, které parser při načtení vynechal (DatParseError)
+        self.parse_errors = []
+        # Nečíselné příznaky ze souboru: segment -> text; při uložení se zapíšou beze změny
+        self.flag_tokens = {}
+        # Rozdělení do dlaždic (TileIndex); z cache přijde hotové, jinak se staví při prvním použití
+        self.tiles = None
+
+    @property
+    def point_station(self):
+        if self._point_station is None:
+            self._load_point_ids()
+        return self._point_station
+
+    @point_station.setter
+    def point_station(self, ids):
+        self._point_station = self._ids(ids, self.n_points)
+        self._load_point_ids()
+
+    @property
+    def point_switch(self):
+        if self._point_switch is None:
+            self._load_point_ids()
+        return self._point_switch
+
+    @point_switch.setter
+    def point_switch(self, ids):
+        self._point_switch = self._ids(ids, self.n_points)
+        self._load_point_ids()
+
+    def point_ids_loaded(self):
+        return self._point_station is not None
+
+    def _load_point_ids(self):
+        # Obě pole najednou, aby se po editaci jednoho z nich názvy segmentů
+        # nepřepočítávaly z neúplných dat
+        for attr, seg in (("_point_station", self.seg_station), ("_point_switch", self.seg_switch)):
+            if getattr(self, attr) is None:
+                ids = np.zeros(self.n_points, dtype=np.int32)
+                ids[:3*self.n_segments] = np.repeat(seg[:self.n_segments], 3)
+                setattr(self, attr, ids)
+
+    def tile_index(self):
+        if self.tiles is None:
+            self.tiles = TileIndex.build(self.coords)
+        return self.tiles
+
+    def touch(self, s, coords=False):
+        self.edits += 1
+        if s < len(self.dirty):
+            self.dirty[s] = True
+            if coords:
+                self.coords_dirty[s] = True
+        if coords:
+            self.version += 1
+
+    def mark_dirty(self, segs=None, coords=True):
+        self.edits += 1
+        if segs is None:
+            segs = slice(None)
+        self.dirty[segs] = True
+        if coords:
+            self.coords_dirty[segs] = True
+            self.version += 1
+
+    def is_dirty(self):
+        return self.structure_dirty or bool(self.dirty.any())
+
+    def mark_clean(self):
+        self.dirty[:] = False
+        self.coords_dirty[:] = False
+        self.structure_dirty = False
+
+    @staticmethod
+    def _ids(ids, n):
+        if ids is None:
+            return np.zeros(n, dtype=np.int32)
+        return np.asarray(ids, dtype=np.int32)
+
+    @classmethod
+    def from_segment_records(cls, coords, stations, switches, lengths=None, flags=None, name=None, names=None):
+        # coords: (S,9) nebo (3*S,3); stations/switches: názvy po segmentech
+        names = names if names is not None else NAMES
+        seg_station = names.intern_many(stations)
+        seg_switch = names.intern_many(switches)
+        return cls(coords, seg_station=seg_station, seg_switch=seg_switch,
+                   lengths=lengths, flags=flags, name=name, names=names)
+
+    @classmethod
+    def from_parsed(cls, parsed, name=None, names=None):
+        # Lokální tabulku názvů ze souboru převedeme na id sdílené tabulky najednou
+        names = names if names is not None else NAMES
+        ids = names.intern_many(parsed.name_table)
+        seg_station = ids[parsed.station_idx]
+        seg_switch = ids[parsed.switch_idx]
+        store = cls(parsed.coords, seg_station=seg_station, seg_switch=seg_switch,
+                    lengths=parsed.lengths, flags=parsed.flags, name=name, names=names)
+        store.source_linenos = parsed.linenos
+        store.source_stat = parsed.source_stat
+        store.parse_errors = list(parsed.errors)
+        store.flag_tokens = dict(parsed.flag_tokens)
+        tiles = getattr(parsed, "tiles", None)
+        if tiles is not None:
+            store.tiles = TileIndex(store.coords, tiles.runs, tiles.bbox)
+        return store
+
+    @classmethod
+    def from_segments(cls, segments, name=None, names=None):
+        names = names if names is not None else NAMES
+        pts = [p for seg in segments for p in seg.get_points()]
+        coords = np.array([(p.x, p.y, p.z) for p in pts], dtype=np.float64).reshape(-1, 3)
+        return cls(coords,
+                   point_station=names.intern_many([p.station_name for p in pts]),
+                   point_switch=names.intern_many([p.switch_name for p in pts]),
+                   seg_station=names.intern_many([s.station_name for s in segments]),
+                   seg_switch=names.intern_many([s.switch_name for s in segments]),
+                   name=name, names=names)
+
+    @property
+    def n_points(self):
+        return len(self.coords)
+
+    @property
+    def n_segments(self):
+        return len(self.coords) // 3
+
+    @property
+    def segments(self):
+        return SegmentList(self)
+
+    def point(self, i):
+        return TrackPoint.view(self, i)
+
+    def segment(self, s):
+        return CurveSegment.view(self, s)
+
+    def points(self):
+        return [TrackPoint.view(self, i) for i in range(len(self.coords))]
+
+    def update_station_switch(self, s):
+        # Segment přebírá název jen tehdy, když ho sdílí všechny jeho body
+        self.seg_station[s] = self._common(self.point_station[3*s:3*s+3])
+        self.seg_switch[s] = self._common(self.point_switch[3*s:3*s+3])
+
+    def update_all_station_switch(self, segs=None):
+        if not self.point_ids_loaded():
+            # body ještě nikdo neupravoval, názvy segmentů platí
+            return
+        if segs is None:
+            segs = np.arange(self.n_segments)
+        for ids, out in ((self.point_station, self.seg_station), (self.point_switch, self.seg_switch)):
+            per_seg = ids[:3*self.n_segments].reshape(-1, 3)[segs]
+            named = per_seg != 0
+            first = np.where(named.any(axis=1), per_seg.max(axis=1), 0)
+            same = ((per_seg == first[:, None]) | ~named).all(axis=1)
+            out[segs] = np.where(same, first, 0)
+
+    @staticmethod
+    def _common(ids):
+        named = {int(i) for i in ids if i}
+        return named.pop() if len(named) == 1 else 0
+
+    def nbytes(self):
+        arrays = (self.coords, self._point_station, self._point_switch,
+                  self.seg_station, self.seg_switch, self.lengths, self.flags)
+        return sum(a.nbytes for a in arrays if a is not None)
+
+
+class SegmentList:
+    # Líný seznam segmentů; pohledy vznikají až při přístupu
+    __slots__ = ("store",)
+
+    def __init__(self, store):
+        self.store = store
+
+    def __len__(self):
+        return self.store.n_segments
+
+    def __getitem__(self, s):
+        if isinstance(s, slice):
+            return [CurveSegment.view(self.store, i) for i in range(*s.indices(len(self)))]
+        if s < 0:
+            s += len(self)
+        if not 0 <= s < len(self):
+            raise IndexError(s)
+        return CurveSegment.view(self.store, s)
+
+    def __iter__(self):
+        for s in range(len(self)):
+            yield CurveSegment.view(self.store, s)
+
+    def __bool__(self):
+        return len(self) > 0
+
+
+class TrackPoint:
+    # Tenký pohled na jeden řádek TrackStore; samostatný bod má vlastní malý store
+    __slots__ = ("store", "index")
+
+    def __init__(self, x, y, z, station_name=None, switch_name=None, track_name=None):
+        names = NAMES
+        self.store = TrackStore([(x, y, z)],
+                                point_station=[names.intern(station_name)],
+                                point_switch=[names.intern(switch_name)],
+                                name=track_name, names=names)
+        self.index = 0
+
+    @classmethod
+    def view(cls, store, index):
+        p = cls.__new__(cls)
+        p.store = store
+        p.index = index
+        return p
+
+    def __eq__(self, other):
+        return isinstance(other, TrackPoint) and self.store is other.store and self.index == other.index
+
+    def __hash__(self):
+        return hash((id(self.store), self.index))
+
+    def __repr__(self):
+        return f"TrackPoint({self.x}, {self.y}, {self.z}, {self.station_name!r}, {self.switch_name!r})"
+
+    @property
+    def x(self):
+        return float(self.store.coords[self.index, 0])
+
+    @x.setter
+    def x(self, v):
+        self.store.coords[self.index, 0] = v
+        self.store.touch(self.index // 3, coords=True)
+
+    @property
+    def y(self):
+        return float(self.store.coords[self.index, 1])
+
+    @y.setter
+    def y(self, v):
+        self.store.coords[self.index, 1] = v
+        self.store.touch(self.index // 3, coords=True)
+
+    @property
+    def z(self):
+        return float(self.store.coords[self.index, 2])
+
+    @z.setter
+    def z(self, v):
+        self.store.coords[self.index, 2] = v
+        self.store.touch(self.index // 3, coords=True)
+
+    @property
+    def station_name(self):
+        return self.store.names.lookup(self.store.point_station[self.index])
+
+    @station_name.setter
+    def station_name(self, v):
+        self.store.point_station[self.index] = self.store.names.intern(v)
+        self.store.touch(self.index // 3)
+
+    @property
+    def switch_name(self):
+        return self.store.names.lookup(self.store.point_switch[self.index])
+
+    @switch_name.setter
+    def switch_name(self, v):
+        self.store.point_switch[self.index] = self.store.names.intern(v)
+        self.store.touch(self.index // 3)
+
+    @property
+    def track_name(self):
+        return self.store.name
+
+    @track_name.setter
+    def track_name(self, v):
+        self.store.name = v
+
+    @property
+    def segment_index(self):
+        return self.index // 3
+
+
+class CurveSegment:
+    __slots__ = ("store", "index")
+
+    def __init__(self, p1, p2, p3, station_name=None, switch_name=None):
+        pts = [p1, p2, p3]
+        names = NAMES
+        self.store = TrackStore([(p.x, p.y, p.z) for p in pts],
+                                point_station=[names.intern(p.station_name) for p in pts],
+                                point_switch=[names.intern(p.switch_name) for p in pts],
+                                seg_station=[names.intern(station_name)],
+                                seg_switch=[names.intern(switch_name)],
+                                name=p1.track_name, names=names)
+        self.index = 0
+
+    @classmethod
+    def view(cls, store, index):
+        seg = cls.__new__(cls)
+        seg.store = store
+        seg.index = index
+        return seg
+
+    def __eq__(self, other):
+        return isinstance(other, CurveSegment) and self.store is other.store and self.index == other.index
+
+    def __hash__(self):
+        return hash((id(self.store), self.index))
+
+    @property
+    def p1(self):
+        return TrackPoint.view(self.store, 3*self.index)
+
+    @property
+    def p2(self):
+        return TrackPoint.view(self.store, 3*self.index + 1)
+
+    @property
+    def p3(self):
+        return TrackPoint.view(self.store, 3*self.index + 2)
+
+    @property
+    def station_name(self):
+        return self.store.names.lookup(self.store.seg_station[self.index])
+
+    @station_name.setter
+    def station_name(self, v):
+        self.store.seg_station[self.index] = self.store.names.intern(v)
+        self.store.touch(self.index)
+
+    @property
+    def switch_name(self):
+        return self.store.names.lookup(self.store.seg_switch[self.index])
+
+    @switch_name.setter
+    def switch_name(self, v):
+        self.store.seg_switch[self.index] = self.store.names.intern(v)
+        self.store.touch(self.index)
+
+    @property
+    def length(self):
+        return float(self.store.lengths[self.index])
+
+    @property
+    def flag(self):
+        return int(self.store.flags[self.index])
+
+    def get_points(self):
+        return [self.p1, self.p2, self.p3]
+
+    def update_station_switch(self):
+        self.store.update_station_switch(self.index)
+
+    def remove_point(self, p):
+        pts = self.get_points()
+        if p not in pts:
+            return [self]
+        idx = pts.index(p)
+        # Jednoduchá logika mazání bodu, viz předchozí příklady
+        if idx == 1:
+            p1 = pts[0]
+            p3 = pts[2]
+            m = TrackPoint((p1.x+p3.x)/2, (p1.y+p3.y)/2, (p1.z+p3.z)/2, station_name=self.station_name, switch_name=self.switch_name)
+            seg = CurveSegment(p1, m, p3, station_name=self.station_name, switch_name=self.switch_name)
+            return [seg]
+        else:
+            p1, p2, p3 = pts
+            if idx == 0:
+                seg = CurveSegment(p2, TrackPoint((p2.x+p3.x)/2,(p2.y+p3.y)/2,(p2.z+p3.z)/2, station_name=self.station_name, switch_name=self.switch_name), p3,
+                                   station_name=self.station_name, switch_name=self.switch_name)
+                return [seg]
+            elif idx == 2:
+                seg = CurveSegment(p1, TrackPoint((p1.x+p2.x)/2,(p1.y+p2.y)/2,(p1.z+p2.z)/2, station_name=self.station_name, switch_name=self.switch_name), p2,
+                                   station_name=self.station_name, switch_name=self.switch_name)
+                return [seg]
@@ -0,0 +1,27 @@
+import os
+import xml.etree.ElementTree as ET
+
+
+def read_track_entries(xml_file):
+    # Seznam (název tratě, cesta k .dat) z traintracks.xml v pořadí souboru
+    root = ET.parse(xml_file).getroot()
+    entries = []
+    for track in root.findall('train_track'):
+        full_path = track.get('filename')
+        if full_path is None:
+            continue
+        track_file = os.path.basename(full_path)
+        if not os.path.exists(track_file):
+            track_file = os.path.join(os.path.dirname(xml_file), track_file)
+        entries.append((track.get('trainConfigName', track_file), track_file))
+    return entries
+
+
+def expand_inputs(paths):
+    # Vstupy příkazové řádky: .xml se rozvine na své tratě, ostatní soubory zůstávají
+    for path in paths:
+        if path.lower().endswith(".xml"):
+            for name, track_file in read_track_entries(path):
+                yield name, track_file
+        else:
+            yield os.path.splitext(os.path.basename(path))[0], path
@@ -0,0 +1,227 @@
+import numpy as np
+
+from .topology import JOIN_TOLERANCE
+from .profiling import PROFILER
+
+# Body segmentu bližší než tato vzdálenost jsou zdvojené
+DUPLICATE_TOLERANCE = 1e-3
+# Konec segmentu dál od začátku dalšího než tolerance spojení je mezera
+GAP_TOLERANCE = JOIN_TOLERANCE
+# Změna směru mezi sousedními kroky trati větší než tento úhel je ostrý zlom
+KINK_ANGLE = 30.0
+
+# druh -> (popis, závažnost)
+ISSUE_KINDS = {
+    "parse": ("Chybný řádek", "chyba"),
+    "invalid": ("Neplatná souřadnice", "chyba"),
+    "gap": ("Mezera", "chyba"),
+    "duplicate": ("Zdvojený bod", "varování"),
+    "kink": ("Ostrý zlom", "varování"),
+    "switch": ("Osamocená výhybka", "varování"),
+}
+
+
+class Issue:
+    # Nalezený problém: trať, segment (od 0) a bod, na který se dá v editoru skočit;
+    # u chybných řádků je segment ten, který v souboru následuje po vynechaném řádku
+    __slots__ = ("kind", "track", "segment", "point", "message")
+
+    def __init__(self, kind, track, segment, point, message):
+        self.kind = kind
+        self.track = track
+        self.segment = segment
+        self.point = point
+        self.message = message
+
+    @property
+    def label(self):
+        return ISSUE_KINDS[self.kind][0]
+
+    @property
+    def severity(self):
+        return ISSUE_KINDS[self.kind][1]
+
+    def __repr__(self):
+        where = f"segment {self.segment + 1}: " if self.segment is not None else ""
+        return f"{self.track}: {where}{self.label.lower()} – {self.message}"
+
+
+def _angles(a, b):
+    # Úhel mezi vektory ve stupních; u nulového vektoru vyjde nan
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cos = np.einsum("ij,ij->i", a, b) / (np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1))
+        return np.degrees(np.arccos(np.clip(cos, -1.0, 1.0)))
+
+
+@PROFILER.timed()
+def check_segments(store, lo=0, hi=None, track=None):
+    # Geometrická kontrola segmentů lo..hi-1 jedné trati najednou nad polem. Mezery
+    # a zlomy na začátku segmentu se hlásí u něj, proto se čte i předchozí segment
+    track = store.name if track is None else track
+    n = store.n_segments
+    hi = n if hi is None else min(hi, n)
+    lo = max(lo, 0)
+    if lo >= hi:
+        return []
+    first = max(lo - 1, 0)
+    c = store.coords[3*first:3*hi]
+    found = []     # (segment v řezu, bod v řezu, druh, zpráva)
+
+    invalid = ~np.isfinite(c).reshape(-1, 9).all(axis=1)
+    for k in np.flatnonzero(invalid).tolist():
+        found.append((k, 3*k, "invalid", "souřadnice není konečné číslo"))
+
+    d1 = c[1::3] - c[0::3]
+    d2 = c[2::3] - c[1::3]
+    for j, d in ((1, d1), (2, d2)):
+        short = np.linalg.norm(d, axis=1) < DUPLICATE_TOLERANCE
+        for k in np.flatnonzero(short & ~invalid).tolist():
+            found.append((k, 3*k + j, "duplicate", f"bod {j + 1} segmentu splývá s bodem {j}"))
+
+    inner = _angles(d1, d2)
+    for k in np.flatnonzero(inner > KINK_ANGLE).tolist():
+        found.append((k, 3*k + 1, "kink", f"zlom {inner[k]:.0f}° uvnitř segmentu"))
+
+    if len(d1) > 1:
+        step = c[3::3] - c[2:-1:3]
+        gap = np.linalg.norm(step, axis=1)
+        for k in np.flatnonzero(gap > GAP_TOLERANCE).tolist():
+            found.append((k + 1, 3*(k + 1), "gap", f"{gap[k]:.2f} m od konce předchozího segmentu"))
+        # zlom na spoji se měří jen tam, kde segmenty opravdu navazují
+        joint = _angles(d2[:-1], d1[1:])
+        joint[gap > GAP_TOLERANCE] = np.nan
+        for k in np.flatnonzero(joint > KINK_ANGLE).tolist():
+            found.append((k + 1, 3*(k + 1), "kink", f"zlom {joint[k]:.0f}° na spoji s předchozím segmentem"))
+
+    issues = [Issue(kind, track, first + k, 3*first + p, message)
+              for k, p, kind, message in found if first + k >= lo]
+    issues.sort(key=lambda i: (i.segment, i.point))
+    return issues
+
+
+def parse_issues(store, track=None):
+    # Řádky, které parser vynechal; segment se dohledá podle čísel řádků souboru
+    track = store.name if track is None else track
+    errors = store.parse_errors
+    if not errors:
+        return []
+    linenos = store.source_linenos
+    issues = []
+    for e in errors:
+        seg = None
+        if linenos is not None and len(linenos):
+            seg = min(int(np.searchsorted(linenos, e.lineno)), len(linenos) - 1)
+        issues.append(Issue("parse", track, seg, None if seg is None else 3*seg,
+                            f"řádek {e.lineno}: {e.message}"))
+    return issues
+
+
+def switch_segments(store):
+    # Výhybky trati: název -> první segment, který ji nese
+    ids, first = np.unique(store.seg_switch, return_index=True)
+    return {store.names.lookup(i): s for i, s in zip(ids.tolist(), first.tolist()) if i}
+
+
+class Validator:
+    # Výsledky kontroly celé sítě po tratích. Trať se kontroluje jedním průchodem
+    # nad poli; po editaci se přepočítají jen dotčené segmenty a jejich sousedé.
+    # Drží jen nálezy a názvy výhybek, ne samotné tratě, takže jde i proudově (CLI).
+    # S incremental si pamatuje id výhybek po segmentech, aby po editaci přepočítal
+    # jen výhybky, jejichž název se v dotčených segmentech opravdu změnil
+    def __init__(self, incremental=True):
+        self.incremental = incremental
+        self.issues = {}        # trať -> [Issue] seřazené podle segmentu
+        self.parsed = {}        # trať -> [Issue] z parsování
+        self.switches = {}      # trať -> {výhybka: první segment}
+        self.switch_ids = {}    # trať -> kopie seg_switch z poslední kontroly
+
+    def check_track(self, track, store):
+        self.issues[track] = check_segments(store, track=track)
+        self.parsed[track] = parse_issues(store, track)
+        self.switches[track] = switch_segments(store)
+        if self.incremental:
+            self.switch_ids[track] = store.seg_switch.copy()
+
+    def remove_track(self, track):
+        for d in (self.issues, self.parsed, self.switches, self.switch_ids):
+            d.pop(track, None)
+
+    def _update_switches(self, track, store, segs):
+        snap = self.switch_ids.get(track)
+        if snap is None or len(snap) != len(store.seg_switch):
+            self.switches[track] = switch_segments(store)
+            if self.incremental:
+                self.switch_ids[track] = store.seg_switch.copy()
+            return
+        segs = segs[segs < len(snap)]
+        old, new = snap[segs], store.seg_switch[segs]
+        changed = old != new
+        if not changed.any():
+            return
+        snap[segs] = new
+        switches = self.switches.setdefault(track, {})
+        for i in np.union1d(old[changed], new[changed]).tolist():
+            if not i:
+                continue
+            name = store.names.lookup(i)
+            at = np.flatnonzero(store.seg_switch == i)
+            if len(at):
+                switches[name] = int(at[0])
+            else:
+                switches.pop(name, None)
+
+    @PROFILER.timed()
+    def recheck(self, track, store, indices):
+        # indices: změněné body; segment s ovlivní i kontrolu spoje se segmentem s+1
+        segs = np.unique(np.asarray(indices, dtype=np.intp) // 3)
+        if not len(segs):
+            return
+        brk = np.flatnonzero(np.diff(segs) > 2) + 1
+        starts = segs[np.r_[0, brk]]
+        ends = segs[np.r_[brk - 1, len(segs) - 1]] + 2
+        old = self.issues.get(track, [])
+        if old:
+            at = np.array([i.segment for i in old])
+            span = np.searchsorted(starts, at, side="right") - 1
+            inside = (span >= 0) & (at < ends[np.maximum(span, 0)])
+            kept = [i for i, drop in zip(old, inside.tolist()) if not drop]
+        else:
+            kept = []
+        for a, b in zip(starts.tolist(), ends.tolist()):
+            kept.extend(check_segments(store, a, b, track))
+        kept.sort(key=lambda i: (i.segment, i.point))
+        self.issues[track] = kept
+        # názvy výhybek se mohly změnit (přiřazení názvu výběru)
+        self._update_switches(track, store, segs)
+
+    def network_issues(self):
+        # Výhybka spojuje tratě, takže její název má být aspoň ve dvou
+        tracks = {}
+        for track, switches in self.switches.items():
+            for name in switches:
+                tracks.setdefault(name, []).append(track)
+        issues = []
+        for name, where in tracks.items():
+            if len(where) == 1:
+                track = where[0]
+                seg = self.switches[track][name]
+                issues.append(Issue("switch", track, seg, 3*seg, f"výhybka {name} není v žádné jiné trati"))
+        return issues
+
+    def all_issues(self):
+        # Nálezy po tratích v pořadí segmentů
+        network = {}
+        for issue in self.network_issues():
+            network.setdefault(issue.track, []).append(issue)
+        out = []
+        for track in self.issues:
+            merged = self.parsed.get(track, []) + self.issues[track] + network.get(track, [])
+            merged.sort(key=lambda i: (-1 if i.segment is None else i.segment, i.kind))
+            out.extend(merged)
+        return out
+
+    def counts(self):
+        out = {}
+        for issue in self.all_issues():
+            out[issue.severity] = out.get(issue.severity, 0) + 1
+        return out
@@ -0,0 +1,84 @@
+from PyQt5.QtWidgets import (QWidget, QTreeWidget, QTreeWidgetItem, QVBoxLayout, QHBoxLayout, QLabel,
+                             QPushButton, QDockWidget, QCheckBox)
+from PyQt5.QtCore import Qt, QTimer
+from PyQt5.QtGui import QColor
+
+# Víc řádků seznam nezobrazí; souhrn nahoře ukazuje počty všech nálezů
+MAX_LISTED = 5000
+# Po editaci se seznam obnoví až po krátké pauze, ne při každém pohybu myši
+REFRESH_MS = 200
+
+
+class ValidationPanel(QDockWidget):
+    def __init__(self, parent=None):
+        super().__init__("Kontrola dat", parent)
+        self.setAllowedAreas(Qt.LeftDockWidgetArea | Qt.RightDockWidgetArea | Qt.BottomDockWidgetArea)
+        self.parent = parent
+        self.validator = None
+
+        self.summary = QLabel("Kontrola ještě neproběhla")
+        self.warnings = QCheckBox("Varování")
+        self.warnings.setChecked(True)
+        self.warnings.toggled.connect(self.refresh)
+        self.btn_check = QPushButton("Zkontrolovat")
+        if parent is not None:
+            self.btn_check.clicked.connect(parent.validate_tracks)
+
+        self.tree = QTreeWidget()
+        self.tree.setHeaderLabels(["Druh", "Trať", "Segment", "Popis"])
+        self.tree.setRootIsDecorated(False)
+        self.tree.setUniformRowHeights(True)
+        self.tree.itemActivated.connect(self.on_item_activated)
+        self.tree.itemClicked.connect(self.on_item_activated)
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(REFRESH_MS)
+        self.timer.timeout.connect(self.refresh)
+
+        top = QHBoxLayout()
+        top.addWidget(self.summary, 1)
+        top.addWidget(self.warnings)
+        top.addWidget(self.btn_check)
+        layout = QVBoxLayout()
+        layout.addLayout(top)
+        layout.addWidget(self.tree)
+        widget = QWidget()
+        widget.setLayout(layout)
+        self.setWidget(widget)
+
+    def set_validator(self, validator):
+        self.validator = validator
+        self.refresh()
+
+    def schedule_refresh(self):
+        if self.validator is not None:
+            self.timer.start()
+
+    def refresh(self):
+        self.timer.stop()
+        self.tree.clear()
+        if self.validator is None:
+            self.summary.setText("Kontrola ještě neproběhla")
+            return
+        issues = self.validator.all_issues()
+        errors = sum(1 for i in issues if i.severity == "chyba")
+        self.summary.setText(f"Chyby: {errors}, varování: {len(issues) - errors}")
+        if not self.warnings.isChecked():
+            issues = [i for i in issues if i.severity == "chyba"]
+        items = []
+        for issue in issues[:MAX_LISTED]:
+            seg = "" if issue.segment is None else str(issue.segment + 1)
+            item = QTreeWidgetItem([issue.label, str(issue.track), seg, issue.message])
+            item.setData(0, Qt.UserRole, issue)
+            if issue.severity == "chyba":
+                item.setForeground(0, QColor(200, 0, 0))
+            items.append(item)
+        if len(issues) > MAX_LISTED:
+            items.append(QTreeWidgetItem(["…", "", "", f"dalších {len(issues) - MAX_LISTED} nálezů"]))
+        self.tree.addTopLevelItems(items)
+
+    def on_item_activated(self, item, column):
+        issue = item.data(0, Qt.UserRole)
+        if issue is not None and self.parent is not None:
+            self.parent.show_issue(issue)